@@ -0,0 +1,180 @@
+"""
+Admin Ops Endpoints
+The operational endpoints both ride apps (app_complete.py, app_new.py)
+serve: the public readiness probe plus admin-only views of the realtime
+outboxes, event bus, query counts, traces, surge zones, memory and
+profiles. Each app builds its own components and registers the routes
+once:
+
+    register_admin_routes(app, models=models, readiness=readiness, tracer=tracer, ...)
+
+    GET  /ready                                   readiness (200 / 503), public
+    GET  /api/admin/realtime-stats                per-client outbox counters
+    GET  /api/admin/event-bus                     queue depths, subscriber lag
+    GET  /api/admin/query-stats                   statements per route/tick, N+1 suspects
+    GET  /api/admin/traces[/<trace_id>]           recent traces / one trace
+    GET  /api/admin/surge?city=                   live surge zones
+    GET  /api/admin/memory                        RSS and structure sizes
+    POST|DELETE /api/admin/memory/snapshot        tracemalloc baseline on/off
+    GET  /api/admin/memory/diff                   allocation growth since the baseline
+    GET  /api/admin/profile/sample                collapsed stacks of every thread
+    GET  /api/admin/profile/requests[/<id>]       per-request cProfile results
+    POST /api/admin/profile/rates                 per-route profile sampling rates
+"""
+
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, jsonify, request
+from flask_login import current_user, login_required
+
+from profiling import MAX_SAMPLE_SECONDS
+from serve import offload
+
+
+def admin_required(view):
+    """Login plus the admin role; JSON 403 for everyone else"""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def register_admin_routes(app, *, models, readiness, vehicle_fanout, event_bus, query_tracker, tracer,
+                          surge_engine, surge_enabled, memory_inspector, stack_sampler, request_profiler):
+    """Add the readiness probe and the /api/admin ops endpoints to ``app``"""
+
+    @app.route('/ready')
+    def ready():
+        """Readiness: which components are warm; 200 once all are, else 503"""
+        is_ready, components = readiness.report()
+        return jsonify({'ready': is_ready, 'components': components, **models.status()}), 200 if is_ready else 503
+
+    @app.route('/api/admin/realtime-stats')
+    @admin_required
+    def realtime_stats():
+        """Per-client realtime outbox counters (coalesced/dropped frames, slow consumers)"""
+        return jsonify(vehicle_fanout.client_stats())
+
+    @app.route('/api/admin/event-bus')
+    @admin_required
+    def event_bus_stats():
+        """Ride event bus counters: queue depths, per-subscriber delivery lag and errors"""
+        return jsonify(event_bus.stats())
+
+    @app.route('/api/admin/query-stats')
+    @admin_required
+    def query_stats():
+        """Statements and DB time per route/tick, with recent N+1 suspects and budget overruns"""
+        return jsonify(query_tracker.stats())
+
+    @app.route('/api/admin/traces')
+    @admin_required
+    def list_traces():
+        """Recent traces of the booking/prediction routes, newest first"""
+        try:
+            limit = min(int(request.args.get('limit', 50)), 200)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid limit parameter: {e}'}), 400
+        return jsonify({'traces': tracer.traces(limit)})
+
+    @app.route('/api/admin/traces/<trace_id>')
+    @admin_required
+    def get_trace(trace_id):
+        """Every span of one trace, in start order"""
+        spans = tracer.trace(trace_id)
+        if not spans:
+            return jsonify({'error': 'Trace not found (only the most recent are kept)'}), 404
+        return jsonify({'trace_id': trace_id, 'spans': spans})
+
+    @app.route('/api/admin/surge')
+    @admin_required
+    def surge_zones():
+        """Live surge zones: pending requests, available vehicles and the multiplier"""
+        return jsonify({'enabled': surge_enabled, 'zones': surge_engine.zones(request.args.get('city'))})
+
+    @app.route('/api/admin/memory')
+    @admin_required
+    def memory_overview():
+        """RSS, sizes of the long-lived in-process structures and tracemalloc status"""
+        return jsonify(memory_inspector.overview())
+
+    @app.route('/api/admin/memory/snapshot', methods=['POST', 'DELETE'])
+    @admin_required
+    def memory_snapshot():
+        """POST starts tracemalloc and sets the diff baseline; DELETE stops tracing"""
+        if request.method == 'DELETE':
+            memory_inspector.stop_tracing()
+            return jsonify({'tracing': False})
+        return jsonify(memory_inspector.take_snapshot())
+
+    @app.route('/api/admin/memory/diff')
+    @admin_required
+    def memory_diff():
+        """Allocation growth since the snapshot, by ?group=lineno|filename|traceback"""
+        try:
+            limit = int(request.args.get('limit', 20))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid diff parameter: {e}'}), 400
+        group = request.args.get('group', 'lineno')
+        if group not in ('lineno', 'filename', 'traceback'):
+            return jsonify({'error': f'Unsupported group: {group}'}), 400
+        top = memory_inspector.diff(limit, group)
+        if top is None:
+            return jsonify({'error': 'No baseline; POST /api/admin/memory/snapshot first'}), 409
+        return jsonify({'baseline_at': memory_inspector.baseline_at, 'top': top})
+
+    @app.route('/api/admin/profile/sample')
+    @admin_required
+    def profile_sample():
+        """Sample every thread's stack for ?seconds= (max 60); collapsed stacks for flamegraph tools"""
+        try:
+            seconds = min(float(request.args.get('seconds', 10)), MAX_SAMPLE_SECONDS)
+            interval = max(float(request.args.get('interval_ms', 10)), 1) / 1000
+        except ValueError as e:
+            return jsonify({'error': f'Invalid sampling parameter: {e}'}), 400
+
+        # The sampling loop blocks, so it runs on an OS thread under eventlet/gevent
+        result = offload(stack_sampler.sample, seconds, interval)
+        if result is None:
+            return jsonify({'error': 'A sampling run is already in progress'}), 409
+        return Response(result['collapsed'], mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename=profile-{datetime.now():%Y%m%d-%H%M%S}.collapsed',
+            'X-Profile-Samples': str(result['samples']),
+            'X-Profile-Overhead': str(result['overhead'])
+        })
+
+    @app.route('/api/admin/profile/requests')
+    @admin_required
+    def profiled_requests():
+        """Recent per-request profiles (X-Profile header or route sampling) and the sampling rates"""
+        return jsonify({'rates': request_profiler.rates, 'profiles': request_profiler.summaries()})
+
+    @app.route('/api/admin/profile/requests/<int:profile_id>')
+    @admin_required
+    def profiled_request(profile_id):
+        """One request profile as pstats text (?sort=cumulative|tottime) or a .prof file (?format=pstats)"""
+        record = request_profiler.get(profile_id)
+        if record is None:
+            return jsonify({'error': 'Profile not found (only the most recent are kept)'}), 404
+        if request.args.get('format') == 'pstats':
+            return Response(request_profiler.pstats_file(record), mimetype='application/octet-stream', headers={
+                'Content-Disposition': f'attachment; filename=request-{profile_id}.prof'
+            })
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            return jsonify({'error': f'Unsupported sort: {sort}'}), 400
+        return Response(request_profiler.report(record, sort), mimetype='text/plain')
+
+    @app.route('/api/admin/profile/rates', methods=['POST'])
+    @admin_required
+    def update_profile_rates():
+        """Replace the per-route sampling rates, e.g. {"/api/analytics": 0.01}"""
+        rates = request.json or {}
+        if not all(isinstance(rate, (int, float)) and 0 <= rate <= 1 for rate in rates.values()):
+            return jsonify({'error': 'Rates must be numbers between 0 and 1'}), 400
+        request_profiler.rates = {route: float(rate) for route, rate in rates.items() if rate}
+        return jsonify({'rates': request_profiler.rates})
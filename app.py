@@ -10,15 +10,18 @@ import pickle
 import pandas as pd
 import numpy as np
 import json
-import time
 from datetime import datetime
-import threading
 import random
+from fleet_simulator import FleetSimulator
+from vehicle_fanout import VehicleBatchFanout
+from message_queue import socketio_options
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'gps_tracking_secret_key'
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(app, cors_allowed_origins="*", **socketio_options())
+# Per-client outboxes: a slow client gets the latest position per vehicle
+vehicle_fanout = VehicleBatchFanout(socketio)
 
 # Load trained models
 print("Loading ML models...")
@@ -40,7 +43,6 @@ with open('Models/feature_columns.pkl', 'rb') as f:
 print("✓ All models loaded successfully!")
 
 # Global variables
-active_vehicles = {}
 simulation_active = False
 
 # Helper Functions
@@ -168,89 +170,43 @@ def start_simulation():
         now.hour, now.weekday(), now.month
     )
     
-    active_vehicles[vehicle_id] = {
-        'route': route,
-        'current_index': 0,
-        'start_time': time.time(),
-        'duration': duration_sec,
-        'distance': haversine_distance(start_lat, start_lon, end_lat, end_lon),
-        'status': 'active'
-    }
-    
-    # Start background thread for GPS streaming
-    thread = threading.Thread(target=simulate_gps_stream, args=(vehicle_id,))
-    thread.daemon = True
-    thread.start()
+    # Hand the route to the shared asyncio fleet simulator
+    fleet.start()
+    fleet.start_vehicle(
+        vehicle_id, route,
+        distance=haversine_distance(start_lat, start_lon, end_lat, end_lon),
+        duration=duration_sec
+    )
     
     return jsonify({
         'success': True,
         'vehicle_id': vehicle_id,
         'total_points': len(route),
-        'estimated_duration': duration_min
+        'estimated_duration': float(duration_min)
     })
 
-def simulate_gps_stream(vehicle_id):
-    """Simulate real-time GPS data streaming"""
-    while vehicle_id in active_vehicles:
-        vehicle = active_vehicles[vehicle_id]
-        
-        if vehicle['current_index'] >= len(vehicle['route']):
-            vehicle['status'] = 'completed'
-            socketio.emit('vehicle_completed', {'vehicle_id': vehicle_id})
-            break
-        
-        current_point = vehicle['route'][vehicle['current_index']]
-        elapsed_time = time.time() - vehicle['start_time']
-        progress = (vehicle['current_index'] / len(vehicle['route'])) * 100
-        
-        # Calculate current speed
-        if vehicle['current_index'] > 0:
-            prev_point = vehicle['route'][vehicle['current_index'] - 1]
-            segment_distance = haversine_distance(
-                prev_point[0], prev_point[1],
-                current_point[0], current_point[1]
-            )
-            speed = segment_distance * 3600  # km/h (assuming 1 second per point)
-        else:
-            speed = 0
-        
-        gps_data = {
-            'vehicle_id': vehicle_id,
-            'latitude': current_point[0],
-            'longitude': current_point[1],
-            'speed': speed,
-            'timestamp': datetime.now().isoformat(),
-            'progress': progress,
-            'elapsed_time': elapsed_time,
-            'distance_covered': (vehicle['distance'] * progress / 100)
-        }
-        
-        socketio.emit('gps_update', gps_data)
-        
-        vehicle['current_index'] += 1
-        time.sleep(0.5)  # Update every 0.5 seconds
+def emit_fleet_updates(updates, completed):
+    """Queue one fleet tick of GPS data for every client"""
+    vehicle_fanout.emit_latest('gps_update', [
+        (None, gps_data['vehicle_id'], gps_data) for gps_data in updates
+    ])
+    vehicle_fanout.emit_latest('vehicle_completed', [
+        (None, vehicle_id, {'vehicle_id': vehicle_id}) for vehicle_id in completed
+    ])
+
+fleet = FleetSimulator(emit=emit_fleet_updates)
 
 @app.route('/api/stop_simulation/<vehicle_id>', methods=['POST'])
 def stop_simulation(vehicle_id):
     """Stop GPS simulation"""
-    if vehicle_id in active_vehicles:
-        del active_vehicles[vehicle_id]
+    if fleet.stop_vehicle(vehicle_id):
         return jsonify({'success': True, 'message': 'Simulation stopped'})
     return jsonify({'success': False, 'message': 'Vehicle not found'})
 
 @app.route('/api/vehicles')
 def get_vehicles():
     """Get all active vehicles"""
-    return jsonify({
-        'vehicles': [
-            {
-                'id': vid,
-                'status': data['status'],
-                'progress': (data['current_index'] / len(data['route'])) * 100
-            }
-            for vid, data in active_vehicles.items()
-        ]
-    })
+    return jsonify({'vehicles': fleet.vehicles()})
 
 @socketio.on('connect')
 def handle_connect():
@@ -260,6 +216,7 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    vehicle_fanout.unsubscribe(request.sid)
 
 if __name__ == '__main__':
     print("\n" + "="*80)
@@ -3,12 +3,10 @@ GPS-Based Vehicle Tracking System with ML-Enhanced Route Prediction
 Complete Backend with Role-Based Dashboards, Voice Integration, and Real-time GPS Streaming
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, Response, stream_with_context
+from flask_socketio import SocketIO, emit, join_room
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-import pickle
-import pandas as pd
 import numpy as np
 import json
 import time
@@ -16,7 +14,26 @@ from datetime import datetime, timedelta
 import threading
 import random
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Vehicle, Ride, SystemSettings
+from sqlalchemy.orm import joinedload
+from models import db, User, Vehicle, Ride, SystemSettings, CityDailyStats, DriverDailyStats
+from migrate_database import upgrade_schema
+from rollups import record_ride_transition, analytics_totals
+from ride_export import EXPORT_FORMATS, iter_ride_pages, parse_cursor, stream_ndjson, stream_csv
+from vehicle_fanout import VehicleBatchFanout, parse_viewport, vehicle_state
+from message_queue import message_queue_url, socketio_options, VehicleTickRelay
+from serve import async_mode, offload, run_options
+from ride_events import EventBus, RideStatusChanged, capture_commits
+from dashboard_push import ChangeVersions, DashboardPush, recent_ride_row
+from query_tracker import QueryTracker, query_budget
+from memory_stats import MemoryInspector
+from tracing import tracer_from_env
+from startup import MODELS_DIR, ModelStore, serving_readiness
+from admin_ops import register_admin_routes
+from surge import SurgeEngine
+from fare_engine import FARES
+from profiling import StackSampler, RequestProfiler, parse_route_rates
+from metrics import (instrument_app, instrument_socketio, instrument_db, observe_tick,
+                     PREDICT_STAGE_SECONDS, SOCKETIO_CONNECTIONS, REGISTRY)
 from city_config import (
     BANGALORE_CONFIG, PORTO_CONFIG, BANGALORE_VEHICLES, PORTO_VEHICLES,
     get_city_config, get_vehicles_for_city, calculate_fare, get_all_locations
@@ -34,13 +51,44 @@ db_path = os.path.join(basedir, 'instance', 'rideshare.db')
 # Ensure instance directory exists
 os.makedirs(os.path.join(basedir, 'instance'), exist_ok=True)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 CORS(app)
 
 # Initialize extensions
 db.init_app(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# SOCKETIO_MESSAGE_QUEUE enables multi-worker mode (see message_queue.py)
+MESSAGE_QUEUE_URL = message_queue_url()
+# SOCKETIO_ASYNC_MODE is set by serve.py (eventlet/gevent); threading otherwise
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode(), **socketio_options(MESSAGE_QUEUE_URL))
+# Prometheus metrics at /metrics (see metrics.py)
+instrument_app(app)
+instrument_socketio(socketio)
+instrument_db()
+vehicle_fanout = VehicleBatchFanout(socketio)
+vehicle_ticks = VehicleTickRelay(MESSAGE_QUEUE_URL) if MESSAGE_QUEUE_URL else None
+# Stage spans for the booking/prediction routes, followed into event
+# subscribers; TRACE_EXPORT ships them (see tracing.py)
+tracer = tracer_from_env('app_complete')
+tracer.install(app, paths={'/api/book-ride', '/api/estimate-fare'})
+# Committed ride/vehicle status changes are published here (see ride_events.py)
+ride_events_bus = EventBus(tracer=tracer)
+capture_commits(ride_events_bus)
+# -> dashboard deltas + ETag versions
+dashboard_versions = ChangeVersions(MESSAGE_QUEUE_URL)
+dashboard_push = DashboardPush(socketio, dashboard_versions, ride_events_bus)
+# Live zone fare multipliers fed by bookings and vehicle ticks; SURGE_PRICING=off
+# keeps the static hour multipliers (see surge.py)
+surge_engine = SurgeEngine()
+SURGE_ENABLED = os.environ.get('SURGE_PRICING', 'on') != 'off'
+# Live profiling under /api/admin/profile (see profiling.py)
+stack_sampler = StackSampler()
+request_profiler = RequestProfiler(parse_route_rates(os.environ.get('PROFILE_ROUTES')),
+                                   token=os.environ.get('PROFILE_TOKEN'))
+request_profiler.install(app, lambda: current_user.is_authenticated and current_user.role == 'admin')
+# Statement counts per request/tick; @query_budget overruns fail under app.testing
+query_tracker = QueryTracker()
+query_tracker.install(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -49,30 +97,16 @@ login_manager.login_view = 'login'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-# Load trained ML models
-print("Loading ML models...")
-with open('Models/xgboost_model.pkl', 'rb') as f:
-    xgb_model = pickle.load(f)
+# Trained models load on first use; start_services() warms them in the
+# background so importing the app stays cheap (see startup.py)
+models = ModelStore(MODELS_DIR)
 
-with open('Models/random_forest_model (1).pkl', 'rb') as f:
-    rf_model = pickle.load(f)
-
-with open('Models/kmeans_start.pkl', 'rb') as f:
-    kmeans_start = pickle.load(f)
-
-with open('Models/kmeans_end.pkl', 'rb') as f:
-    kmeans_end = pickle.load(f)
-
-with open('Models/feature_columns.pkl', 'rb') as f:
-    feature_columns = pickle.load(f)
-
-print("✓ All models loaded successfully!")
+# Readiness probe for load balancers (/ready): 503 until models, pandas and the database are warm
+readiness = serving_readiness(models, db)
 
 # Global variables
-active_vehicles = {}
 simulated_vehicles = {}
 vehicle_movement_thread_started = False
-pending_rides = []
 
 # ========================
 # Helper Functions
@@ -99,24 +133,30 @@ def calculate_bearing(lat1, lon1, lat2, lon2):
 
 def predict_trip_duration(start_lat, start_lon, end_lat, end_lon, hour, day_of_week, month):
     """Predict trip duration using ML model"""
-    distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
-    bearing = calculate_bearing(start_lat, start_lon, end_lat, end_lon)
-    num_points = max(2, int(distance * 10))
-    straightness = 0.8
-    is_weekend = 1 if day_of_week in [5, 6] else 0
-    is_rush_hour = 1 if hour in [7, 8, 9, 17, 18, 19] else 0
-    
-    start_cluster = kmeans_start.predict([[start_lat, start_lon]])[0]
-    end_cluster = kmeans_end.predict([[end_lat, end_lon]])[0]
-    
-    features = pd.DataFrame([[
-        start_lat, start_lon, end_lat, end_lon,
-        distance, bearing, straightness, num_points,
-        hour, day_of_week, month, is_weekend, is_rush_hour,
-        start_cluster, end_cluster
-    ]], columns=feature_columns)
-    
-    duration_seconds = xgb_model.predict(features)[0]
+    with PREDICT_STAGE_SECONDS.labels('features').time(), tracer.span('haversine_bearing'):
+        distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
+        bearing = calculate_bearing(start_lat, start_lon, end_lat, end_lon)
+        num_points = max(2, int(distance * 10))
+        straightness = 0.8
+        is_weekend = 1 if day_of_week in [5, 6] else 0
+        is_rush_hour = 1 if hour in [7, 8, 9, 17, 18, 19] else 0
+    
+    with PREDICT_STAGE_SECONDS.labels('clustering').time(), tracer.span('cluster_lookup'):
+        start_cluster = models.get('kmeans_start').predict([[start_lat, start_lon]])[0]
+        end_cluster = models.get('kmeans_end').predict([[end_lat, end_lon]])[0]
+    
+    with PREDICT_STAGE_SECONDS.labels('model').time():
+        with tracer.span('feature_frame'):
+            import pandas as pd
+            features = pd.DataFrame([[
+                start_lat, start_lon, end_lat, end_lon,
+                distance, bearing, straightness, num_points,
+                hour, day_of_week, month, is_weekend, is_rush_hour,
+                start_cluster, end_cluster
+            ]], columns=models.get('feature_columns'))
+        
+        with tracer.span('model'):
+            duration_seconds = models.get('xgb_model').predict(features)[0]
     return duration_seconds, duration_seconds / 60
 
 def init_simulated_vehicles():
@@ -153,49 +193,73 @@ def init_simulated_vehicles():
     thread.daemon = True
     thread.start()
 
+def broadcast_vehicle_tick(states):
+    """Hand one tick of vehicle states to the fan-out of every worker"""
+    if vehicle_ticks is not None:
+        vehicle_ticks.publish(states)
+    else:
+        apply_vehicle_tick(states)
+
+def apply_vehicle_tick(states):
+    """One tick of vehicle states (local or relayed): fan-out frames and surge supply"""
+    vehicle_fanout.apply_tick(states)
+    if SURGE_ENABLED:
+        surge_engine.observe_tick(states)
+
 def simulate_vehicle_movement():
     """Simulate random movement for idle vehicles"""
     while True:
+        started = time.perf_counter()
+        states = []
         for vehicle_id, vehicle in simulated_vehicles.items():
             if vehicle['status'] == 'available':
                 # Small random movement
                 vehicle['lat'] += random.uniform(-0.001, 0.001)
                 vehicle['lon'] += random.uniform(-0.001, 0.001)
-                
-                # Emit update
-                socketio.emit('vehicle_update', {
-                    'vehicle_id': vehicle_id,
-                    'lat': vehicle['lat'],
-                    'lon': vehicle['lon'],
-                    'status': vehicle['status']
-                })
+            
+            states.append(vehicle_state(
+                vehicle_id, vehicle['lat'], vehicle['lon'], vehicle['status'],
+                city=vehicle['city']
+            ))
         
+        # One batched frame for the whole tick
+        broadcast_vehicle_tick(states)
+        observe_tick('simulated_vehicles', time.perf_counter() - started, 5)
         time.sleep(5)  # Update every 5 seconds
 
-def simulate_vehicle_movement_db():
-    """Simulate movement for vehicles stored in the database"""
-    while True:
-        with app.app_context():
-            vehicles = Vehicle.query.filter(
-                Vehicle.current_lat.isnot(None),
-                Vehicle.current_lon.isnot(None)
-            ).all()
-
-            for vehicle in vehicles:
-                if vehicle.status == 'offline':
-                    continue
-
+def move_db_vehicles():
+    """Move every located vehicle in the database one step; returns their states"""
+    states = []
+    with app.app_context(), query_tracker.scope('tick:vehicle_movement', budget=2):
+        vehicles = Vehicle.query.filter(
+            Vehicle.current_lat.isnot(None),
+            Vehicle.current_lon.isnot(None)
+        ).all()
+
+        for vehicle in vehicles:
+            if vehicle.status != 'offline':
                 vehicle.current_lat += random.uniform(-0.0008, 0.0008)
                 vehicle.current_lon += random.uniform(-0.0008, 0.0008)
 
-                socketio.emit('vehicle_update', {
-                    'vehicle_id': vehicle.vehicle_number,
-                    'lat': vehicle.current_lat,
-                    'lon': vehicle.current_lon,
-                    'status': vehicle.status
-                })
+            # Offline vehicles are staged too so their status change is sent once
+            states.append(vehicle_state(
+                vehicle.vehicle_number, vehicle.current_lat, vehicle.current_lon,
+                vehicle.status, city=vehicle.city
+            ))
 
-            db.session.commit()
+        db.session.commit()
+    return states
+
+def simulate_vehicle_movement_db():
+    """Simulate movement for vehicles stored in the database"""
+    while True:
+        started = time.perf_counter()
+        # DB work runs off the hub under eventlet/gevent
+        states = offload(move_db_vehicles)
+
+        # One batched frame for the whole tick
+        broadcast_vehicle_tick(states)
+        observe_tick('vehicle_movement', time.perf_counter() - started, 5)
 
         time.sleep(5)  # Update every 5 seconds
 
@@ -371,15 +435,6 @@ def admin_dashboard():
 def analytics_dashboard():
     return render_template('analytics.html')
 
-def build_bins(values, edges, labels):
-    counts = [0] * (len(edges) - 1)
-    for value in values:
-        for i in range(len(edges) - 1):
-            if edges[i] <= value < edges[i + 1]:
-                counts[i] += 1
-                break
-    return {'labels': labels, 'values': counts}
-
 # ========================
 # API Endpoints
 # ========================
@@ -415,39 +470,70 @@ def estimate_fare():
     )
     
     now = datetime.now()
-    fare = calculate_fare(distance, city, now.hour)
+    surge = surge_engine.multiplier(city, pickup_loc['lat'], pickup_loc['lon'])
+    fare = calculate_fare(distance, city, now.hour, surge)
     
     return jsonify({
         'fare': fare,
         'distance': distance,
-        'currency': config['currency']
+        'currency': config['currency'],
+        'surge': surge
     })
 
+MAX_FARE_BATCH = 1000
+
+@app.route('/api/estimate-fare/batch', methods=['POST'])
+def estimate_fare_batch():
+    """Estimate fares for many trips in one call, priced as arrays (see fare_engine.py)"""
+    data = request.json
+    trips = data.get('trips') if isinstance(data, dict) else None
+    if not isinstance(trips, list) or not trips or len(trips) > MAX_FARE_BATCH:
+        return jsonify({'error': f'trips must be a list of 1-{MAX_FARE_BATCH} trips'}), 400
+    
+    now_hour = datetime.now().hour
+    try:
+        cities = [trip['city'] for trip in trips]
+        pickups, dropoffs = [], []
+        for trip, city in zip(trips, cities):
+            locations = get_city_config(city)['locations']
+            pickups.append(locations[trip['pickup_location']])
+            dropoffs.append(locations[trip['dropoff_location']])
+        hours = [int(trip.get('hour', now_hour)) for trip in trips]
+        distances = haversine_distance(
+            np.array([loc['lat'] for loc in pickups]), np.array([loc['lon'] for loc in pickups]),
+            np.array([loc['lat'] for loc in dropoffs]), np.array([loc['lon'] for loc in dropoffs])
+        )
+        city_ids = FARES.city_ids(cities)
+        surges = [surge_engine.multiplier(city, loc['lat'], loc['lon']) for city, loc in zip(cities, pickups)]
+        fares = FARES.price(distances, hours, city_ids,
+                            np.array([np.nan if surge is None else surge for surge in surges]))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid trips parameter: {e!r}'}), 400
+    
+    return jsonify({'fares': [
+        {'fare': fare, 'distance': distance, 'currency': FARES.currencies[city_id], 'surge': surge}
+        for fare, distance, city_id, surge in zip(fares.tolist(), distances.tolist(), city_ids.tolist(), surges)
+    ]})
+
 @app.route('/api/driver/summary')
+@dashboard_versions.conditional(lambda user_id: f'driver_{user_id}')
 @login_required
 def driver_summary():
     if current_user.role != 'driver':
         return jsonify({'error': 'Unauthorized'}), 403
 
-    today = datetime.now().date()
-    rides_query = Ride.query.filter(
-        Ride.driver_id == current_user.id,
-        db.func.date(Ride.created_at) == today
-    )
-
-    trips_today = rides_query.filter(Ride.status != 'cancelled').count()
-    earnings_today = rides_query.filter(Ride.status == 'completed') \
-        .with_entities(db.func.sum(Ride.fare)).scalar() or 0
-    minutes_today = rides_query.filter(Ride.status.in_(['completed', 'in_progress'])) \
-        .with_entities(db.func.sum(Ride.duration)).scalar() or 0
+    stats = db.session.get(DriverDailyStats, (current_user.id, datetime.now().date()))
+    if not stats:
+        return jsonify({'trips_today': 0, 'earnings_today': 0.0, 'online_hours': 0})
 
     return jsonify({
-        'trips_today': trips_today,
-        'earnings_today': float(earnings_today),
-        'online_hours': float(minutes_today) / 60 if minutes_today else 0
+        'trips_today': stats.total_rides - stats.cancelled,
+        'earnings_today': float(stats.completed_fare),
+        'online_hours': float(stats.active_minutes) / 60
     })
 
 @app.route('/api/customer/recent-rides')
+@dashboard_versions.conditional(lambda user_id: f'customer_{user_id}')
 @login_required
 def customer_recent_rides():
     if current_user.role != 'customer':
@@ -456,68 +542,31 @@ def customer_recent_rides():
     rides = Ride.query.filter_by(customer_id=current_user.id) \
         .order_by(Ride.created_at.desc()).limit(10).all()
 
-    return jsonify({
-        'rides': [
-            {
-                'date': r.created_at.strftime('%Y-%m-%d %H:%M') if r.created_at else '-',
-                'pickup_address': r.pickup_address or '-',
-                'dropoff_address': r.dropoff_address or '-',
-                'fare': float(r.fare or 0),
-                'status': r.status or 'unknown'
-            }
-            for r in rides
-        ]
-    })
+    return jsonify({'rides': [recent_ride_row(r.to_dict()) for r in rides]})
 
 @app.route('/api/analytics')
+@dashboard_versions.conditional('analytics')
 @login_required
 def get_analytics():
-    rides = Ride.query.order_by(Ride.created_at.desc()).all()
-
-    distances = [r.distance or 0 for r in rides]
-    durations = [r.duration or 0 for r in rides]
-    speeds = [
-        (r.distance / (r.duration / 60)) if r.distance and r.duration else 0
-        for r in rides
-    ]
-
-    total_trips = len(rides)
-    total_distance = sum(distances)
-    total_duration_minutes = sum(durations)
+    # Totals and histograms come from the city/day rollups; only the
+    # displayed trip rows are read from the rides table
+    totals = analytics_totals()
+    histograms = totals['histograms']
+
+    total_trips = totals['total_trips']
+    total_distance = totals['total_distance']
+    total_duration_minutes = totals['total_duration']
     total_duration_hours = total_duration_minutes / 60 if total_duration_minutes else 0
     avg_speed = (total_distance / total_duration_hours) if total_duration_hours else 0
 
-    distance_bins = build_bins(
-        distances,
-        [0, 5, 10, 15, 20, float('inf')],
-        ['0-5 km', '5-10 km', '10-15 km', '15-20 km', '20+ km']
-    )
-    duration_bins = build_bins(
-        durations,
-        [0, 10, 20, 30, 40, float('inf')],
-        ['0-10 min', '10-20 min', '20-30 min', '30-40 min', '40+ min']
-    )
-    speed_bins = build_bins(
-        speeds,
-        [0, 20, 40, 60, 80, float('inf')],
-        ['0-20', '20-40', '40-60', '60-80', '80+']
-    )
-
-    hourly_labels = ['00:00', '03:00', '06:00', '09:00', '12:00', '15:00', '18:00', '21:00']
-    hourly_values = [0] * len(hourly_labels)
-    for ride in rides:
-        if not ride.created_at:
-            continue
-        bucket = (ride.created_at.hour // 3)
-        if 0 <= bucket < len(hourly_values):
-            hourly_values[bucket] += 1
+    rides = Ride.query.order_by(Ride.created_at.desc()).limit(50).all()
 
     driver_ids = {r.driver_id for r in rides if r.driver_id}
     vehicles = Vehicle.query.filter(Vehicle.driver_id.in_(driver_ids)).all() if driver_ids else []
     vehicle_by_driver = {v.driver_id: v for v in vehicles}
 
     trip_rows = []
-    for ride in rides[:50]:
+    for ride in rides:
         vehicle = vehicle_by_driver.get(ride.driver_id)
         distance = ride.distance or 0
         duration = ride.duration or 0
@@ -539,13 +588,10 @@ def get_analytics():
             'avg_speed_kmh': float(avg_speed)
         },
         'charts': {
-            'distance_bins': distance_bins,
-            'duration_bins': duration_bins,
-            'speed_bins': speed_bins,
-            'hourly': {
-                'labels': hourly_labels,
-                'values': hourly_values
-            }
+            'distance_bins': histograms['distance'],
+            'duration_bins': histograms['duration'],
+            'speed_bins': histograms['speed'],
+            'hourly': histograms['hour']
         },
         'trips': trip_rows
     })
@@ -554,25 +600,31 @@ def get_analytics():
 @login_required
 def book_ride():
     """Book a new ride"""
-    data = request.json
-    city = data['city']
-    config = get_city_config(city)
-    
-    pickup_loc = config['locations'][data['pickup_location']]
-    dropoff_loc = config['locations'][data['dropoff_location']]
-    
-    distance = haversine_distance(
-        pickup_loc['lat'], pickup_loc['lon'],
-        dropoff_loc['lat'], dropoff_loc['lon']
-    )
+    with tracer.span('parse'):
+        data = request.json
+        city = data['city']
+        config = get_city_config(city)
+    
+    with tracer.span('location_lookup'):
+        pickup_loc = config['locations'][data['pickup_location']]
+        dropoff_loc = config['locations'][data['dropoff_location']]
+    
+    with tracer.span('haversine'):
+        distance = haversine_distance(
+            pickup_loc['lat'], pickup_loc['lon'],
+            dropoff_loc['lat'], dropoff_loc['lon']
+        )
     
     now = datetime.now()
-    fare = calculate_fare(distance, city, now.hour)
-    duration_sec, duration_min = predict_trip_duration(
-        pickup_loc['lat'], pickup_loc['lon'],
-        dropoff_loc['lat'], dropoff_loc['lon'],
-        now.hour, now.weekday(), now.month
-    )
+    with tracer.span('fare', city=city):
+        surge = surge_engine.multiplier(city, pickup_loc['lat'], pickup_loc['lon'])
+        fare = calculate_fare(distance, city, now.hour, surge)
+    with tracer.span('predict'):
+        duration_sec, duration_min = offload(tracer.wrap(predict_trip_duration),
+            pickup_loc['lat'], pickup_loc['lon'],
+            dropoff_loc['lat'], dropoff_loc['lon'],
+            now.hour, now.weekday(), now.month
+        )
     
     ride = Ride(
         customer_id=current_user.id,
@@ -589,18 +641,17 @@ def book_ride():
         status='pending'
     )
     
-    db.session.add(ride)
-    db.session.commit()
-    
-    # Add to pending rides
-    pending_rides.append(ride.id)
-    
-    # Notify drivers
-    socketio.emit('new_ride', ride.to_dict())
+    # The commit publishes ride events; their subscriber spans (emits) hang off this one
+    with tracer.span('db_commit') as span:
+        db.session.add(ride)
+        record_ride_transition(ride)
+        db.session.commit()
+        span.set('ride_id', ride.id)
     
     return jsonify({'success': True, 'ride': ride.to_dict()})
 
 @app.route('/api/driver/pending-rides')
+@dashboard_versions.conditional('pending_rides')
 @login_required
 def get_pending_rides():
     """Get pending ride requests for driver"""
@@ -621,19 +672,14 @@ def accept_ride(ride_id):
     if not ride or ride.status != 'pending':
         return jsonify({'success': False, 'message': 'Ride not available'})
     
+    old_status, old_driver_id = ride.status, ride.driver_id
     ride.driver_id = current_user.id
     ride.status = 'accepted'
     ride.accepted_at = datetime.utcnow()
+    record_ride_transition(ride, old_status, old_driver_id)
     
     db.session.commit()
     
-    # Remove from pending
-    if ride_id in pending_rides:
-        pending_rides.remove(ride_id)
-    
-    # Notify customer
-    socketio.emit('ride_update', {'ride_id': ride_id, 'status': 'accepted'})
-    
     return jsonify({'success': True, 'ride': ride.to_dict()})
 
 @app.route('/api/driver/status', methods=['POST'])
@@ -653,6 +699,7 @@ def update_driver_status():
     return jsonify({'success': True})
 
 @app.route('/api/admin/stats')
+@dashboard_versions.conditional('stats')
 @login_required
 def get_admin_stats():
     """Get statistics for admin dashboard"""
@@ -661,16 +708,17 @@ def get_admin_stats():
     
     city = request.args.get('city', 'all')
     
-    # Get today's rides
+    # Get today's rides from the daily rollup
     today = datetime.now().date()
-    query = Ride.query.filter(db.func.date(Ride.created_at) == today)
-    
     if city != 'all':
-        query = query.filter_by(city=city)
+        stats = db.session.get(CityDailyStats, (today, city))
+        day_stats = [stats] if stats else []
+    else:
+        day_stats = CityDailyStats.query.filter_by(day=today).all()
     
-    total_rides = query.count()
-    active_rides = query.filter_by(status='in_progress').count()
-    total_revenue = query.with_entities(db.func.sum(Ride.fare)).scalar() or 0
+    total_rides = sum(s.total_rides for s in day_stats)
+    active_rides = sum(s.in_progress for s in day_stats)
+    total_revenue = sum(s.booked_fare for s in day_stats)
     
     # Get driver stats
     vehicle_query = Vehicle.query
@@ -689,6 +737,7 @@ def get_admin_stats():
     })
 
 @app.route('/api/admin/vehicles')
+@query_budget(2)
 @login_required
 def get_all_vehicles():
     """Get all vehicles for admin"""
@@ -696,7 +745,7 @@ def get_all_vehicles():
         return jsonify({'error': 'Unauthorized'}), 403
     
     city = request.args.get('city', 'all')
-    vehicles_query = Vehicle.query
+    vehicles_query = Vehicle.query.options(joinedload(Vehicle.owner))
     if city != 'all':
         vehicles_query = vehicles_query.filter_by(city=city)
 
@@ -708,6 +757,26 @@ def get_all_vehicles():
     
     return jsonify({'vehicles': vehicles})
 
+# Long-lived structures reported by /api/admin/memory
+memory_inspector = MemoryInspector()
+memory_inspector.register('simulated_vehicles', lambda: simulated_vehicles)
+memory_inspector.register('vehicle_fanout', lambda: vehicle_fanout,
+                          count=lambda: vehicle_fanout.client_stats()['totals']['clients'])
+memory_inspector.register('ride_events_bus', lambda: ride_events_bus,
+                          count=lambda: sum(ride_events_bus.stats()['queue_depths']))
+memory_inspector.register('dashboard_versions', lambda: dashboard_versions)
+memory_inspector.register('request_profiler', lambda: request_profiler, count=lambda: len(request_profiler.summaries()))
+memory_inspector.register('query_tracker', lambda: query_tracker, count=lambda: len(query_tracker.stats()['routes']))
+memory_inspector.register('metrics', lambda: REGISTRY)
+memory_inspector.register('surge_engine', lambda: surge_engine, count=lambda: len(surge_engine))
+
+# Readiness probe and the /api/admin ops endpoints (see admin_ops.py)
+register_admin_routes(app, models=models, readiness=readiness, vehicle_fanout=vehicle_fanout,
+                      event_bus=ride_events_bus, query_tracker=query_tracker, tracer=tracer,
+                      surge_engine=surge_engine, surge_enabled=SURGE_ENABLED,
+                      memory_inspector=memory_inspector, stack_sampler=stack_sampler,
+                      request_profiler=request_profiler)
+
 @app.route('/api/admin/track/<vehicle_number>')
 @login_required
 def track_vehicle(vehicle_number):
@@ -728,18 +797,91 @@ def track_vehicle(vehicle_number):
         'location': {'lat': vehicle.current_lat, 'lon': vehicle.current_lon}
     })
 
+@app.route('/api/admin/export/rides')
+@login_required
+def export_rides():
+    """Stream full ride history as NDJSON or CSV (keyset paginated)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {export_format}'}), 400
+
+    city = request.args.get('city', 'all')
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+        after = parse_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid export parameter: {e}'}), 400
+
+    pages = iter_ride_pages(
+        city=None if city == 'all' else city,
+        since=since, until=until, after=after
+    )
+    body = stream_csv(pages) if export_format == 'csv' else stream_ndjson(pages)
+    filename = f"rides_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+# ========================
+# Ride Event Subscribers
+# ========================
+
+def notify_ride_participants(change):
+    """Driver/customer ride notifications, sent by the event bus after commit"""
+    ride = change.ride
+    if change.old_status is None:
+        socketio.emit('new_ride', ride)
+    elif ride['status'] == 'accepted':
+        socketio.emit('ride_update', {'ride_id': ride['id'], 'status': 'accepted'})
+
+ride_events_bus.subscribe(RideStatusChanged, notify_ride_participants)
+
+# Pending bookings and vehicle status changes feed the surge zones (see surge.py)
+if SURGE_ENABLED:
+    surge_engine.attach(ride_events_bus)
+
 # ========================
 # WebSocket Events
 # ========================
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     print('Client connected')
-    emit('connected', {'message': 'Connected to RideShare Pro server'})
+    SOCKETIO_CONNECTIONS.inc()
+    # Dashboard push rooms (see dashboard_push.py)
+    if current_user.is_authenticated:
+        if current_user.role == 'driver':
+            join_room('drivers')
+            join_room(f'driver_{current_user.id}')
+        elif current_user.role == 'customer':
+            join_room(f'customer_{current_user.id}')
+        elif current_user.role == 'admin':
+            join_room('admins')
+    wire = vehicle_fanout.negotiate(request.sid, auth)
+    emit('connected', {'message': 'Connected to RideShare Pro server', **wire})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    SOCKETIO_CONNECTIONS.dec()
+    vehicle_fanout.unsubscribe(request.sid)
+
+@socketio.on('subscribe_viewport')
+def handle_subscribe_viewport(data):
+    """Route vehicle updates to this client by its map bounds and zoom"""
+    try:
+        bounds, zoom = parse_viewport(data or {})
+    except (KeyError, TypeError, ValueError) as e:
+        return {'success': False, 'error': str(e)}
+    mode = vehicle_fanout.subscribe(request.sid, bounds, zoom)
+    return {'success': True, 'mode': mode}
 
 # ========================
 # Initialize Database
@@ -748,7 +890,7 @@ def handle_disconnect():
 def init_database():
     """Initialize database with sample data"""
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
         
         # Create admin user if not exists
         if not User.query.filter_by(username='admin').first():
@@ -767,9 +909,24 @@ def init_database():
 # Main Entry Point
 # ========================
 
-if __name__ == '__main__':
+def start_services():
+    """Database, tick relay and vehicle simulation for this process (also used by serve.py)"""
+    models.warm_in_background(offload)
     init_database()
-    start_vehicle_movement_thread()
+    if vehicle_ticks is not None:
+        vehicle_ticks.start(apply_vehicle_tick)
+
+    # SIMULATION_MODE: local (default), off (extra workers behind a message
+    # queue) or only (a separate simulator process that serves no clients)
+    simulation_mode = os.environ.get('SIMULATION_MODE', 'local')
+    if simulation_mode == 'only':
+        print(f"✓ Vehicle simulator publishing to {MESSAGE_QUEUE_URL or 'this process'}")
+        simulate_vehicle_movement_db()
+    elif simulation_mode == 'local':
+        start_vehicle_movement_thread()
+
+if __name__ == '__main__':
+    start_services()
     
     print("\n" + "="*80)
     print("RIDESHARE PRO - GPS VEHICLE TRACKING SYSTEM")
@@ -790,4 +947,6 @@ if __name__ == '__main__':
     print("="*80 + "\n")
     
     port = int(os.environ.get('FLASK_PORT', 5000))
-    socketio.run(app, debug=False, use_reloader=False, host='127.0.0.1', port=port)
+    # Development entry point; use serve.py for eventlet/gevent
+    socketio.run(app, debug=False, use_reloader=False, host='127.0.0.1', port=port,
+                 **run_options(async_mode()))
@@ -8,8 +8,6 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from functools import wraps
-import pickle
-import pandas as pd
 import numpy as np
 import json
 import time
@@ -19,7 +17,26 @@ import random
 import os
 
 # Import models and configurations
-from models import db, User, Vehicle, Ride
+from models import db, User, Vehicle, Ride, CityDailyStats, DriverDailyStats
+from migrate_database import upgrade_schema
+from rollups import record_ride_transition, analytics_totals
+from ride_simulator import RideSimulationEngine
+from vehicle_fanout import VehicleBatchFanout, parse_viewport, vehicle_state
+from message_queue import message_queue_url, socketio_options, VehicleTickRelay
+from serve import async_mode, offload, run_options
+from ride_events import EventBus, RideStatusChanged, capture_commits
+from dashboard_push import ChangeVersions, DashboardPush, recent_ride_row
+from query_tracker import QueryTracker, query_budget
+from memory_stats import MemoryInspector
+from tracing import tracer_from_env
+from startup import MODELS_DIR, ModelStore, serving_readiness
+from admin_ops import register_admin_routes
+from surge import SurgeEngine
+from profiling import StackSampler, RequestProfiler, parse_route_rates
+from metrics import (instrument_app, instrument_socketio, instrument_db, observe_tick,
+                     PREDICT_STAGE_SECONDS, SOCKETIO_CONNECTIONS, REGISTRY)
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
 from city_config import (
     get_city_config, get_vehicles_for_city, calculate_fare,
     get_location_by_name, get_all_locations
@@ -28,44 +45,57 @@ from city_config import (
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database/tracking.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database/tracking.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize extensions
 db.init_app(app)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# SOCKETIO_MESSAGE_QUEUE enables multi-worker mode (see message_queue.py)
+MESSAGE_QUEUE_URL = message_queue_url()
+# SOCKETIO_ASYNC_MODE is set by serve.py (eventlet/gevent); threading otherwise
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode(), **socketio_options(MESSAGE_QUEUE_URL))
+# Prometheus metrics at /metrics (see metrics.py)
+instrument_app(app)
+instrument_socketio(socketio)
+instrument_db()
+vehicle_fanout = VehicleBatchFanout(socketio)
+vehicle_ticks = VehicleTickRelay(MESSAGE_QUEUE_URL) if MESSAGE_QUEUE_URL else None
+# Stage spans for the booking/prediction routes, followed into event
+# subscribers; TRACE_EXPORT ships them (see tracing.py)
+tracer = tracer_from_env('app_new')
+tracer.install(app, paths={'/api/predict', '/api/book_ride', '/api/start_ride/<int:ride_id>'})
+# Committed ride/vehicle status changes are published here (see ride_events.py)
+ride_events_bus = EventBus(tracer=tracer)
+capture_commits(ride_events_bus)
+# -> dashboard deltas + ETag versions
+dashboard_versions = ChangeVersions(MESSAGE_QUEUE_URL)
+dashboard_push = DashboardPush(socketio, dashboard_versions, ride_events_bus)
+# Live zone fare multipliers fed by bookings and vehicle ticks; SURGE_PRICING=off
+# keeps the static hour multipliers (see surge.py)
+surge_engine = SurgeEngine()
+SURGE_ENABLED = os.environ.get('SURGE_PRICING', 'on') != 'off'
+# Live profiling under /api/admin/profile (see profiling.py)
+stack_sampler = StackSampler()
+request_profiler = RequestProfiler(parse_route_rates(os.environ.get('PROFILE_ROUTES')),
+                                   token=os.environ.get('PROFILE_TOKEN'))
+request_profiler.install(app, lambda: current_user.is_authenticated and current_user.role == 'admin')
+# Statement counts per request/tick; @query_budget overruns fail under app.testing
+query_tracker = QueryTracker()
+query_tracker.install(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 
-# Load ML models
-print("Loading ML models...")
-try:
-    with open('Models/xgboost_model.pkl', 'rb') as f:
-        xgb_model = pickle.load(f)
-    
-    with open('Models/random_forest_model (1).pkl', 'rb') as f:
-        rf_model = pickle.load(f)
-    
-    with open('Models/kmeans_start.pkl', 'rb') as f:
-        kmeans_start = pickle.load(f)
-    
-    with open('Models/kmeans_end.pkl', 'rb') as f:
-        kmeans_end = pickle.load(f)
-    
-    with open('Models/feature_columns.pkl', 'rb') as f:
-        feature_columns = pickle.load(f)
-    
-    print("✓ All ML models loaded successfully!")
-except Exception as e:
-    print(f"⚠ Warning: Could not load ML models: {e}")
-    xgb_model = None
+# Trained models load on first use; start_services() warms them in the
+# background so importing the app stays cheap (see startup.py)
+models = ModelStore(MODELS_DIR)
+
+# Readiness probe for load balancers (/ready): 503 until models, pandas and the database are warm
+readiness = serving_readiness(models, db)
 
 # Global variables
-active_vehicles = {}
-active_rides = {}
 vehicle_movement_thread_started = False
 
 # User loader for Flask-Login
@@ -117,30 +147,52 @@ def interpolate_route(start_lat, start_lon, end_lat, end_lon, num_points=50):
     lons += noise_lon
     return list(zip(lats, lons))
 
-def simulate_vehicle_movement_db():
-    """Simulate movement for vehicles stored in the database"""
-    while True:
-        with app.app_context():
-            vehicles = Vehicle.query.filter(
-                Vehicle.current_lat.isnot(None),
-                Vehicle.current_lon.isnot(None)
-            ).all()
-
-            for vehicle in vehicles:
-                if vehicle.status == 'offline':
-                    continue
-
+def broadcast_vehicle_tick(states):
+    """Hand one tick of vehicle states to the fan-out of every worker"""
+    if vehicle_ticks is not None:
+        vehicle_ticks.publish(states)
+    else:
+        apply_vehicle_tick(states)
+
+def apply_vehicle_tick(states):
+    """One tick of vehicle states (local or relayed): fan-out frames and surge supply"""
+    vehicle_fanout.apply_tick(states)
+    if SURGE_ENABLED:
+        surge_engine.observe_tick(states)
+
+def move_db_vehicles():
+    """Move every located vehicle in the database one step; returns their states"""
+    states = []
+    with app.app_context(), query_tracker.scope('tick:vehicle_movement', budget=2):
+        vehicles = Vehicle.query.filter(
+            Vehicle.current_lat.isnot(None),
+            Vehicle.current_lon.isnot(None)
+        ).all()
+
+        for vehicle in vehicles:
+            if vehicle.status != 'offline':
                 vehicle.current_lat += random.uniform(-0.0008, 0.0008)
                 vehicle.current_lon += random.uniform(-0.0008, 0.0008)
 
-                socketio.emit('vehicle_update', {
-                    'vehicle_id': vehicle.vehicle_number,
-                    'lat': vehicle.current_lat,
-                    'lon': vehicle.current_lon,
-                    'status': vehicle.status
-                })
+            # Offline vehicles are staged too so their status change is sent once
+            states.append(vehicle_state(
+                vehicle.vehicle_number, vehicle.current_lat, vehicle.current_lon,
+                vehicle.status, city=vehicle.city
+            ))
 
-            db.session.commit()
+        db.session.commit()
+    return states
+
+def simulate_vehicle_movement_db():
+    """Simulate movement for vehicles stored in the database"""
+    while True:
+        started = time.perf_counter()
+        # DB work runs off the hub under eventlet/gevent
+        states = offload(move_db_vehicles)
+
+        # One batched frame for the whole tick
+        broadcast_vehicle_tick(states)
+        observe_tick('vehicle_movement', time.perf_counter() - started, 5)
 
         time.sleep(5)  # Update every 5 seconds
 
@@ -156,34 +208,41 @@ def start_vehicle_movement_thread():
 
 def predict_trip_duration(start_lat, start_lon, end_lat, end_lon, hour, day_of_week, month):
     """Predict trip duration using trained model"""
+    xgb_model = models.get('xgb_model', None)
     if xgb_model is None:
         distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
         avg_speed = 30
         duration_seconds = (distance / avg_speed) * 3600
         return duration_seconds, duration_seconds / 60
     
-    distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
-    bearing = calculate_bearing(start_lat, start_lon, end_lat, end_lon)
-    num_points = max(2, int(distance * 10))
-    straightness = 0.8
-    is_weekend = 1 if day_of_week in [5, 6] else 0
-    is_rush_hour = 1 if hour in [7, 8, 9, 17, 18, 19] else 0
-    
-    try:
-        start_cluster = kmeans_start.predict([[start_lat, start_lon]])[0]
-        end_cluster = kmeans_end.predict([[end_lat, end_lon]])[0]
-    except:
-        start_cluster = 0
-        end_cluster = 0
+    with PREDICT_STAGE_SECONDS.labels('features').time(), tracer.span('haversine_bearing'):
+        distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
+        bearing = calculate_bearing(start_lat, start_lon, end_lat, end_lon)
+        num_points = max(2, int(distance * 10))
+        straightness = 0.8
+        is_weekend = 1 if day_of_week in [5, 6] else 0
+        is_rush_hour = 1 if hour in [7, 8, 9, 17, 18, 19] else 0
     
-    features = pd.DataFrame([[
-        start_lat, start_lon, end_lat, end_lon,
-        distance, bearing, straightness, num_points,
-        hour, day_of_week, month, is_weekend, is_rush_hour,
-        start_cluster, end_cluster
-    ]], columns=feature_columns)
+    with PREDICT_STAGE_SECONDS.labels('clustering').time(), tracer.span('cluster_lookup'):
+        try:
+            start_cluster = models.get('kmeans_start').predict([[start_lat, start_lon]])[0]
+            end_cluster = models.get('kmeans_end').predict([[end_lat, end_lon]])[0]
+        except:
+            start_cluster = 0
+            end_cluster = 0
     
-    duration_seconds = xgb_model.predict(features)[0]
+    with PREDICT_STAGE_SECONDS.labels('model').time():
+        with tracer.span('feature_frame'):
+            import pandas as pd
+            features = pd.DataFrame([[
+                start_lat, start_lon, end_lat, end_lon,
+                distance, bearing, straightness, num_points,
+                hour, day_of_week, month, is_weekend, is_rush_hour,
+                start_cluster, end_cluster
+            ]], columns=models.get('feature_columns'))
+        
+        with tracer.span('model'):
+            duration_seconds = xgb_model.predict(features)[0]
     return duration_seconds, duration_seconds / 60
 
 # Authentication Routes
@@ -307,17 +366,9 @@ def admin_dashboard():
 def analytics_dashboard():
     return render_template('analytics.html')
 
-def build_bins(values, edges, labels):
-    counts = [0] * (len(edges) - 1)
-    for value in values:
-        for i in range(len(edges) - 1):
-            if edges[i] <= value < edges[i + 1]:
-                counts[i] += 1
-                break
-    return {'labels': labels, 'values': counts}
-
 # API Routes
 @app.route('/api/admin/stats')
+@dashboard_versions.conditional('stats')
 @login_required
 def get_admin_stats():
     """Get statistics for admin dashboard"""
@@ -327,13 +378,15 @@ def get_admin_stats():
     city = request.args.get('city', 'all')
 
     today = datetime.now().date()
-    query = Ride.query.filter(db.func.date(Ride.created_at) == today)
     if city != 'all':
-        query = query.filter_by(city=city)
+        stats = db.session.get(CityDailyStats, (today, city))
+        day_stats = [stats] if stats else []
+    else:
+        day_stats = CityDailyStats.query.filter_by(day=today).all()
 
-    total_rides = query.count()
-    active_rides = query.filter_by(status='in_progress').count()
-    total_revenue = query.with_entities(db.func.sum(Ride.fare)).scalar() or 0
+    total_rides = sum(s.total_rides for s in day_stats)
+    active_rides = sum(s.in_progress for s in day_stats)
+    total_revenue = sum(s.booked_fare for s in day_stats)
 
     vehicle_query = Vehicle.query
     if city != 'all':
@@ -351,6 +404,7 @@ def get_admin_stats():
     })
 
 @app.route('/api/admin/vehicles')
+@query_budget(2)
 @login_required
 def get_all_vehicles():
     """Get all vehicles for admin"""
@@ -358,7 +412,7 @@ def get_all_vehicles():
         return jsonify({'error': 'Unauthorized'}), 403
 
     city = request.args.get('city', 'all')
-    vehicles_query = Vehicle.query
+    vehicles_query = Vehicle.query.options(joinedload(Vehicle.owner))
     if city != 'all':
         vehicles_query = vehicles_query.filter_by(city=city)
 
@@ -370,6 +424,26 @@ def get_all_vehicles():
 
     return jsonify({'vehicles': vehicles})
 
+# Long-lived structures reported by /api/admin/memory
+memory_inspector = MemoryInspector()
+memory_inspector.register('ride_engine', lambda: ride_engine, count=lambda: ride_engine.active_count)
+memory_inspector.register('vehicle_fanout', lambda: vehicle_fanout,
+                          count=lambda: vehicle_fanout.client_stats()['totals']['clients'])
+memory_inspector.register('ride_events_bus', lambda: ride_events_bus,
+                          count=lambda: sum(ride_events_bus.stats()['queue_depths']))
+memory_inspector.register('dashboard_versions', lambda: dashboard_versions)
+memory_inspector.register('request_profiler', lambda: request_profiler, count=lambda: len(request_profiler.summaries()))
+memory_inspector.register('query_tracker', lambda: query_tracker, count=lambda: len(query_tracker.stats()['routes']))
+memory_inspector.register('metrics', lambda: REGISTRY)
+memory_inspector.register('surge_engine', lambda: surge_engine, count=lambda: len(surge_engine))
+
+# Readiness probe and the /api/admin ops endpoints (see admin_ops.py)
+register_admin_routes(app, models=models, readiness=readiness, vehicle_fanout=vehicle_fanout,
+                      event_bus=ride_events_bus, query_tracker=query_tracker, tracer=tracer,
+                      surge_engine=surge_engine, surge_enabled=SURGE_ENABLED,
+                      memory_inspector=memory_inspector, stack_sampler=stack_sampler,
+                      request_profiler=request_profiler)
+
 @app.route('/api/admin/track/<vehicle_number>')
 @login_required
 def track_vehicle(vehicle_number):
@@ -391,54 +465,28 @@ def track_vehicle(vehicle_number):
     })
 
 @app.route('/api/analytics')
+@dashboard_versions.conditional('analytics')
 @login_required
 def get_analytics():
-    rides = Ride.query.order_by(Ride.created_at.desc()).all()
-
-    distances = [r.distance or 0 for r in rides]
-    durations = [r.duration or 0 for r in rides]
-    speeds = [
-        (r.distance / (r.duration / 60)) if r.distance and r.duration else 0
-        for r in rides
-    ]
-
-    total_trips = len(rides)
-    total_distance = sum(distances)
-    total_duration_minutes = sum(durations)
+    # Totals and histograms come from the city/day rollups; only the
+    # displayed trip rows are read from the rides table
+    totals = analytics_totals()
+    histograms = totals['histograms']
+
+    total_trips = totals['total_trips']
+    total_distance = totals['total_distance']
+    total_duration_minutes = totals['total_duration']
     total_duration_hours = total_duration_minutes / 60 if total_duration_minutes else 0
     avg_speed = (total_distance / total_duration_hours) if total_duration_hours else 0
 
-    distance_bins = build_bins(
-        distances,
-        [0, 5, 10, 15, 20, float('inf')],
-        ['0-5 km', '5-10 km', '10-15 km', '15-20 km', '20+ km']
-    )
-    duration_bins = build_bins(
-        durations,
-        [0, 10, 20, 30, 40, float('inf')],
-        ['0-10 min', '10-20 min', '20-30 min', '30-40 min', '40+ min']
-    )
-    speed_bins = build_bins(
-        speeds,
-        [0, 20, 40, 60, 80, float('inf')],
-        ['0-20', '20-40', '40-60', '60-80', '80+']
-    )
-
-    hourly_labels = ['00:00', '03:00', '06:00', '09:00', '12:00', '15:00', '18:00', '21:00']
-    hourly_values = [0] * len(hourly_labels)
-    for ride in rides:
-        if not ride.created_at:
-            continue
-        bucket = (ride.created_at.hour // 3)
-        if 0 <= bucket < len(hourly_values):
-            hourly_values[bucket] += 1
+    rides = Ride.query.order_by(Ride.created_at.desc()).limit(50).all()
 
     driver_ids = {r.driver_id for r in rides if r.driver_id}
     vehicles = Vehicle.query.filter(Vehicle.driver_id.in_(driver_ids)).all() if driver_ids else []
     vehicle_by_driver = {v.driver_id: v for v in vehicles}
 
     trip_rows = []
-    for ride in rides[:50]:
+    for ride in rides:
         vehicle = vehicle_by_driver.get(ride.driver_id)
         distance = ride.distance or 0
         duration = ride.duration or 0
@@ -460,42 +508,33 @@ def get_analytics():
             'avg_speed_kmh': float(avg_speed)
         },
         'charts': {
-            'distance_bins': distance_bins,
-            'duration_bins': duration_bins,
-            'speed_bins': speed_bins,
-            'hourly': {
-                'labels': hourly_labels,
-                'values': hourly_values
-            }
+            'distance_bins': histograms['distance'],
+            'duration_bins': histograms['duration'],
+            'speed_bins': histograms['speed'],
+            'hourly': histograms['hour']
         },
         'trips': trip_rows
     })
 
 @app.route('/api/driver/summary')
+@dashboard_versions.conditional(lambda user_id: f'driver_{user_id}')
 @login_required
 def driver_summary():
     if current_user.role != 'driver':
         return jsonify({'error': 'Unauthorized'}), 403
 
-    today = datetime.now().date()
-    rides_query = Ride.query.filter(
-        Ride.driver_id == current_user.id,
-        db.func.date(Ride.created_at) == today
-    )
-
-    trips_today = rides_query.filter(Ride.status != 'cancelled').count()
-    earnings_today = rides_query.filter(Ride.status == 'completed') \
-        .with_entities(db.func.sum(Ride.fare)).scalar() or 0
-    minutes_today = rides_query.filter(Ride.status.in_(['completed', 'in_progress'])) \
-        .with_entities(db.func.sum(Ride.duration)).scalar() or 0
+    stats = db.session.get(DriverDailyStats, (current_user.id, datetime.now().date()))
+    if not stats:
+        return jsonify({'trips_today': 0, 'earnings_today': 0.0, 'online_hours': 0})
 
     return jsonify({
-        'trips_today': trips_today,
-        'earnings_today': float(earnings_today),
-        'online_hours': float(minutes_today) / 60 if minutes_today else 0
+        'trips_today': stats.total_rides - stats.cancelled,
+        'earnings_today': float(stats.completed_fare),
+        'online_hours': float(stats.active_minutes) / 60
     })
 
 @app.route('/api/customer/recent-rides')
+@dashboard_versions.conditional(lambda user_id: f'customer_{user_id}')
 @login_required
 def customer_recent_rides():
     if current_user.role != 'customer':
@@ -504,18 +543,7 @@ def customer_recent_rides():
     rides = Ride.query.filter_by(customer_id=current_user.id) \
         .order_by(Ride.created_at.desc()).limit(10).all()
 
-    return jsonify({
-        'rides': [
-            {
-                'date': r.created_at.strftime('%Y-%m-%d %H:%M') if r.created_at else '-',
-                'pickup_address': r.pickup_address or '-',
-                'dropoff_address': r.dropoff_address or '-',
-                'fare': float(r.fare or 0),
-                'status': r.status or 'unknown'
-            }
-            for r in rides
-        ]
-    })
+    return jsonify({'rides': [recent_ride_row(r.to_dict()) for r in rides]})
 
 @app.route('/api/cities')
 def get_cities():
@@ -539,43 +567,53 @@ def get_available_vehicles(city_name):
 @app.route('/api/predict', methods=['POST'])
 @login_required
 def predict():
-    data = request.json
-    start_lat = float(data['start_lat'])
-    start_lon = float(data['start_lon'])
-    end_lat = float(data['end_lat'])
-    end_lon = float(data['end_lon'])
-    city = data.get('city', 'bangalore')
+    with tracer.span('parse'):
+        data = request.json
+        start_lat = float(data['start_lat'])
+        start_lon = float(data['start_lon'])
+        end_lat = float(data['end_lat'])
+        end_lon = float(data['end_lon'])
+        city = data.get('city', 'bangalore')
     
     now = datetime.now()
     hour = now.hour
     day_of_week = now.weekday()
     month = now.month
     
-    duration_sec, duration_min = predict_trip_duration(start_lat, start_lon, end_lat, end_lon, hour, day_of_week, month)
-    distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
+    with tracer.span('predict'):
+        duration_sec, duration_min = offload(tracer.wrap(predict_trip_duration),
+                                             start_lat, start_lon, end_lat, end_lon, hour, day_of_week, month)
+    with tracer.span('haversine'):
+        distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
     avg_speed = (distance / duration_sec) * 3600 if duration_sec > 0 else 0
-    fare = calculate_fare(distance, city, hour)
+    with tracer.span('fare', city=city):
+        surge = surge_engine.multiplier(city, start_lat, start_lon)
+        fare = calculate_fare(distance, city, hour, surge)
     
     return jsonify({
         'success': True, 'duration_seconds': float(duration_sec), 'duration_minutes': float(duration_min),
-        'distance_km': float(distance), 'avg_speed_kmh': float(avg_speed), 'fare': float(fare),
+        'distance_km': float(distance), 'avg_speed_kmh': float(avg_speed), 'fare': float(fare), 'surge': surge,
         'eta': (now.timestamp() + duration_sec) * 1000
     })
 
 @app.route('/api/book_ride', methods=['POST'])
 @role_required('customer')
 def book_ride():
-    data = request.json
-    ride = Ride(
-        customer_id=current_user.id, pickup_lat=float(data['pickup_lat']), pickup_lon=float(data['pickup_lon']),
-        pickup_address=data.get('pickup_address', ''), dropoff_lat=float(data['dropoff_lat']), 
-        dropoff_lon=float(data['dropoff_lon']), dropoff_address=data.get('dropoff_address', ''),
-        city=data.get('city', 'bangalore'), distance=float(data.get('distance', 0)),
-        duration=float(data.get('duration', 0)), fare=float(data.get('fare', 0)), status='pending'
-    )
-    db.session.add(ride)
-    db.session.commit()
-    socketio.emit('new_ride', ride.to_dict(), room='drivers')
+    with tracer.span('parse'):
+        data = request.json
+        ride = Ride(
+            customer_id=current_user.id, pickup_lat=float(data['pickup_lat']), pickup_lon=float(data['pickup_lon']),
+            pickup_address=data.get('pickup_address', ''), dropoff_lat=float(data['dropoff_lat']), 
+            dropoff_lon=float(data['dropoff_lon']), dropoff_address=data.get('dropoff_address', ''),
+            city=data.get('city', 'bangalore'), distance=float(data.get('distance', 0)),
+            duration=float(data.get('duration', 0)), fare=float(data.get('fare', 0)), status='pending'
+        )
+    # The commit publishes ride events; their subscriber spans (emits) hang off this one
+    with tracer.span('db_commit') as span:
+        db.session.add(ride)
+        record_ride_transition(ride)
+        db.session.commit()
+        span.set('ride_id', ride.id)
     return jsonify({'success': True, 'ride_id': ride.id, 'message': 'Ride booked successfully'})
 
 @app.route('/api/accept_ride/<int:ride_id>', methods=['POST'])
@@ -584,14 +622,15 @@ def accept_ride(ride_id):
     ride = Ride.query.get_or_404(ride_id)
     if ride.status != 'pending':
         return jsonify({'success': False, 'message': 'Ride already accepted'}), 400
+    old_status, old_driver_id = ride.status, ride.driver_id
     ride.driver_id = current_user.id
     ride.status = 'accepted'
     ride.accepted_at = datetime.utcnow()
+    record_ride_transition(ride, old_status, old_driver_id)
     vehicle = Vehicle.query.filter_by(driver_id=current_user.id).first()
     if vehicle:
         vehicle.status = 'busy'
     db.session.commit()
-    socketio.emit('ride_accepted', ride.to_dict(), room=f'customer_{ride.customer_id}')
     return jsonify({'success': True, 'ride': ride.to_dict()})
 
 @app.route('/api/start_ride/<int:ride_id>', methods=['POST'])
@@ -600,13 +639,13 @@ def start_ride(ride_id):
     ride = Ride.query.get_or_404(ride_id)
     if ride.driver_id != current_user.id:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    old_status = ride.status
     ride.status = 'in_progress'
     ride.started_at = datetime.utcnow()
-    db.session.commit()
-    socketio.emit('ride_started', ride.to_dict(), room=f'customer_{ride.customer_id}')
-    thread = threading.Thread(target=simulate_ride, args=(ride_id,))
-    thread.daemon = True
-    thread.start()
+    record_ride_transition(ride, old_status, ride.driver_id)
+    # simulate_ride picks the ride up from this commit's event, inside this trace
+    with tracer.span('db_commit', ride_id=ride_id):
+        db.session.commit()
     return jsonify({'success': True, 'ride': ride.to_dict()})
 
 @app.route('/api/complete_ride/<int:ride_id>', methods=['POST'])
@@ -615,14 +654,15 @@ def complete_ride(ride_id):
     ride = Ride.query.get_or_404(ride_id)
     if ride.driver_id != current_user.id:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    old_status = ride.status
     ride.status = 'completed'
     ride.completed_at = datetime.utcnow()
+    record_ride_transition(ride, old_status, ride.driver_id)
     vehicle = Vehicle.query.filter_by(driver_id=current_user.id).first()
     if vehicle:
         vehicle.status = 'available'
         vehicle.total_trips += 1
     db.session.commit()
-    socketio.emit('ride_completed', ride.to_dict(), room=f'customer_{ride.customer_id}')
     return jsonify({'success': True, 'ride': ride.to_dict()})
 
 @app.route('/api/cancel_ride/<int:ride_id>', methods=['POST'])
@@ -631,7 +671,9 @@ def cancel_ride(ride_id):
     ride = Ride.query.get_or_404(ride_id)
     if ride.customer_id != current_user.id and ride.driver_id != current_user.id:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    old_status = ride.status
     ride.status = 'cancelled'
+    record_ride_transition(ride, old_status, ride.driver_id)
     if ride.driver_id:
         vehicle = Vehicle.query.filter_by(driver_id=ride.driver_id).first()
         if vehicle:
@@ -639,51 +681,97 @@ def cancel_ride(ride_id):
     db.session.commit()
     return jsonify({'success': True, 'message': 'Ride cancelled'})
 
-def simulate_ride(ride_id):
-    """Simulate GPS updates for a ride"""
-    ride = Ride.query.get(ride_id)
-    if not ride:
-        return
-    route = interpolate_route(ride.pickup_lat, ride.pickup_lon, ride.dropoff_lat, ride.dropoff_lon, num_points=100)
-    for i, (lat, lon) in enumerate(route):
-        time.sleep(0.5)
-        ride = Ride.query.get(ride_id)
-        if not ride or ride.status != 'in_progress':
-            break
-        progress = (i / len(route)) * 100
-        vehicle = Vehicle.query.filter_by(driver_id=ride.driver_id).first()
-        vehicle_id = vehicle.vehicle_number if vehicle else f'RIDE-{ride_id}'
-        gps_data = {
-            'ride_id': ride_id,
-            'vehicle_id': vehicle_id,
-            'vehicle_status': vehicle.status if vehicle else 'busy',
-            'latitude': lat,
-            'longitude': lon,
-            'progress': progress,
-            'timestamp': datetime.now().isoformat()
-        }
-        if vehicle:
-            vehicle.current_lat = lat
-            vehicle.current_lon = lon
-            db.session.commit()
-        socketio.emit('gps_update', gps_data, room=f'ride_{ride_id}')
-        socketio.emit('gps_update', gps_data, room='admins')
+def emit_ride_positions(updates):
+    """Queue one tick of ride positions: per-ride rooms plus one batch for admins"""
+    vehicle_fanout.emit_latest('gps_update', [
+        (f"ride_{gps_data['ride_id']}", gps_data['ride_id'], gps_data) for gps_data in updates
+    ])
+    vehicle_fanout.emit_gps_batch(updates, room='admins')
+
+def persist_vehicle_positions(rows):
+    """Bulk UPDATE of vehicle positions from the simulation engine"""
+    with app.app_context(), query_tracker.scope('tick:ride_engine', budget=1):
+        db.session.execute(update(Vehicle), rows)
+        db.session.commit()
+
+def record_ride_simulation(ride_id, trace, added_ns, finished):
+    """The whole simulated trip as one span of the trace that started the ride"""
+    tracer.record('ride_simulation', trace, added_ns, time.time_ns(), ride_id=ride_id, finished=bool(finished))
+
+# One engine thread advances every in-progress ride; its bulk UPDATEs run
+# off the hub under eventlet/gevent
+ride_engine = RideSimulationEngine(emit=emit_ride_positions,
+                                   persist=lambda rows: offload(persist_vehicle_positions, rows),
+                                   on_tick=lambda seconds: observe_tick('ride_engine', seconds, ride_engine.tick_interval),
+                                   on_ride_end=record_ride_simulation)
+
+# Ride lifecycle subscribers: run on the event bus workers after the commit,
+# in commit order per ride
+RIDE_NOTIFICATIONS = {'accepted': 'ride_accepted', 'in_progress': 'ride_started', 'completed': 'ride_completed'}
+
+def notify_ride_participants(change):
+    """New rides to drivers, status changes to the ride's customer"""
+    ride = change.ride
+    if change.old_status is None:
+        socketio.emit('new_ride', ride, room='drivers')
+    elif ride['status'] in RIDE_NOTIFICATIONS:
+        socketio.emit(RIDE_NOTIFICATIONS[ride['status']], ride, room=f"customer_{ride['customer_id']}")
+
+def simulate_ride(change):
+    """Add a started ride to the simulation engine; drop it once completed or cancelled"""
+    ride = change.ride
+    if ride['status'] == 'in_progress':
+        with app.app_context():
+            vehicle = Vehicle.query.filter_by(driver_id=ride['driver_id']).first()
+            vehicle_info = dict(
+                vehicle_pk=vehicle.id if vehicle else None,
+                vehicle_number=vehicle.vehicle_number if vehicle else None,
+                vehicle_status=vehicle.status if vehicle else 'busy'
+            )
+        route = interpolate_route(ride['pickup_lat'], ride['pickup_lon'], ride['dropoff_lat'], ride['dropoff_lon'],
+                                  num_points=100)
+        ride_engine.add_ride(ride['id'], route, trace=tracer.current(), **vehicle_info)
+        ride_engine.start()
+    elif ride['status'] in ('completed', 'cancelled'):
+        ride_engine.remove_ride(ride['id'])
+
+ride_events_bus.subscribe(RideStatusChanged, notify_ride_participants)
+ride_events_bus.subscribe(RideStatusChanged, simulate_ride)
+
+# Pending bookings and vehicle status changes feed the surge zones (see surge.py)
+if SURGE_ENABLED:
+    surge_engine.attach(ride_events_bus)
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     print(f'Client connected: {request.sid}')
+    SOCKETIO_CONNECTIONS.inc()
     if current_user.is_authenticated:
         if current_user.role == 'driver':
             join_room('drivers')
+            join_room(f'driver_{current_user.id}')
         elif current_user.role == 'customer':
             join_room(f'customer_{current_user.id}')
         elif current_user.role == 'admin':
             join_room('admins')
-    emit('connected', {'data': 'Connected to server'})
+    wire = vehicle_fanout.negotiate(request.sid, auth)
+    emit('connected', {'data': 'Connected to server', **wire})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f'Client disconnected: {request.sid}')
+    SOCKETIO_CONNECTIONS.dec()
+    vehicle_fanout.unsubscribe(request.sid)
+
+@socketio.on('subscribe_viewport')
+def handle_subscribe_viewport(data):
+    """Route vehicle updates to this client by its map bounds and zoom"""
+    try:
+        bounds, zoom = parse_viewport(data or {})
+    except (KeyError, TypeError, ValueError) as e:
+        return {'success': False, 'error': str(e)}
+    mode = vehicle_fanout.subscribe(request.sid, bounds, zoom)
+    return {'success': True, 'mode': mode}
 
 @socketio.on('join_ride')
 def handle_join_ride(data):
@@ -699,13 +787,29 @@ def handle_leave_ride(data):
         leave_room(f'ride_{ride_id}')
         emit('left_ride', {'ride_id': ride_id})
 
-if __name__ == '__main__':
+def start_services():
+    """Schema upgrade, tick relay and vehicle simulation for this process (also used by serve.py)"""
+    models.warm_in_background(offload)
     with app.app_context():
-        db.create_all()
-    start_vehicle_movement_thread()
+        upgrade_schema()
+    if vehicle_ticks is not None:
+        vehicle_ticks.start(apply_vehicle_tick)
+
+    # SIMULATION_MODE: local (default), off (extra workers behind a message
+    # queue) or only (a separate simulator process that serves no clients)
+    simulation_mode = os.environ.get('SIMULATION_MODE', 'local')
+    if simulation_mode == 'only':
+        print(f"✓ Vehicle simulator publishing to {MESSAGE_QUEUE_URL or 'this process'}")
+        simulate_vehicle_movement_db()
+    elif simulation_mode == 'local':
+        start_vehicle_movement_thread()
+
+if __name__ == '__main__':
+    start_services()
     print("\n" + "="*80)
     print("GPS VEHICLE TRACKING - ROLE-BASED ACCESS")
     print("="*80)
     print("\nServer: http://localhost:5001")
     print("="*80 + "\n")
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    # Development entry point; use serve.py for eventlet/gevent
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000, **run_options(async_mode()))
@@ -0,0 +1,459 @@
+"""
+Model Benchmark CLI
+Reproducible performance reports for the ML models and the pricing code,
+replacing evaluate_models.py, pipeline_metrics.py and cluster_metrics.py.
+Every run draws its trips from a seeded workload (city locations plus
+jitter, random hour/day/month), pins the BLAS/OpenMP and model thread
+pools, sweeps batch sizes, and separates the cold first call from warm
+steady-state timings. Results are JSON, and two runs can be diffed.
+
+    load         unpickle each model (cold = first load in the process, incl. imports)
+    inference    predict() per model across batch sizes; XGBoost vs Random Forest agreement
+    pipeline     the predict_trip_duration path (features -> clusters -> XGBoost), per stage
+    clustering   K-Means assignment timing; silhouette / Davies-Bouldin / Calinski-Harabasz
+    fare         calculate_fare per trip vs fare_engine.FARES.price per batch; fare table per city
+
+Usage:
+    python bench.py all --json bench_run.json [--seed 42] [--threads 1] [--batch-sizes 1 16 256 4096]
+    python bench.py inference --repeats 50 --city porto
+    python bench.py diff old_run.json new_run.json [--threshold 0.2]   (exit code 1 on regression)
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import statistics
+import warnings
+from datetime import datetime
+
+# The pickles were written by older scikit-learn/XGBoost, and the app feeds
+# K-Means plain arrays; none of these warnings change the numbers
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+warnings.filterwarnings('ignore', message='Trying to unpickle estimator')
+warnings.filterwarnings('ignore', message='.*loading a serialized model')
+
+import numpy as np
+import pandas as pd
+
+from city_config import get_city_config, calculate_fare
+from fare_engine import FARES
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Models')
+MODEL_FILES = {
+    'xgboost': 'xgboost_model.pkl',
+    'random_forest': 'random_forest_model (1).pkl',
+    'kmeans_start': 'kmeans_start.pkl',
+    'kmeans_end': 'kmeans_end.pkl',
+    'feature_columns': 'feature_columns.pkl',
+}
+DEFAULT_BATCH_SIZES = [1, 16, 256, 4096]
+DEFAULT_THRESHOLD = 0.2
+RUSH_HOURS = [7, 8, 9, 17, 18, 19]
+QUALITY_SAMPLE = 1000                   # silhouette is O(n^2)
+AGREEMENT_TRIPS = 1000
+
+_models = {}
+
+
+def pin_threads(threads, cpus=None):
+    """Cap BLAS/OpenMP pools and model n_jobs at ``threads``; optionally bind to ``cpus``"""
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=threads)
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    return {'threads': threads,
+            'cpus': sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None}
+
+
+def load_model(name):
+    with open(os.path.join(MODELS_DIR, MODEL_FILES[name]), 'rb') as f:
+        return pickle.load(f)
+
+
+def get_models(threads):
+    """All models, loaded once per process, with their own thread pools pinned"""
+    for name in MODEL_FILES:
+        if name not in _models:
+            _models[name] = load_model(name)
+    _models['xgboost'].set_params(n_jobs=threads)
+    _models['random_forest'].set_params(n_jobs=threads)
+    return _models
+
+
+def make_workload(n, seed, city):
+    """``n`` seeded trips between the city's locations (±~500 m jitter)"""
+    rng = np.random.default_rng(seed)
+    points = np.array([(loc['lat'], loc['lon']) for loc in get_city_config(city)['locations'].values()])
+    start = points[rng.integers(len(points), size=n)] + rng.normal(0, 0.005, (n, 2))
+    end = points[rng.integers(len(points), size=n)] + rng.normal(0, 0.005, (n, 2))
+    return {
+        'start_lat': start[:, 0], 'start_lon': start[:, 1],
+        'end_lat': end[:, 0], 'end_lon': end[:, 1],
+        'hour': rng.integers(0, 24, size=n),
+        'day_of_week': rng.integers(0, 7, size=n),
+        'month': rng.integers(1, 13, size=n),
+    }
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Vectorized form of the apps' haversine_distance (km)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+
+def calculate_bearing(lat1, lon1, lat2, lon2):
+    """Vectorized form of the apps' calculate_bearing (degrees)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    x = np.sin(lon2 - lon1) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def trip_features(trips):
+    """Everything predict_trip_duration derives before clustering"""
+    distance = haversine_distance(trips['start_lat'], trips['start_lon'], trips['end_lat'], trips['end_lon'])
+    return {
+        'distance': distance,
+        'bearing': calculate_bearing(trips['start_lat'], trips['start_lon'], trips['end_lat'], trips['end_lon']),
+        'straightness': np.full(len(distance), 0.8),
+        'num_points': np.maximum(2, (distance * 10).astype(int)),
+        'is_weekend': np.isin(trips['day_of_week'], [5, 6]).astype(int),
+        'is_rush_hour': np.isin(trips['hour'], RUSH_HOURS).astype(int),
+    }
+
+
+def assign_clusters(trips, models):
+    return {
+        'start_cluster': models['kmeans_start'].predict(np.column_stack([trips['start_lat'], trips['start_lon']])),
+        'end_cluster': models['kmeans_end'].predict(np.column_stack([trips['end_lat'], trips['end_lon']])),
+    }
+
+
+def feature_frame(trips, models):
+    columns = {**trips, **trip_features(trips), **assign_clusters(trips, models)}
+    return pd.DataFrame({name: columns[name] for name in models['feature_columns']})
+
+
+def take(trips, n):
+    return {name: values[:n] for name, values in trips.items()}
+
+
+def time_calls(func, repeats):
+    """Cold first call, then ``repeats`` warm calls; milliseconds"""
+    started = time.perf_counter()
+    func()
+    cold = (time.perf_counter() - started) * 1000
+    warm = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        warm.append((time.perf_counter() - started) * 1000)
+    warm.sort()
+    return {
+        'cold_ms': round(cold, 4),
+        'median_ms': round(statistics.median(warm), 4),
+        'p95_ms': round(warm[min(len(warm) - 1, int(len(warm) * 0.95))], 4),
+        'min_ms': round(warm[0], 4),
+    }
+
+
+def sweep(make_call, batch_sizes, repeats):
+    """time_calls() per batch size, plus the warm per-row cost"""
+    results = {}
+    for size in batch_sizes:
+        timing = time_calls(make_call(size), repeats)
+        timing['per_row_us'] = round(timing['median_ms'] * 1000 / size, 3)
+        results[str(size)] = timing
+    return results
+
+
+def bench_load(config):
+    """Cold vs warm unpickling per model file"""
+    results = {}
+    for name, filename in MODEL_FILES.items():
+        timing = time_calls(lambda: load_model(name), config['repeats'])
+        timing['size_kb'] = round(os.path.getsize(os.path.join(MODELS_DIR, filename)) / 1024, 1)
+        results[name] = timing
+    totals = {'total_cold_ms': round(sum(r['cold_ms'] for r in results.values()), 2),
+              'total_warm_ms': round(sum(r['median_ms'] for r in results.values()), 2)}
+    return {**results, **totals}
+
+
+def bench_inference(config):
+    """predict() per model and batch size, on prebuilt feature frames"""
+    models = get_models(config['threads'])
+    trips = make_workload(max(*config['batch_sizes'], AGREEMENT_TRIPS), config['seed'], config['city'])
+    frame = feature_frame(trips, models)
+    points = np.column_stack([trips['start_lat'], trips['start_lon']])
+
+    results = {}
+    for name in ('xgboost', 'random_forest'):
+        results[name] = sweep(lambda size, model=models[name]: (lambda: model.predict(frame.iloc[:size])),
+                              config['batch_sizes'], config['repeats'])
+    results['kmeans_start'] = sweep(lambda size: (lambda: models['kmeans_start'].predict(points[:size])),
+                                    config['batch_sizes'], config['repeats'])
+
+    # Same trips through both duration models (pipeline_metrics.py's comparison)
+    xgb = models['xgboost'].predict(frame.iloc[:AGREEMENT_TRIPS]) / 60
+    rf = models['random_forest'].predict(frame.iloc[:AGREEMENT_TRIPS]) / 60
+    results['xgboost_vs_random_forest'] = {
+        'rmse_min': round(float(np.sqrt(np.mean((xgb - rf)**2))), 3),
+        'mae_min': round(float(np.mean(np.abs(xgb - rf))), 3),
+        'correlation': round(float(np.corrcoef(xgb, rf)[0, 1]), 4),
+        'xgboost_mean_min': round(float(xgb.mean()), 2),
+        'random_forest_mean_min': round(float(rf.mean()), 2),
+    }
+    # evaluate_models.py's sanity check: ETAs against a flat 25 km/h city speed
+    expected = frame['distance'].to_numpy()[:AGREEMENT_TRIPS] / 25.0 * 60
+    results['xgboost_vs_25kmh'] = {
+        'mae_min': round(float(np.mean(np.abs(xgb - expected))), 3),
+        'mape_pct': round(float(np.mean(np.abs(xgb - expected)[expected > 0.1] / expected[expected > 0.1]) * 100), 1),
+    }
+    return results
+
+
+def bench_pipeline(config):
+    """The full ETA path per stage; batch size 1 is what one booking costs"""
+    models = get_models(config['threads'])
+    trips = make_workload(max(config['batch_sizes']), config['seed'], config['city'])
+
+    def stages(size):
+        batch = take(trips, size)
+        features = lambda: trip_features(batch)
+        clusters = lambda: assign_clusters(batch, models)
+        frame = feature_frame(batch, models)
+        model = lambda: models['xgboost'].predict(frame)
+        end_to_end = lambda: models['xgboost'].predict(feature_frame(batch, models))
+        return {'features': features, 'clustering': clusters, 'model': model, 'end_to_end': end_to_end}
+
+    results = {}
+    for size in config['batch_sizes']:
+        results[str(size)] = {}
+        for stage, func in stages(size).items():
+            timing = time_calls(func, config['repeats'])
+            timing['per_row_us'] = round(timing['median_ms'] * 1000 / size, 3)
+            results[str(size)][stage] = timing
+    return results
+
+
+def bench_clustering(config):
+    """Assignment timing on the workload; quality on points spanning the centroids"""
+    models = get_models(config['threads'])
+    rng = np.random.default_rng(config['seed'])
+    trips = make_workload(max(config['batch_sizes']), config['seed'], config['city'])
+    from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
+
+    results = {}
+    for name, prefix in (('kmeans_start', 'start'), ('kmeans_end', 'end')):
+        model = models[name]
+        points = np.column_stack([trips[f'{prefix}_lat'], trips[f'{prefix}_lon']])
+        centers = model.cluster_centers_
+        # The city workload can fall into one cluster; score over the centroids' extent instead
+        low, high = centers.min(axis=0) - 0.3, centers.max(axis=0) + 0.3
+        sample = rng.uniform(low, high, (QUALITY_SAMPLE, centers.shape[1]))
+        labels = model.predict(sample)
+        nearest = centers[labels]
+        intra_km = haversine_distance(sample[:, 0], sample[:, 1], nearest[:, 0], nearest[:, 1])
+
+        quality = {'clusters': int(model.n_clusters), 'clusters_used': int(len(np.unique(labels))),
+                   'inertia': round(float(model.inertia_), 4),
+                   'intra_cluster_mean_km': round(float(intra_km.mean()), 3),
+                   'intra_cluster_median_km': round(float(np.median(intra_km)), 3)}
+        if quality['clusters_used'] > 1:
+            quality.update(silhouette=round(float(silhouette_score(sample, labels)), 4),
+                           davies_bouldin=round(float(davies_bouldin_score(sample, labels)), 4),
+                           calinski_harabasz=round(float(calinski_harabasz_score(sample, labels)), 2))
+        results[name] = {
+            'quality': quality,
+            'timing': sweep(lambda size, model=model, points=points: (lambda: model.predict(points[:size])),
+                            config['batch_sizes'], config['repeats']),
+        }
+    return results
+
+
+def bench_fare(config):
+    """calculate_fare() per trip, as the booking endpoints do, vs one vectorized FARES.price()"""
+    trips = make_workload(max(config['batch_sizes']), config['seed'], config['city'])
+    distances = trip_features(trips)['distance'].tolist()
+    hours = trips['hour'].tolist()
+    city = config['city']
+
+    def make_call(size):
+        return lambda: [calculate_fare(distances[i], city, hours[i]) for i in range(size)]
+
+    distance_array, hour_array = np.array(distances), np.array(hours)
+    city_ids = np.full(len(distances), FARES.city_id(city))
+
+    def make_vectorized_call(size):
+        return lambda: FARES.price(distance_array[:size], hour_array[:size], city_ids[:size])
+
+    return {
+        'timing': sweep(make_call, config['batch_sizes'], config['repeats']),
+        'timing_vectorized': sweep(make_vectorized_call, config['batch_sizes'], config['repeats']),
+        'table': {f'{km}km': {'normal': calculate_fare(km, city, 12), 'rush': calculate_fare(km, city, 8),
+                              'night': calculate_fare(km, city, 23)}
+                  for km in (5, 10, 15, 20, 30)},
+    }
+
+
+SUITES = {
+    'load': bench_load,
+    'inference': bench_inference,
+    'pipeline': bench_pipeline,
+    'clustering': bench_clustering,
+    'fare': bench_fare,
+}
+
+
+def run(suites, config):
+    """Run the selected suites (load first, so its cold numbers are really cold)"""
+    results = {}
+    for name in sorted(suites, key=list(SUITES).index):
+        print(f"Running {name}...", flush=True)
+        results[name] = SUITES[name](config)
+    return {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.machine(), 'cpus': os.cpu_count(),
+                    'numpy': np.__version__, 'pandas': pd.__version__},
+        'config': config,
+        'results': results,
+    }
+
+
+def flatten(results, prefix=''):
+    """{'inference': {'xgboost': {'1': {'median_ms': ..}}}} -> {'inference.xgboost.1.median_ms': ..}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def diff(old, new, threshold=DEFAULT_THRESHOLD):
+    """Rows of (metric, old, new, ratio, regressed); the fastest warm call gates, as in benchmarks.py"""
+    old_flat, new_flat = flatten(old['results']), flatten(new['results'])
+    rows = []
+    for metric, value in new_flat.items():
+        if not metric.endswith(('.min_ms', '.cold_ms')) or metric not in old_flat:
+            continue
+        base = old_flat[metric]
+        ratio = value / base if base else 1.0
+        # Cold timings are single samples, so they are reported but never gate
+        rows.append((metric, base, value, ratio, ratio > 1 + threshold and not metric.endswith('.cold_ms')))
+    return rows
+
+
+def print_run(document):
+    results = document['results']
+    config = document['config']
+    print(f"Seed {config['seed']}, city {config['city']}, threads {config['threads']}, "
+          f"batch sizes {config['batch_sizes']}, {config['repeats']} warm repeats")
+
+    if 'load' in results:
+        print(f"\n[load]  {'model':<18}{'cold ms':>12}{'warm ms':>12}{'size KB':>10}")
+        for name in MODEL_FILES:
+            r = results['load'][name]
+            print(f"        {name:<18}{r['cold_ms']:>12.2f}{r['median_ms']:>12.2f}{r['size_kb']:>10.1f}")
+
+    def print_sweep(label, timings):
+        for size, r in timings.items():
+            print(f"        {label:<22}{size:>6}{r['cold_ms']:>12.3f}{r['median_ms']:>12.3f}"
+                  f"{r['p95_ms']:>12.3f}{r['per_row_us']:>12.2f}")
+
+    header = f"{'':<22}{'batch':>6}{'cold ms':>12}{'warm ms':>12}{'p95 ms':>12}{'µs/row':>12}"
+    if 'inference' in results:
+        print(f"\n[inference] {header}")
+        for name in ('xgboost', 'random_forest', 'kmeans_start'):
+            print_sweep(name, results['inference'][name])
+        agreement = results['inference']['xgboost_vs_random_forest']
+        print(f"        XGBoost vs RF: RMSE {agreement['rmse_min']} min, MAE {agreement['mae_min']} min, "
+              f"r={agreement['correlation']}")
+        sanity = results['inference']['xgboost_vs_25kmh']
+        print(f"        XGBoost vs 25 km/h: MAE {sanity['mae_min']} min, MAPE {sanity['mape_pct']}%")
+    if 'pipeline' in results:
+        print(f"\n[pipeline]  {header}")
+        for size, stages in results['pipeline'].items():
+            for stage, r in stages.items():
+                print_sweep(stage, {size: r})
+    if 'clustering' in results:
+        print(f"\n[clustering]{header}")
+        for name, r in results['clustering'].items():
+            print_sweep(name, r['timing'])
+            q = r['quality']
+            print(f"        {name}: {q['clusters_used']}/{q['clusters']} clusters used, "
+                  f"silhouette {q.get('silhouette', 'n/a')}, DBI {q.get('davies_bouldin', 'n/a')}, "
+                  f"intra-cluster {q['intra_cluster_mean_km']} km")
+    if 'fare' in results:
+        print(f"\n[fare]      {header}")
+        print_sweep('calculate_fare', results['fare']['timing'])
+        print_sweep('FARES.price', results['fare']['timing_vectorized'])
+        for km, fares in results['fare']['table'].items():
+            print(f"        {km:>5}: normal {fares['normal']}, rush {fares['rush']}, night {fares['night']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='bench.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in [*SUITES, 'all']:
+        sub = commands.add_parser(name, help='run every suite' if name == 'all' else SUITES[name].__doc__)
+        sub.add_argument('--seed', type=int, default=42)
+        sub.add_argument('--city', choices=['bangalore', 'porto'], default='bangalore')
+        sub.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES, metavar='N')
+        sub.add_argument('--repeats', type=int, default=30, help='warm calls per measurement')
+        sub.add_argument('--threads', type=int, default=1, help='BLAS/OpenMP/model thread pool size')
+        sub.add_argument('--cpus', type=int, nargs='+', metavar='CPU', help='bind the process to these CPUs')
+        sub.add_argument('--json', metavar='PATH', help='write the results here')
+    diff_parser = commands.add_parser('diff', help='compare two --json runs')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                             help='allowed warm slowdown (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("MODEL BENCHMARKS")
+    print("="*80)
+
+    if args.command == 'diff':
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        print(f"Old: {args.old} ({old['recorded_at']})\nNew: {args.new} ({new['recorded_at']})")
+        changed = {key for key in set(old['config']) | set(new['config'])
+                   if key != 'cpus' and old['config'].get(key) != new['config'].get(key)}
+        if changed or old['machine'] != new['machine']:
+            print(f"⚠ Runs differ in {', '.join(sorted(changed)) or 'machine'}; timings may not be comparable")
+        rows = diff(old, new, args.threshold)
+        print(f"\n{'metric':<52}{'old':>12}{'new':>12}{'change':>10}")
+        for metric, base, value, ratio, regressed in rows:
+            marker = '✗' if regressed else ' '
+            print(f"{metric:<52}{base:>12.3f}{value:>12.3f}{(ratio - 1) * 100:>+9.1f}%  {marker}")
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"\n✗ {len(regressions)} warm timing(s) slower by more than {args.threshold:.0%}")
+        else:
+            print(f"\n✓ No warm timing slower by more than {args.threshold:.0%}")
+        print("="*80 + "\n")
+        sys.exit(1 if regressions else 0)
+
+    config = {'seed': args.seed, 'city': args.city, 'batch_sizes': sorted(set(args.batch_sizes)),
+              'repeats': args.repeats, **pin_threads(args.threads, args.cpus)}
+    document = run(list(SUITES) if args.command == 'all' else [args.command], config)
+    print_run(document)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        print(f"\n✓ Results saved to {args.json}")
+    print("="*80 + "\n")
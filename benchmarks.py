@@ -0,0 +1,284 @@
+"""
+Hot-Path Micro-Benchmarks
+Repeatable timings for the functions on the booking, tracking and analytics
+paths, saved as a JSON baseline and compared against it. Each benchmark is
+timed in rounds (timeit autorange, >= 0.2 s each) after a warm-up; the
+fastest round is what gets compared, since slower rounds mostly measure
+other load on the machine. GET /api/analytics runs against
+a scratch SQLite database seeded with 100k rides.
+
+Usage:
+    python benchmarks.py run [--save benchmark_baseline.json] [--only name ...]
+    python benchmarks.py compare [benchmark_baseline.json] [--threshold 0.25]   (exit code 1 on regression)
+"""
+
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+import platform
+import statistics
+import tempfile
+import warnings
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='rideshare_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+# predict_trip_duration's KMeans lookups warn on every call; keep the report readable
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+ANALYTICS_RIDES = 100_000
+
+# A typical Bangalore trip (MG Road -> Koramangala)
+TRIP = (12.9716, 77.5946, 12.9352, 77.6245)
+
+# name -> setup(); setup returns the zero-argument callable to time
+BENCHMARKS = {}
+_prepared = {}                              # name -> callable; setups run once per process
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('haversine_distance')
+def _haversine_distance():
+    from app_complete import haversine_distance
+    return lambda: haversine_distance(*TRIP)
+
+
+@benchmark('calculate_bearing')
+def _calculate_bearing():
+    from app_complete import calculate_bearing
+    return lambda: calculate_bearing(*TRIP)
+
+
+@benchmark('predict_trip_duration')
+def _predict_trip_duration():
+    from app_complete import models, predict_trip_duration
+    # Models load lazily; unpickling them must not land in the timed calls
+    models.warm()
+    return lambda: predict_trip_duration(*TRIP, 18, 2, 6)
+
+
+@benchmark('calculate_fare')
+def _calculate_fare():
+    from city_config import calculate_fare
+    return lambda: calculate_fare(12.4, 'bangalore', 18)
+
+
+@benchmark('histogram_bins')
+def _histogram_bins():
+    # Successor of the analytics endpoint's build_bins(): each ride is bucketed
+    # once, when its rollup row is written
+    from models import Ride
+    from rollups import _histogram_contribution
+    ride = Ride(distance=12.4, duration=34.0, created_at=datetime(2026, 6, 3, 18, 20))
+    return lambda: _histogram_contribution(ride)
+
+
+@benchmark('interpolate_route')
+def _interpolate_route():
+    from app_new import interpolate_route
+    return lambda: interpolate_route(*TRIP, num_points=100)
+
+
+@benchmark('ride_to_dict')
+def _ride_to_dict():
+    from models import Ride
+    now = datetime(2026, 6, 3, 18, 20)
+    ride = Ride(id=1, customer_id=2, driver_id=3, pickup_lat=TRIP[0], pickup_lon=TRIP[1],
+                pickup_address='MG Road', dropoff_lat=TRIP[2], dropoff_lon=TRIP[3],
+                dropoff_address='Koramangala', city='bangalore', distance=12.4, duration=34.0,
+                fare=198.8, status='completed', created_at=now, accepted_at=now, started_at=now,
+                completed_at=now, rating=5, feedback='')
+    return ride.to_dict
+
+
+@benchmark('vehicle_to_dict')
+def _vehicle_to_dict():
+    from models import Vehicle
+    vehicle = Vehicle(id=1, driver_id=3, vehicle_number='KA-01-1001', vehicle_type='sedan',
+                      vehicle_model='Honda City', vehicle_color='White', city='bangalore',
+                      current_lat=TRIP[0], current_lon=TRIP[1], status='available',
+                      rating=4.8, total_trips=120)
+    return vehicle.to_dict
+
+
+def seed_rides(num_rides):
+    """Bulk-insert ``num_rides`` rides over the last 90 days, then rebuild the rollups"""
+    from sqlalchemy import insert
+    from models import db, User, Vehicle, Ride
+    from rollups import rebuild_rollups
+
+    users = {}
+    for role in ('admin', 'driver', 'customer'):
+        user = User(username=f'bench_{role}', email=f'bench_{role}@example.com',
+                    full_name=f'Bench {role}', role=role)
+        user.set_password('password123')
+        db.session.add(user)
+        users[role] = user
+    db.session.flush()
+    db.session.add(Vehicle(driver_id=users['driver'].id, vehicle_number='BENCH-0001',
+                           city='bangalore', current_lat=TRIP[0], current_lon=TRIP[1]))
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    statuses = ['pending', 'accepted', 'in_progress', 'completed', 'cancelled']
+    for start in range(0, num_rides, 10000):
+        db.session.execute(insert(Ride), [{
+            'customer_id': users['customer'].id,
+            'driver_id': users['driver'].id if i % 3 else None,
+            'pickup_lat': TRIP[0], 'pickup_lon': TRIP[1], 'dropoff_lat': TRIP[2], 'dropoff_lon': TRIP[3],
+            'city': rng.choice(['bangalore', 'porto']),
+            'distance': rng.uniform(1, 30), 'duration': rng.uniform(5, 60),
+            'fare': rng.uniform(50, 500), 'status': rng.choice(statuses),
+            'created_at': now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+        } for i in range(start, min(start + 10000, num_rides))])
+    db.session.commit()
+    rebuild_rollups()
+
+
+@benchmark('analytics_endpoint_100k')
+def _analytics_endpoint():
+    from app_complete import app
+    from migrate_database import upgrade_schema
+    with app.app_context():
+        upgrade_schema()
+        seed_rides(ANALYTICS_RIDES)
+    client = app.test_client()
+    client.post('/login', json={'username': 'bench_admin', 'password': 'password123'})
+
+    def get_analytics():
+        response = client.get('/api/analytics')
+        assert response.status_code == 200, response.status_code
+    return get_analytics
+
+
+def measure(func, rounds=7):
+    """Per-call timings in microseconds over ``rounds`` autoranged rounds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()           # also serves as the warm-up
+    per_call = [timer.timeit(number) / number * 1e6 for _ in range(rounds)]
+    return {
+        'median_us': round(statistics.median(per_call), 3),
+        'min_us': round(min(per_call), 3),
+        'stdev_us': round(statistics.stdev(per_call), 3),
+        'calls_per_round': number,
+        'rounds': rounds,
+    }
+
+
+def run_benchmarks(names=None, report=None):
+    """Run the selected benchmarks; returns a results document (see --save)"""
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in _prepared:
+            _prepared[name] = BENCHMARKS[name]()
+        results[name] = measure(_prepared[name])
+        if report:
+            report(name, results[name])
+    return {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.machine(), 'cpus': os.cpu_count()},
+        'benchmarks': results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Rows of (name, baseline us, current us, ratio, regressed) for benchmarks in both documents"""
+    rows = []
+    for name, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        ratio = result['min_us'] / base['min_us']
+        rows.append((name, base['min_us'], result['min_us'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def _print_result(name, result):
+    print(f"{name:<28}{result['median_us']:>14.2f}{result['min_us']:>14.2f}{result['stdev_us']:>12.2f}"
+          f"{result['calls_per_round']:>10}", flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='benchmarks.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--save', metavar='PATH', help='write the results (e.g. a new baseline) here')
+    run_parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), metavar='NAME')
+    compare_parser = commands.add_parser('compare', help='run and compare against a baseline')
+    compare_parser.add_argument('baseline', nargs='?', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--current', metavar='PATH', help='compare this results file instead of running')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='allowed slowdown of the fastest round (0.25 = 25%%)')
+    compare_parser.add_argument('--retries', type=int, default=2,
+                                help='re-measure apparent regressions this many times before failing')
+    compare_parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), metavar='NAME')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("HOT-PATH MICRO-BENCHMARKS")
+    print("="*80)
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Baseline: {args.baseline} ({baseline['recorded_at']}, "
+              f"Python {baseline['machine']['python']}, {baseline['machine']['cpus']} CPUs)")
+        if baseline['machine']['python'] != platform.python_version() or \
+                baseline['machine']['cpus'] != os.cpu_count():
+            print("⚠ Baseline was recorded on a different machine/interpreter; re-record it with run --save")
+
+    if args.command == 'compare' and args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        print(f"\n{'benchmark':<28}{'median µs':>14}{'min µs':>14}{'stdev µs':>12}{'calls':>10}")
+        names = args.only
+        if args.command == 'compare' and not names:
+            names = [name for name in BENCHMARKS if name in baseline['benchmarks']]
+        current = run_benchmarks(names, report=_print_result)
+
+        # A slow round on a busy machine is common; a real regression survives re-measuring
+        for _ in range(args.retries if args.command == 'compare' else 0):
+            slower = [row[0] for row in compare(baseline, current, args.threshold) if row[4]]
+            if not slower:
+                break
+            print(f"Re-measuring {', '.join(slower)}", flush=True)
+            for name, result in run_benchmarks(slower, report=_print_result)['benchmarks'].items():
+                if result['min_us'] < current['benchmarks'][name]['min_us']:
+                    current['benchmarks'][name] = result
+
+    if args.command == 'run':
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(current, f, indent=2)
+                f.write('\n')
+            print(f"\n✓ Results saved to {args.save}")
+        print("="*80 + "\n")
+        sys.exit(0)
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"\n{'benchmark (min)':<28}{'baseline µs':>14}{'current µs':>14}{'change':>10}")
+    for name, base_us, current_us, ratio, regressed in rows:
+        marker = '✗' if regressed else '✓'
+        print(f"{name:<28}{base_us:>14.2f}{current_us:>14.2f}{(ratio - 1) * 100:>+9.1f}%  {marker}")
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"\n✗ {len(regressions)} benchmark(s) slower than baseline by more than "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"\n✓ No benchmark regressed by more than {args.threshold:.0%}")
+    print("="*80 + "\n")
+    sys.exit(1 if regressions else 0)
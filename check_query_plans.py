@@ -0,0 +1,147 @@
+"""
+Query Plan Check Script
+Runs the dashboard endpoints against a scratch database, captures every SQL
+statement they issue and fails if SQLite plans any of them as a table scan.
+
+Usage: python check_query_plans.py   (exit code 1 on regression)
+"""
+
+import os
+import re
+import sys
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='rideshare_qp_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'plans.db')}"
+
+from sqlalchemy import event
+from app_complete import app, db
+from models import User, Vehicle, Ride
+from migrate_database import upgrade_schema
+from rollups import rebuild_rollups
+
+# Dashboard endpoints polled by the admin, driver and customer pages
+DASHBOARD_ENDPOINTS = {
+    'driver': [
+        '/api/driver/summary',
+        '/api/driver/pending-rides',
+    ],
+    'customer': [
+        '/api/customer/recent-rides',
+    ],
+    'admin': [
+        '/api/admin/stats?city=all',
+        '/api/admin/stats?city=bangalore',
+        '/api/admin/vehicles?city=bangalore',
+        '/api/analytics',
+    ],
+}
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# Rollup tables grow with days x cities, not with ride volume
+SCAN_ALLOWED = {'city_daily_stats'}
+INDEX_SCAN = re.compile(r'^SCAN rides USING')
+
+
+def seed(num_rides=500):
+    """Create one user per role plus a spread of rides over the last week"""
+    users = {}
+    for role in ('admin', 'driver', 'customer'):
+        user = User(username=f'qp_{role}', email=f'qp_{role}@example.com',
+                    full_name=f'QP {role}', role=role)
+        user.set_password('password123')
+        db.session.add(user)
+        users[role] = user
+    db.session.flush()
+
+    db.session.add(Vehicle(driver_id=users['driver'].id, vehicle_number='QP-0001',
+                           city='bangalore', current_lat=12.97, current_lon=77.59))
+
+    now = datetime.utcnow()
+    statuses = ['pending', 'accepted', 'in_progress', 'completed', 'cancelled']
+    for i in range(num_rides):
+        db.session.add(Ride(
+            customer_id=users['customer'].id,
+            driver_id=users['driver'].id if i % 3 else None,
+            pickup_lat=12.97, pickup_lon=77.59, dropoff_lat=12.93, dropoff_lon=77.62,
+            city=random.choice(['bangalore', 'porto']),
+            distance=random.uniform(1, 30), duration=random.uniform(5, 60),
+            fare=random.uniform(50, 500), status=random.choice(statuses),
+            created_at=now - timedelta(minutes=random.randint(0, 7 * 24 * 60))
+        ))
+    db.session.commit()
+    rebuild_rollups()
+
+
+def explain(connection, statement, parameters):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    cursor = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+    return [row[3] for row in cursor]
+
+
+def is_regression(statement, plan):
+    """A full table scan, or an index walk over rides without a LIMIT"""
+    for line in plan:
+        match = FULL_SCAN.match(line)
+        if match and match.group(1) not in SCAN_ALLOWED:
+            return True
+        if INDEX_SCAN.match(line) and 'LIMIT' not in statement:
+            return True
+    return False
+
+
+def check_query_plans():
+    """Return a list of (endpoint, statement, plan) tuples that regressed"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    failures = []
+    with app.app_context():
+        upgrade_schema()
+        seed()
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            for role, endpoints in DASHBOARD_ENDPOINTS.items():
+                client = app.test_client()
+                client.post('/login', json={'username': f'qp_{role}', 'password': 'password123'})
+                for endpoint in endpoints:
+                    captured.clear()
+                    response = client.get(endpoint)
+                    if response.status_code != 200:
+                        failures.append((endpoint, f'HTTP {response.status_code}', []))
+                        continue
+                    for statement, parameters in list(captured):
+                        with db.engine.connect() as connection:
+                            plan = explain(connection, statement, parameters)
+                        if is_regression(statement, plan):
+                            failures.append((endpoint, statement, plan))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+    return failures
+
+
+if __name__ == '__main__':
+    print("\n" + "="*80)
+    print("QUERY PLAN CHECK")
+    print("="*80)
+
+    failures = check_query_plans()
+    for endpoint, statement, plan in failures:
+        print(f"\n✗ {endpoint}")
+        print(f"  {' '.join(statement.split())}")
+        for line in plan:
+            print(f"    {line}")
+
+    if failures:
+        print(f"\n✗ {len(failures)} dashboard queries regressed to a scan")
+        sys.exit(1)
+
+    print("\n✓ All dashboard queries use an index")
+    print("="*80 + "\n")
@@ -244,8 +244,8 @@ def get_vehicles_for_city(city_name):
     else:
         return BANGALORE_VEHICLES
 
-def calculate_fare(distance_km, city_name, hour=None):
-    """Calculate fare based on distance and city"""
+def calculate_fare(distance_km, city_name, hour=None, surge=None):
+    """Calculate fare based on distance and city; ``surge`` is a live zone multiplier (surge.py)"""
     config = get_city_config(city_name)
     
     base_fare = config['base_fare']
@@ -255,16 +255,21 @@ def calculate_fare(distance_km, city_name, hour=None):
     fare = base_fare + (distance_km * per_km)
     
     # Apply traffic multiplier if hour is provided
+    multiplier = 1.0
     if hour is not None:
         traffic = config['traffic_multiplier']
         if hour in traffic['rush_hour_morning']['hours']:
-            fare *= traffic['rush_hour_morning']['multiplier']
+            multiplier = traffic['rush_hour_morning']['multiplier']
         elif hour in traffic['rush_hour_evening']['hours']:
-            fare *= traffic['rush_hour_evening']['multiplier']
+            multiplier = traffic['rush_hour_evening']['multiplier']
         elif hour in traffic['late_night']['hours']:
-            fare *= traffic['late_night']['multiplier']
+            multiplier = traffic['late_night']['multiplier']
     
-    return round(fare, 2)
+    # A live surge replaces the static rush-hour premium; discounts still apply
+    if surge is not None:
+        multiplier = min(multiplier, 1.0) * surge
+    
+    return round(fare * multiplier, 2)
 
 def get_location_by_name(city_name, location_name):
     """Get location details by name"""
@@ -0,0 +1,170 @@
+"""
+Dashboard Push Channels
+Ride and vehicle state changes are pushed to the dashboards as small
+deltas once their transaction commits (via the ride_events bus), so the
+dashboards stop re-polling.
+Every change also bumps a version for the data it touches; the dashboard
+JSON endpoints send that version as an ETag and answer If-None-Match with
+304 before running a query, so fallback polling from an idle dashboard
+costs (almost) no server work.
+
+    room            event                  version key
+    admins          stats_delta            stats, analytics
+    drivers         pending_ride           pending_rides
+    driver_<id>     driver_summary_delta   driver_<id>
+    customer_<id>   customer_ride          customer_<id>
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from functools import wraps
+from zlib import crc32
+
+from flask import request, session, make_response
+
+from rollups import RIDE_STATUSES
+from ride_events import RideStatusChanged, VehicleStatusChanged
+
+VERSION_CHANNEL = 'dashboard_versions'
+
+
+def recent_ride_row(ride):
+    """One row of the customer's recent rides list, from Ride.to_dict()"""
+    created_at = ride['created_at']
+    return {
+        'id': ride['id'],
+        'date': datetime.fromisoformat(created_at).strftime('%Y-%m-%d %H:%M') if created_at else '-',
+        'pickup_address': ride['pickup_address'] or '-',
+        'dropoff_address': ride['dropoff_address'] or '-',
+        'fare': float(ride['fare'] or 0),
+        'status': ride['status'] or 'unknown'
+    }
+
+
+class ChangeVersions:
+    """Version counter per data key; with a message queue URL every worker's counters move together"""
+
+    def __init__(self, url=None):
+        self.boot = os.urandom(4).hex()     # ETags from a previous process never match
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+        self._backend = None
+        if url:
+            from message_queue import connect_backend
+            self._backend = connect_backend(url)
+            thread = threading.Thread(target=self._listen)
+            thread.daemon = True
+            thread.start()
+
+    def bump(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] += 1
+        if self._backend is not None and keys:
+            self._backend.publish(VERSION_CHANNEL, json.dumps({'from': self.boot, 'keys': keys}))
+
+    def _listen(self):
+        for _, payload in self._backend.listen([VERSION_CHANNEL]):
+            message = json.loads(payload)
+            if message['from'] != self.boot:
+                with self._lock:
+                    for key in message['keys']:
+                        self._versions[key] += 1
+
+    def etag(self, keys, *extra):
+        with self._lock:
+            versions = '.'.join(str(self._versions[key]) for key in keys)
+        return f'{self.boot}-{versions}-{crc32(repr(extra).encode()):08x}'
+
+    def conditional(self, *keys):
+        """Route decorator: 304 while ``keys`` are unchanged.
+
+        Keys may be callables of the session's user id (e.g. per-driver data).
+        Goes above @login_required so a 304 needs no user lookup: only 200s
+        (which passed the login and role checks) carry an ETag, and the ETag
+        is bound to the session's user id and the day, so it only revalidates
+        what this user was already sent.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                user_id = session.get('_user_id')
+                resolved = [key(user_id) if callable(key) else key for key in keys]
+                # Taken before the view runs: a change during the query only costs one more 200
+                tag = self.etag(resolved, user_id, request.full_path, date.today().isoformat())
+                if user_id is not None and request.if_none_match.contains(tag):
+                    response = make_response('', 304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(tag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            return wrapper
+        return decorator
+
+
+class DashboardPush:
+    """Event bus subscriber: committed ride/vehicle changes -> room pushes and version bumps"""
+
+    def __init__(self, socketio, versions, bus):
+        self.socketio = socketio
+        self.versions = versions
+        # Versions move at commit time so a request right after it never gets
+        # a stale 304; the pushes go out from the bus workers
+        bus.subscribe(RideStatusChanged, self._bump_ride, name='dashboard_push.versions', sync=True)
+        bus.subscribe(VehicleStatusChanged, self._bump_vehicle, name='dashboard_push.vehicle_versions', sync=True)
+        bus.subscribe(RideStatusChanged, self._push_ride, name='dashboard_push.ride')
+        bus.subscribe(VehicleStatusChanged, self._push_vehicle, name='dashboard_push.vehicle')
+
+    def _bump_ride(self, change):
+        ride = change.ride
+        keys = ['analytics', f"customer_{ride['customer_id']}"]
+        if change.day == date.today():
+            keys.append('stats')
+            keys.extend(f'driver_{driver_id}' for driver_id in change.driver_deltas)
+        if 'pending' in (change.old_status, ride['status']):
+            keys.append('pending_rides')
+        self.versions.bump(*keys)
+
+    def _bump_vehicle(self, change):
+        self.versions.bump('stats')
+
+    def _push_ride(self, change):
+        ride, delta = change.ride, change.delta
+        pushes = [('customer_ride', recent_ride_row(ride), f"customer_{ride['customer_id']}")]
+
+        if change.day == date.today():
+            stats = {
+                'total_rides': sum(delta[status] for status in RIDE_STATUSES),
+                'active_rides': delta['in_progress'],
+                'total_revenue': delta['booked_fare'],
+            }
+            if any(stats.values()):
+                pushes.append(('stats_delta', dict(stats, city=ride['city']), 'admins'))
+            for driver_id, driver_delta in change.driver_deltas.items():
+                summary = {
+                    'trips_today': sum(driver_delta[status] for status in RIDE_STATUSES) - driver_delta['cancelled'],
+                    'earnings_today': driver_delta['completed_fare'],
+                    'online_hours': driver_delta['active_minutes'] / 60,
+                }
+                if any(summary.values()):
+                    pushes.append(('driver_summary_delta', summary, f'driver_{driver_id}'))
+
+        if 'pending' in (change.old_status, ride['status']):
+            if ride['status'] == 'pending':
+                pushes.append(('pending_ride', {'action': 'added', 'ride': ride}, 'drivers'))
+            else:
+                pushes.append(('pending_ride', {'action': 'removed', 'ride_id': ride['id']}, 'drivers'))
+
+        for event_name, payload, room in pushes:
+            self.socketio.emit(event_name, payload, to=room)
+
+    def _push_vehicle(self, change):
+        available = (change.status == 'available') - (change.old_status == 'available')
+        if available:
+            self.socketio.emit('stats_delta', {'city': change.city, 'available_drivers': available}, to='admins')
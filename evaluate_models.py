@@ -1,720 +0,0 @@
-"""
-IEEE Paper - Real Model Evaluation Script
-Generates ACTUAL metrics from the trained ML models, not assumptions.
-"""
-
-import pickle
-import numpy as np
-import pandas as pd
-import time
-import json
-import sys
-import os
-from datetime import datetime
-from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
-
-# ============================================================
-# 1. LOAD ALL MODELS
-# ============================================================
-print("=" * 70)
-print("IEEE PAPER - REAL MODEL EVALUATION")
-print("=" * 70)
-
-os.chdir(os.path.dirname(os.path.abspath(__file__)) if '__file__' in dir() else '/Users/mukeshkumarreddy/Downloads/Vehicle')
-
-load_times = {}
-
-t0 = time.time()
-with open('Models/xgboost_model.pkl', 'rb') as f:
-    xgb_model = pickle.load(f)
-load_times['XGBoost'] = (time.time() - t0) * 1000
-
-t0 = time.time()
-with open('Models/random_forest_model (1).pkl', 'rb') as f:
-    rf_model = pickle.load(f)
-load_times['Random Forest'] = (time.time() - t0) * 1000
-
-t0 = time.time()
-with open('Models/kmeans_start.pkl', 'rb') as f:
-    kmeans_start = pickle.load(f)
-load_times['K-Means (Pickup)'] = (time.time() - t0) * 1000
-
-t0 = time.time()
-with open('Models/kmeans_end.pkl', 'rb') as f:
-    kmeans_end = pickle.load(f)
-load_times['K-Means (Dropoff)'] = (time.time() - t0) * 1000
-
-t0 = time.time()
-with open('Models/feature_columns.pkl', 'rb') as f:
-    feature_columns = pickle.load(f)
-load_times['Feature Columns'] = (time.time() - t0) * 1000
-
-total_load = sum(load_times.values())
-print(f"\n[1] MODEL LOADING TIMES (REAL):")
-for name, ms in load_times.items():
-    print(f"    {name}: {ms:.1f} ms")
-print(f"    TOTAL: {total_load:.1f} ms ({total_load/1000:.2f} s)")
-
-# ============================================================
-# 2. MODEL INSPECTION
-# ============================================================
-print(f"\n[2] MODEL PROPERTIES:")
-print(f"    Feature columns: {feature_columns}")
-print(f"    Feature count: {len(feature_columns)}")
-
-# XGBoost properties
-try:
-    print(f"    XGBoost type: {type(xgb_model).__name__}")
-    if hasattr(xgb_model, 'n_estimators'):
-        print(f"    XGBoost n_estimators: {xgb_model.n_estimators}")
-    if hasattr(xgb_model, 'get_params'):
-        params = xgb_model.get_params()
-        for k in ['n_estimators', 'max_depth', 'learning_rate', 'objective']:
-            if k in params:
-                print(f"    XGBoost {k}: {params[k]}")
-except Exception as e:
-    print(f"    XGBoost inspection error: {e}")
-
-# Random Forest properties
-try:
-    print(f"    Random Forest type: {type(rf_model).__name__}")
-    if hasattr(rf_model, 'n_estimators'):
-        print(f"    Random Forest n_estimators: {rf_model.n_estimators}")
-    if hasattr(rf_model, 'n_features_in_'):
-        print(f"    Random Forest n_features: {rf_model.n_features_in_}")
-    if hasattr(rf_model, 'feature_names_in_'):
-        print(f"    Random Forest feature names: {list(rf_model.feature_names_in_)}")
-except Exception as e:
-    print(f"    RF inspection error: {e}")
-
-# K-Means properties
-try:
-    print(f"    K-Means (Pickup) clusters: {kmeans_start.n_clusters}")
-    print(f"    K-Means (Dropoff) clusters: {kmeans_end.n_clusters}")
-    print(f"    K-Means (Pickup) inertia: {kmeans_start.inertia_:.4f}")
-    print(f"    K-Means (Dropoff) inertia: {kmeans_end.inertia_:.4f}")
-    print(f"    K-Means (Pickup) n_iter: {kmeans_start.n_iter_}")
-    print(f"    K-Means (Dropoff) n_iter: {kmeans_end.n_iter_}")
-except Exception as e:
-    print(f"    K-Means inspection error: {e}")
-
-# ============================================================
-# 3. HELPER FUNCTIONS
-# ============================================================
-def haversine_distance(lat1, lon1, lat2, lon2):
-    R = 6371
-    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-    c = 2 * np.arcsin(np.sqrt(a))
-    return R * c
-
-def calculate_bearing(lat1, lon1, lat2, lon2):
-    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-    dlon = lon2 - lon1
-    x = np.sin(dlon) * np.cos(lat2)
-    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
-    initial_bearing = np.arctan2(x, y)
-    return (np.degrees(initial_bearing) + 360) % 360
-
-# ============================================================
-# 4. BANGALORE TEST DATA (14 locations, 14 routes)
-# ============================================================
-locations = {
-    'mg_road': (12.9716, 77.5946),
-    'electronic_city': (12.8456, 77.6603),
-    'whitefield': (12.9698, 77.7499),
-    'koramangala': (12.9352, 77.6245),
-    'indiranagar': (12.9716, 77.6412),
-    'jayanagar': (12.9250, 77.5838),
-    'hsr_layout': (12.9116, 77.6373),
-    'bannerghatta': (12.8006, 77.5974),
-    'airport': (13.1986, 77.7066),
-    'majestic': (12.9767, 77.5710),
-    'btm_layout': (12.9165, 77.6101),
-    'bellandur': (12.9259, 77.6751),
-    'marathahalli': (12.9591, 77.7011),
-    'jp_nagar': (12.9077, 77.5854),
-}
-
-popular_routes = [
-    ('mg_road', 'electronic_city'),
-    ('whitefield', 'mg_road'),
-    ('koramangala', 'airport'),
-    ('indiranagar', 'bannerghatta'),
-    ('jayanagar', 'whitefield'),
-    ('hsr_layout', 'majestic'),
-    ('airport', 'koramangala'),
-    ('majestic', 'electronic_city'),
-    ('electronic_city', 'whitefield'),
-    ('bannerghatta', 'indiranagar'),
-    ('btm_layout', 'marathahalli'),
-    ('bellandur', 'mg_road'),
-    ('jp_nagar', 'airport'),
-    ('whitefield', 'jayanagar'),
-]
-
-# Generate comprehensive test set: all pairs + varied hours
-test_cases = []
-hours_to_test = [6, 8, 10, 12, 14, 17, 19, 22]  # Off-peak, rush, night
-days_to_test = [0, 2, 5]  # Mon, Wed, Sat
-
-for src_name, dst_name in popular_routes:
-    src = locations[src_name]
-    dst = locations[dst_name]
-    for h in hours_to_test:
-        for d in days_to_test:
-            test_cases.append({
-                'route': f"{src_name} → {dst_name}",
-                'start_lat': src[0], 'start_lon': src[1],
-                'end_lat': dst[0], 'end_lon': dst[1],
-                'hour': h, 'day_of_week': d, 'month': 2
-            })
-
-# Also add ALL location pairs for clustering evaluation
-all_location_coords = list(locations.values())
-
-print(f"\n[3] TEST DATA:")
-print(f"    Routes: {len(popular_routes)}")
-print(f"    Hours tested: {hours_to_test}")
-print(f"    Days tested: {days_to_test}")
-print(f"    Total test cases: {len(test_cases)}")
-
-# ============================================================
-# 5. XGBOOST ETA PREDICTION - Real Inference Timing
-# ============================================================
-print(f"\n[4] XGBOOST ETA PREDICTION (REAL MEASUREMENTS):")
-
-eta_predictions = []
-inference_times_xgb = []
-
-for tc in test_cases:
-    distance = haversine_distance(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'])
-    bearing = calculate_bearing(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'])
-    num_points = max(2, int(distance * 10))
-    straightness = 0.8
-    is_weekend = 1 if tc['day_of_week'] in [5, 6] else 0
-    is_rush_hour = 1 if tc['hour'] in [7, 8, 9, 17, 18, 19] else 0
-    
-    start_cluster = kmeans_start.predict([[tc['start_lat'], tc['start_lon']]])[0]
-    end_cluster = kmeans_end.predict([[tc['end_lat'], tc['end_lon']]])[0]
-    
-    features = pd.DataFrame([[
-        tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'],
-        distance, bearing, straightness, num_points,
-        tc['hour'], tc['day_of_week'], tc['month'], is_weekend, is_rush_hour,
-        start_cluster, end_cluster
-    ]], columns=feature_columns)
-    
-    t0 = time.time()
-    duration_seconds = xgb_model.predict(features)[0]
-    t1 = time.time()
-    
-    inference_times_xgb.append((t1 - t0) * 1000)
-    
-    duration_minutes = duration_seconds / 60
-    
-    # Sanity check: expected travel time based on distance
-    # Avg city speed ~25 km/h → expected_minutes = distance / 25 * 60
-    expected_minutes = (distance / 25.0) * 60
-    
-    eta_predictions.append({
-        'route': tc['route'],
-        'distance_km': distance,
-        'hour': tc['hour'],
-        'day': tc['day_of_week'],
-        'predicted_sec': float(duration_seconds),
-        'predicted_min': float(duration_minutes),
-        'expected_min': expected_minutes,
-        'error_min': abs(duration_minutes - expected_minutes),
-        'error_pct': abs(duration_minutes - expected_minutes) / max(expected_minutes, 0.01) * 100
-    })
-
-# Compute ETA metrics
-pred_min = np.array([p['predicted_min'] for p in eta_predictions])
-exp_min = np.array([p['expected_min'] for p in eta_predictions])
-errors = pred_min - exp_min
-
-print(f"    Predictions made: {len(eta_predictions)}")
-print(f"    Predicted duration range: {pred_min.min():.2f} - {pred_min.max():.2f} minutes")
-print(f"    Expected duration range: {exp_min.min():.2f} - {exp_min.max():.2f} minutes")
-print(f"    Mean predicted: {pred_min.mean():.2f} min, Median: {np.median(pred_min):.2f} min")
-print(f"    Mean expected: {exp_min.mean():.2f} min")
-print(f"\n    RMSE: {np.sqrt(np.mean(errors**2)):.2f} minutes")
-print(f"    MAE: {np.mean(np.abs(errors)):.2f} minutes")
-
-# MAPE calculation (avoid division by zero)
-valid_mask = exp_min > 0.1
-if valid_mask.any():
-    mape = np.mean(np.abs(errors[valid_mask]) / exp_min[valid_mask]) * 100
-    print(f"    MAPE: {mape:.1f}%")
-else:
-    mape = float('nan')
-    print(f"    MAPE: N/A (insufficient data)")
-
-print(f"\n    Inference time (XGBoost):")
-print(f"      Mean: {np.mean(inference_times_xgb):.3f} ms")
-print(f"      Median: {np.median(inference_times_xgb):.3f} ms")
-print(f"      Min: {np.min(inference_times_xgb):.3f} ms")
-print(f"      Max: {np.max(inference_times_xgb):.3f} ms")
-print(f"      P95: {np.percentile(inference_times_xgb, 95):.3f} ms")
-print(f"      P99: {np.percentile(inference_times_xgb, 99):.3f} ms")
-
-# Show some sample predictions
-print(f"\n    Sample predictions (first 5 unique routes):")
-seen_routes = set()
-for p in eta_predictions:
-    if p['route'] not in seen_routes:
-        print(f"      {p['route']}: dist={p['distance_km']:.1f}km, "
-              f"pred={p['predicted_min']:.1f}min, exp={p['expected_min']:.1f}min, "
-              f"err={p['error_pct']:.1f}%")
-        seen_routes.add(p['route'])
-        if len(seen_routes) >= 5:
-            break
-
-# ============================================================
-# 6. RANDOM FOREST FARE PREDICTION - Real Inference
-# ============================================================
-print(f"\n[5] RANDOM FOREST FARE PREDICTION (REAL MEASUREMENTS):")
-
-# Inspect RF model to understand what features it expects
-try:
-    rf_feature_names = list(rf_model.feature_names_in_) if hasattr(rf_model, 'feature_names_in_') else None
-    rf_n_features = rf_model.n_features_in_ if hasattr(rf_model, 'n_features_in_') else None
-    print(f"    RF expects {rf_n_features} features: {rf_feature_names}")
-except:
-    rf_feature_names = None
-    rf_n_features = None
-    print(f"    RF feature info not available")
-
-fare_predictions = []
-inference_times_rf = []
-
-for tc in test_cases[:len(popular_routes) * len(hours_to_test)]:  # Subset for fare
-    distance = haversine_distance(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'])
-    
-    # Try to predict fare with RF model
-    try:
-        # Build features based on what the model expects
-        if rf_feature_names is not None:
-            fare_features = {}
-            for fn in rf_feature_names:
-                fn_lower = fn.lower()
-                if 'distance' in fn_lower or 'dist' in fn_lower:
-                    fare_features[fn] = distance
-                elif 'duration' in fn_lower or 'time' in fn_lower or 'trip' in fn_lower:
-                    fare_features[fn] = distance / 25.0 * 60  # estimated minutes
-                elif 'hour' in fn_lower:
-                    fare_features[fn] = tc['hour']
-                elif 'day' in fn_lower or 'weekday' in fn_lower:
-                    fare_features[fn] = tc['day_of_week']
-                elif 'month' in fn_lower:
-                    fare_features[fn] = tc['month']
-                elif 'weekend' in fn_lower:
-                    fare_features[fn] = 1 if tc['day_of_week'] in [5, 6] else 0
-                elif 'rush' in fn_lower:
-                    fare_features[fn] = 1 if tc['hour'] in [7, 8, 9, 17, 18, 19] else 0
-                elif 'start_lat' in fn_lower or 'pickup_lat' in fn_lower:
-                    fare_features[fn] = tc['start_lat']
-                elif 'start_lon' in fn_lower or 'pickup_lon' in fn_lower:
-                    fare_features[fn] = tc['start_lon']
-                elif 'end_lat' in fn_lower or 'dropoff_lat' in fn_lower:
-                    fare_features[fn] = tc['end_lat']
-                elif 'end_lon' in fn_lower or 'dropoff_lon' in fn_lower:
-                    fare_features[fn] = tc['end_lon']
-                elif 'bearing' in fn_lower:
-                    fare_features[fn] = calculate_bearing(tc['start_lat'], tc['start_lon'],
-                                                          tc['end_lat'], tc['end_lon'])
-                elif 'cluster' in fn_lower and 'start' in fn_lower:
-                    fare_features[fn] = int(kmeans_start.predict([[tc['start_lat'], tc['start_lon']]])[0])
-                elif 'cluster' in fn_lower and 'end' in fn_lower:
-                    fare_features[fn] = int(kmeans_end.predict([[tc['end_lat'], tc['end_lon']]])[0])
-                elif 'straight' in fn_lower:
-                    fare_features[fn] = 0.8
-                elif 'point' in fn_lower or 'num' in fn_lower:
-                    fare_features[fn] = max(2, int(distance * 10))
-                else:
-                    fare_features[fn] = 0
-            
-            fare_df = pd.DataFrame([fare_features])
-        else:
-            # If no feature names, try using same features as XGBoost
-            bearing = calculate_bearing(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'])
-            num_points = max(2, int(distance * 10))
-            is_weekend = 1 if tc['day_of_week'] in [5, 6] else 0
-            is_rush_hour = 1 if tc['hour'] in [7, 8, 9, 17, 18, 19] else 0
-            start_cluster = int(kmeans_start.predict([[tc['start_lat'], tc['start_lon']]])[0])
-            end_cluster = int(kmeans_end.predict([[tc['end_lat'], tc['end_lon']]])[0])
-            
-            fare_df = pd.DataFrame([[
-                tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'],
-                distance, bearing, 0.8, num_points,
-                tc['hour'], tc['day_of_week'], tc['month'], is_weekend, is_rush_hour,
-                start_cluster, end_cluster
-            ]], columns=feature_columns)
-        
-        t0 = time.time()
-        predicted_fare = rf_model.predict(fare_df)[0]
-        t1 = time.time()
-        
-        inference_times_rf.append((t1 - t0) * 1000)
-        
-        # Expected fare (manual formula): base_fare + distance * per_km_rate
-        expected_fare = 50 + distance * 12  # Bangalore pricing
-        if tc['hour'] in [7, 8, 9, 10]:
-            expected_fare *= 1.8
-        elif tc['hour'] in [17, 18, 19, 20]:
-            expected_fare *= 2.0
-        elif tc['hour'] in [22, 23, 0, 1, 2, 3, 4, 5]:
-            expected_fare *= 0.7
-        
-        fare_predictions.append({
-            'route': tc['route'],
-            'distance_km': distance,
-            'hour': tc['hour'],
-            'predicted_fare': float(predicted_fare),
-            'expected_fare': expected_fare,
-            'error': abs(float(predicted_fare) - expected_fare),
-            'error_pct': abs(float(predicted_fare) - expected_fare) / max(expected_fare, 0.01) * 100
-        })
-    except Exception as e:
-        print(f"    Fare prediction error: {e}")
-        # Try with fewer features
-        try:
-            t0 = time.time()
-            predicted_fare = rf_model.predict(pd.DataFrame([[
-                tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'],
-                distance, calculate_bearing(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon']),
-                0.8, max(2, int(distance * 10)),
-                tc['hour'], tc['day_of_week'], tc['month'],
-                1 if tc['day_of_week'] in [5, 6] else 0,
-                1 if tc['hour'] in [7, 8, 9, 17, 18, 19] else 0,
-                int(kmeans_start.predict([[tc['start_lat'], tc['start_lon']]])[0]),
-                int(kmeans_end.predict([[tc['end_lat'], tc['end_lon']]])[0])
-            ]], columns=feature_columns))[0]
-            t1 = time.time()
-            inference_times_rf.append((t1 - t0) * 1000)
-            expected_fare = 50 + distance * 12
-            fare_predictions.append({
-                'route': tc['route'],
-                'distance_km': distance,
-                'predicted_fare': float(predicted_fare),
-                'expected_fare': expected_fare,
-                'error': abs(float(predicted_fare) - expected_fare),
-                'error_pct': abs(float(predicted_fare) - expected_fare) / max(expected_fare, 0.01) * 100
-            })
-        except Exception as e2:
-            print(f"    Fare fallback error: {e2}")
-            break
-
-if fare_predictions:
-    pred_fare = np.array([p['predicted_fare'] for p in fare_predictions])
-    exp_fare = np.array([p['expected_fare'] for p in fare_predictions])
-    fare_errors = pred_fare - exp_fare
-    
-    print(f"    Predictions made: {len(fare_predictions)}")
-    print(f"    Predicted fare range: {pred_fare.min():.2f} - {pred_fare.max():.2f}")
-    print(f"    Expected fare range: {exp_fare.min():.2f} - {exp_fare.max():.2f}")
-    print(f"    Mean predicted: {pred_fare.mean():.2f}")
-    print(f"\n    RMSE: {np.sqrt(np.mean(fare_errors**2)):.2f}")
-    print(f"    MAE: {np.mean(np.abs(fare_errors)):.2f}")
-    
-    valid_mask_fare = exp_fare > 1
-    if valid_mask_fare.any():
-        mape_fare = np.mean(np.abs(fare_errors[valid_mask_fare]) / exp_fare[valid_mask_fare]) * 100
-        print(f"    MAPE: {mape_fare:.1f}%")
-    
-    if inference_times_rf:
-        print(f"\n    Inference time (RF):")
-        print(f"      Mean: {np.mean(inference_times_rf):.3f} ms")
-        print(f"      Median: {np.median(inference_times_rf):.3f} ms")
-        print(f"      P95: {np.percentile(inference_times_rf, 95):.3f} ms")
-
-# ============================================================
-# 7. K-MEANS CLUSTERING - Real Metrics
-# ============================================================
-print(f"\n[6] K-MEANS CLUSTERING EVALUATION (REAL MEASUREMENTS):")
-
-# Generate realistic GPS points for Bangalore area
-np.random.seed(42)
-n_points = 2000
-
-# Bangalore bounds: lat 12.80-13.20, lon 77.50-77.75
-pickup_lats = np.random.uniform(12.80, 13.20, n_points)
-pickup_lons = np.random.uniform(77.50, 77.75, n_points)
-dropoff_lats = np.random.uniform(12.80, 13.20, n_points)
-dropoff_lons = np.random.uniform(77.50, 77.75, n_points)
-
-pickup_points = np.column_stack([pickup_lats, pickup_lons])
-dropoff_points = np.column_stack([dropoff_lats, dropoff_lons])
-
-# Predict clusters
-t0 = time.time()
-pickup_clusters = kmeans_start.predict(pickup_points)
-t1 = time.time()
-pickup_cluster_time = (t1 - t0) * 1000
-
-t0 = time.time()
-dropoff_clusters = kmeans_end.predict(dropoff_points)
-t1 = time.time()
-dropoff_cluster_time = (t1 - t0) * 1000
-
-# Compute clustering quality metrics
-# Use a sample if too many points (silhouette is O(n^2))
-sample_size = min(1000, n_points)
-idx = np.random.choice(n_points, sample_size, replace=False)
-
-try:
-    sil_pickup = silhouette_score(pickup_points[idx], pickup_clusters[idx])
-    print(f"    Pickup Silhouette Score: {sil_pickup:.4f}")
-except Exception as e:
-    sil_pickup = None
-    print(f"    Pickup Silhouette Score: Error - {e}")
-
-try:
-    sil_dropoff = silhouette_score(dropoff_points[idx], dropoff_clusters[idx])
-    print(f"    Dropoff Silhouette Score: {sil_dropoff:.4f}")
-except Exception as e:
-    sil_dropoff = None
-    print(f"    Dropoff Silhouette Score: Error - {e}")
-
-try:
-    dbi_pickup = davies_bouldin_score(pickup_points[idx], pickup_clusters[idx])
-    print(f"    Pickup Davies-Bouldin Index: {dbi_pickup:.4f}")
-except Exception as e:
-    print(f"    Pickup DBI: Error - {e}")
-
-try:
-    dbi_dropoff = davies_bouldin_score(dropoff_points[idx], dropoff_clusters[idx])
-    print(f"    Dropoff Davies-Bouldin Index: {dbi_dropoff:.4f}")
-except Exception as e:
-    print(f"    Dropoff DBI: Error - {e}")
-
-try:
-    chi_pickup = calinski_harabasz_score(pickup_points[idx], pickup_clusters[idx])
-    print(f"    Pickup Calinski-Harabasz Index: {chi_pickup:.2f}")
-except Exception as e:
-    print(f"    Pickup CHI: Error - {e}")
-
-try:
-    chi_dropoff = calinski_harabasz_score(dropoff_points[idx], dropoff_clusters[idx])
-    print(f"    Dropoff Calinski-Harabasz Index: {chi_dropoff:.2f}")
-except Exception as e:
-    print(f"    Dropoff CHI: Error - {e}")
-
-# Intra-cluster distances
-def compute_intra_cluster_distance(points, labels, centroids):
-    """Compute average intra-cluster distance in km using haversine"""
-    distances = []
-    for i, (p, l) in enumerate(zip(points, labels)):
-        centroid = centroids[l]
-        d = haversine_distance(p[0], p[1], centroid[0], centroid[1])
-        distances.append(d)
-    return np.mean(distances), np.median(distances), np.max(distances)
-
-try:
-    mean_d, med_d, max_d = compute_intra_cluster_distance(pickup_points, pickup_clusters, kmeans_start.cluster_centers_)
-    print(f"    Pickup intra-cluster dist: mean={mean_d:.3f} km, median={med_d:.3f} km, max={max_d:.3f} km")
-except Exception as e:
-    print(f"    Pickup intra-cluster: Error - {e}")
-
-try:
-    mean_d, med_d, max_d = compute_intra_cluster_distance(dropoff_points, dropoff_clusters, kmeans_end.cluster_centers_)
-    print(f"    Dropoff intra-cluster dist: mean={mean_d:.3f} km, median={med_d:.3f} km, max={max_d:.3f} km")
-except Exception as e:
-    print(f"    Dropoff intra-cluster: Error - {e}")
-
-print(f"\n    Cluster prediction times:")
-print(f"      Pickup ({n_points} points): {pickup_cluster_time:.2f} ms ({pickup_cluster_time/n_points:.4f} ms/point)")
-print(f"      Dropoff ({n_points} points): {dropoff_cluster_time:.2f} ms ({dropoff_cluster_time/n_points:.4f} ms/point)")
-
-# Number of unique clusters used
-print(f"    Unique pickup clusters assigned: {len(np.unique(pickup_clusters))}/{kmeans_start.n_clusters}")
-print(f"    Unique dropoff clusters assigned: {len(np.unique(dropoff_clusters))}/{kmeans_end.n_clusters}")
-
-# ============================================================
-# 8. HAVERSINE DISTANCE ACCURACY
-# ============================================================
-print(f"\n[7] HAVERSINE DISTANCE VALIDATION:")
-
-# Known distances (from Google Maps for Bangalore routes)
-known_routes = [
-    # (src, dst, google_maps_approx_km)
-    ('MG Road → Electronic City', 12.9716, 77.5946, 12.8456, 77.6603, 18.0),
-    ('Whitefield → MG Road', 12.9698, 77.7499, 12.9716, 77.5946, 17.5),
-    ('Koramangala → Airport', 12.9352, 77.6245, 13.1986, 77.7066, 35.0),
-    ('Majestic → Electronic City', 12.9767, 77.5710, 12.8456, 77.6603, 20.0),
-]
-
-print(f"    Haversine vs Road Distance (known routes):")
-haversine_errors = []
-for name, lat1, lon1, lat2, lon2, road_km in known_routes:
-    hav_km = haversine_distance(lat1, lon1, lat2, lon2)
-    err = abs(hav_km - road_km)
-    err_pct = err / road_km * 100
-    ratio = road_km / hav_km if hav_km > 0 else 0
-    haversine_errors.append({'haversine': hav_km, 'road': road_km, 'error': err, 'error_pct': err_pct, 'ratio': ratio})
-    print(f"      {name}: haversine={hav_km:.2f}km, road={road_km:.1f}km, ratio={ratio:.2f}")
-
-print(f"    Mean road/haversine ratio: {np.mean([e['ratio'] for e in haversine_errors]):.2f}")
-
-# ============================================================
-# 9. END-TO-END INFERENCE PIPELINE TIMING
-# ============================================================
-print(f"\n[8] END-TO-END INFERENCE PIPELINE TIMING:")
-
-pipeline_times = []
-for _ in range(100):
-    # Simulate a full prediction request
-    tc = test_cases[np.random.randint(len(test_cases))]
-    
-    t_start = time.time()
-    
-    # Step 1: Haversine distance
-    distance = haversine_distance(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'])
-    
-    # Step 2: Bearing
-    bearing = calculate_bearing(tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'])
-    
-    # Step 3: Feature engineering
-    num_points = max(2, int(distance * 10))
-    is_weekend = 1 if tc['day_of_week'] in [5, 6] else 0
-    is_rush_hour = 1 if tc['hour'] in [7, 8, 9, 17, 18, 19] else 0
-    
-    # Step 4: K-Means clustering
-    start_cluster = kmeans_start.predict([[tc['start_lat'], tc['start_lon']]])[0]
-    end_cluster = kmeans_end.predict([[tc['end_lat'], tc['end_lon']]])[0]
-    
-    # Step 5: Build feature DataFrame
-    features = pd.DataFrame([[
-        tc['start_lat'], tc['start_lon'], tc['end_lat'], tc['end_lon'],
-        distance, bearing, 0.8, num_points,
-        tc['hour'], tc['day_of_week'], tc['month'], is_weekend, is_rush_hour,
-        start_cluster, end_cluster
-    ]], columns=feature_columns)
-    
-    # Step 6: XGBoost ETA prediction
-    duration_sec = xgb_model.predict(features)[0]
-    
-    # Step 7: Random Forest fare prediction
-    try:
-        predicted_fare = rf_model.predict(features)[0]
-    except:
-        predicted_fare = 50 + distance * 12  # fallback
-    
-    t_end = time.time()
-    pipeline_times.append((t_end - t_start) * 1000)
-
-print(f"    Full pipeline (100 iterations):")
-print(f"      Mean: {np.mean(pipeline_times):.2f} ms")
-print(f"      Median: {np.median(pipeline_times):.2f} ms")
-print(f"      Min: {np.min(pipeline_times):.2f} ms")
-print(f"      Max: {np.max(pipeline_times):.2f} ms")
-print(f"      P95: {np.percentile(pipeline_times, 95):.2f} ms")
-print(f"      P99: {np.percentile(pipeline_times, 99):.2f} ms")
-print(f"      Std: {np.std(pipeline_times):.2f} ms")
-
-# ============================================================
-# 10. ROUTE INTERPOLATION PERFORMANCE
-# ============================================================
-print(f"\n[9] ROUTE INTERPOLATION PERFORMANCE:")
-
-interp_times = []
-for _ in range(100):
-    tc = test_cases[np.random.randint(len(test_cases))]
-    t0 = time.time()
-    lats = np.linspace(tc['start_lat'], tc['end_lat'], 100)
-    lons = np.linspace(tc['start_lon'], tc['end_lon'], 100)
-    noise_lat = np.random.normal(0, 0.001, 100)
-    noise_lon = np.random.normal(0, 0.001, 100)
-    lats += noise_lat
-    lons += noise_lon
-    route = list(zip(lats, lons))
-    t1 = time.time()
-    interp_times.append((t1 - t0) * 1000)
-
-print(f"    100-point route generation (100 iterations):")
-print(f"      Mean: {np.mean(interp_times):.3f} ms")
-print(f"      P95: {np.percentile(interp_times, 95):.3f} ms")
-
-# ============================================================
-# SUMMARY FOR IEEE PAPER
-# ============================================================
-print("\n" + "=" * 70)
-print("SUMMARY OF REAL VALUES FOR IEEE PAPER")
-print("=" * 70)
-
-print(f"""
-MODEL LOADING:
-  Total: {total_load:.0f} ms ({total_load/1000:.2f} s)
-
-XGBOOST (ETA) METRICS:
-  RMSE: {np.sqrt(np.mean(errors**2)):.2f} minutes
-  MAE:  {np.mean(np.abs(errors)):.2f} minutes
-  MAPE: {mape:.1f}%
-  Inference: {np.mean(inference_times_xgb):.3f} ms (mean), {np.percentile(inference_times_xgb, 95):.3f} ms (P95)
-
-RANDOM FOREST (FARE) METRICS:""")
-if fare_predictions:
-    print(f"""  RMSE: {np.sqrt(np.mean(fare_errors**2)):.2f}
-  MAE:  {np.mean(np.abs(fare_errors)):.2f}
-  MAPE: {mape_fare:.1f}%
-  Inference: {np.mean(inference_times_rf):.3f} ms (mean)""")
-else:
-    print("  (Fare prediction failed - check model compatibility)")
-
-print(f"""
-K-MEANS CLUSTERING:
-  Pickup clusters: {kmeans_start.n_clusters}
-  Dropoff clusters: {kmeans_end.n_clusters}
-  Pickup Silhouette: {sil_pickup:.4f if sil_pickup else 'N/A'}
-  Dropoff Silhouette: {sil_dropoff:.4f if sil_dropoff else 'N/A'}
-
-PIPELINE LATENCY:
-  Full pipeline: {np.mean(pipeline_times):.2f} ms (mean), {np.percentile(pipeline_times, 95):.2f} ms (P95)
-  Route interpolation: {np.mean(interp_times):.3f} ms (mean)
-""")
-
-# Save results to JSON for paper
-results = {
-    'timestamp': datetime.now().isoformat(),
-    'model_loading': {k: round(v, 1) for k, v in load_times.items()},
-    'model_loading_total_ms': round(total_load, 1),
-    'xgboost_eta': {
-        'rmse_min': round(float(np.sqrt(np.mean(errors**2))), 2),
-        'mae_min': round(float(np.mean(np.abs(errors))), 2),
-        'mape_pct': round(float(mape), 1),
-        'inference_mean_ms': round(float(np.mean(inference_times_xgb)), 3),
-        'inference_p95_ms': round(float(np.percentile(inference_times_xgb, 95)), 3),
-        'n_predictions': len(eta_predictions),
-    },
-    'kmeans': {
-        'pickup_clusters': int(kmeans_start.n_clusters),
-        'dropoff_clusters': int(kmeans_end.n_clusters),
-        'pickup_silhouette': round(float(sil_pickup), 4) if sil_pickup else None,
-        'dropoff_silhouette': round(float(sil_dropoff), 4) if sil_dropoff else None,
-    },
-    'pipeline': {
-        'mean_ms': round(float(np.mean(pipeline_times)), 2),
-        'median_ms': round(float(np.median(pipeline_times)), 2),
-        'p95_ms': round(float(np.percentile(pipeline_times, 95)), 2),
-        'p99_ms': round(float(np.percentile(pipeline_times, 99)), 2),
-    },
-    'feature_columns': feature_columns,
-}
-
-if fare_predictions:
-    results['random_forest_fare'] = {
-        'rmse': round(float(np.sqrt(np.mean(fare_errors**2))), 2),
-        'mae': round(float(np.mean(np.abs(fare_errors))), 2),
-        'mape_pct': round(float(mape_fare), 1),
-        'inference_mean_ms': round(float(np.mean(inference_times_rf)), 3),
-        'n_predictions': len(fare_predictions),
-    }
-
-with open('IEEE_Paper/real_evaluation_results.json', 'w') as f:
-    json.dump(results, f, indent=2)
-
-print(f"Results saved to IEEE_Paper/real_evaluation_results.json")
-print("=" * 70)
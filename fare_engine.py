@@ -0,0 +1,126 @@
+"""
+Vectorized Fare Engine
+Prices whole arrays of trips at once. Each city's ``traffic_multiplier``
+is compiled once into a 24-entry hour -> multiplier table, so N fares are
+a few NumPy gathers instead of N calculate_fare() calls (each of which
+resolves the city config and scans the hour lists). The results are
+identical to calculate_fare(), rounding included.
+
+    city_ids = FARES.city_ids(['bangalore', 'porto', 'bangalore'])
+    FARES.price([5.2, 3.1, 12.0], [8, 23, 14], city_ids)    # -> array of fares
+
+Usage: python fare_engine.py [trips]   (scalar vs vectorized timing, equality check)
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from city_config import BANGALORE_CONFIG, PORTO_CONFIG, calculate_fare
+
+DEFAULT_CITY = 'bangalore'              # unknown cities price as Bangalore, like get_city_config()
+# calculate_fare() checks the periods in this order; the first match wins
+TRAFFIC_PERIODS = ('rush_hour_morning', 'rush_hour_evening', 'late_night')
+
+
+def hourly_multipliers(config):
+    """24-entry traffic multiplier table of one city config"""
+    table = np.ones(24)
+    traffic = config['traffic_multiplier']
+    for period in reversed(TRAFFIC_PERIODS):
+        table[traffic[period]['hours']] = traffic[period]['multiplier']
+    return table
+
+
+def round_cents(fares):
+    """round(fare, 2) for every element, exactly as Python rounds"""
+    rounded = np.round(fares, 2)
+    # np.round scales by 100 first, which can land a hair off a half cent;
+    # those few are re-rounded by Python's correctly rounded round()
+    scaled = fares * 100
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_half).tolist():
+        rounded[index] = round(float(fares[index]), 2)
+    return rounded
+
+
+class FareEngine:
+    """Per-city fare terms as arrays; one row per city"""
+
+    def __init__(self, configs):
+        self.cities = list(configs)
+        self._index = {name: index for index, name in enumerate(self.cities)}
+        self.base_fare = np.array([config['base_fare'] for config in configs.values()], dtype=np.float64)
+        self.per_km_rate = np.array([config['per_km_rate'] for config in configs.values()], dtype=np.float64)
+        self.multipliers = np.vstack([hourly_multipliers(config) for config in configs.values()])
+        self.currencies = [config['currency'] for config in configs.values()]
+
+    def city_id(self, name):
+        return self._index.get(name.lower(), self._index[DEFAULT_CITY])
+
+    def city_ids(self, names):
+        """City names -> row indexes (a scalar name for every trip is fine too)"""
+        if isinstance(names, str):
+            return self.city_id(names)
+        lookup = {name: self.city_id(name) for name in set(names)}
+        return np.fromiter(map(lookup.__getitem__, names), dtype=np.intp, count=len(names))
+
+    def price(self, distance_km, hours, city_ids, surge=None):
+        """Fares for arrays of trips; ``hours=None`` skips the traffic multiplier.
+
+        ``surge`` holds live zone multipliers (NaN where there is none) and
+        replaces the rush-hour premium, as in calculate_fare().
+        """
+        distance = np.asarray(distance_km, dtype=np.float64)
+        city_ids = np.asarray(city_ids, dtype=np.intp)
+        fares = self.base_fare[city_ids] + distance * self.per_km_rate[city_ids]
+        if hours is not None:
+            hours = np.asarray(hours)
+            if hours.size and (hours.min() < 0 or hours.max() > 23):
+                raise ValueError('hours must be between 0 and 23')
+            multipliers = self.multipliers[city_ids, hours.astype(np.intp)]
+        else:
+            multipliers = np.ones(np.broadcast(distance, city_ids).shape)
+        if surge is not None:
+            surge = np.asarray(surge, dtype=np.float64)
+            multipliers = np.where(np.isnan(surge), multipliers, np.minimum(multipliers, 1.0) * surge)
+        return round_cents(fares * multipliers)
+
+
+FARES = FareEngine({'bangalore': BANGALORE_CONFIG, 'porto': PORTO_CONFIG})
+
+
+def _bench(trips):
+    """Seconds for ``trips`` fares through calculate_fare() and FARES.price(); mismatches"""
+    rng = np.random.default_rng(42)
+    distances = rng.uniform(0.5, 60, trips)
+    hours = rng.integers(0, 24, trips)
+    cities = rng.choice(FARES.cities, trips).tolist()
+    distance_list, hour_list = distances.tolist(), hours.tolist()
+
+    started = time.perf_counter()
+    scalar = [calculate_fare(distance_list[i], cities[i], hour_list[i]) for i in range(trips)]
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = FARES.price(distances, hours, FARES.city_ids(cities))
+    vectorized_s = time.perf_counter() - started
+
+    mismatches = int((np.array(scalar) != vectorized).sum())
+    return scalar_s, vectorized_s, mismatches
+
+
+if __name__ == '__main__':
+    trips = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print("\n" + "="*80)
+    print("VECTORIZED FARE ENGINE")
+    print("="*80)
+    scalar_s, vectorized_s, mismatches = _bench(trips)
+    print(f"Trips: {trips} (both cities, all hours)")
+    print(f"calculate_fare loop: {scalar_s:.3f}s ({scalar_s / trips * 1e6:.2f} µs/trip)")
+    print(f"FARES.price:         {vectorized_s:.3f}s ({vectorized_s / trips * 1e6:.3f} µs/trip, "
+          f"{scalar_s / vectorized_s:.0f}x)")
+    print(f"{'✓' if not mismatches else '✗'} Fares differing from calculate_fare: {mismatches}")
+    print("="*80 + "\n")
@@ -0,0 +1,265 @@
+"""
+Fleet GPS Simulator
+asyncio runtime behind app.py's /api/start_simulation. Every simulated
+vehicle's route, precomputed segment speeds and cursor live in NumPy arrays;
+one coroutine advances the whole fleet per tick with vectorized math.
+
+The event loop runs in its own thread. Flask handlers talk to it through
+thread-safe calls, so all simulation state is only touched on the loop.
+
+Usage: python fleet_simulator.py [num_vehicles] [ticks]   (headless benchmark)
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from datetime import datetime
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+STATUS_ACTIVE = 0
+STATUS_COMPLETED = 1
+STATUS_NAMES = {STATUS_ACTIVE: 'active', STATUS_COMPLETED: 'completed'}
+
+
+def segment_speeds(lats, lons, seconds_per_point=1.0):
+    """Speed (km/h) at each route point from the haversine of its segment"""
+    lat, lon = np.radians(lats), np.radians(lons)
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    distance = EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+    return np.concatenate(([0.0], distance * 3600 / seconds_per_point))
+
+
+class FleetSimulator:
+    """Vectorized GPS stream for every simulated vehicle in the process.
+
+    ``emit(updates, completed)`` is called on the loop thread once per tick
+    with the gps_update dicts and the ids of vehicles that just finished.
+    Finished vehicles stay listed as completed for ``completed_ttl`` seconds,
+    then their slot is freed.
+    """
+
+    def __init__(self, emit, tick_interval=0.5, points_per_route=100, initial_capacity=64, completed_ttl=60.0):
+        self.emit = emit
+        self.tick_interval = tick_interval
+        self.points_per_route = points_per_route
+        self.completed_ttl = completed_ttl
+
+        self.loop = None
+        self._thread = None
+        self._ticker = None
+        self._start_lock = threading.Lock()
+
+        self._slot_by_vehicle = {}
+        self._vehicle_ids = []
+        self._free_slots = []
+        self._allocate(initial_capacity)
+
+    # ------------------------------------------------------------------
+    # Array storage (loop thread only)
+    # ------------------------------------------------------------------
+
+    def _allocate(self, capacity):
+        old = len(self._vehicle_ids)
+        points = self.points_per_route
+
+        def grow(name, shape, dtype, fill):
+            grown = np.full(shape, fill, dtype=dtype)
+            array = getattr(self, name, None)
+            if array is not None:
+                grown[:old] = array
+            setattr(self, name, grown)
+
+        grow('route_lat', (capacity, points), np.float64, 0.0)
+        grow('route_lon', (capacity, points), np.float64, 0.0)
+        grow('route_speed', (capacity, points), np.float64, 0.0)
+        grow('route_len', capacity, np.int32, 0)
+        grow('cursor', capacity, np.int32, 0)
+        grow('start_time', capacity, np.float64, 0.0)
+        grow('distance', capacity, np.float64, 0.0)
+        grow('duration', capacity, np.float64, 0.0)
+        grow('finished_at', capacity, np.float64, 0.0)
+        grow('status', capacity, np.int8, STATUS_COMPLETED)
+        grow('in_use', capacity, bool, False)
+
+        self._vehicle_ids.extend([None] * (capacity - old))
+        self._free_slots.extend(range(capacity - 1, old - 1, -1))
+
+    def _add(self, vehicle_id, lats, lons, distance, duration):
+        slot = self._slot_by_vehicle.get(vehicle_id)
+        if slot is None:
+            if not self._free_slots:
+                self._allocate(len(self._vehicle_ids) * 2)
+            slot = self._free_slots.pop()
+
+        length = min(len(lats), self.points_per_route)
+        self.route_lat[slot, :length] = lats[:length]
+        self.route_lon[slot, :length] = lons[:length]
+        self.route_speed[slot, :length] = segment_speeds(lats[:length], lons[:length])
+        self.route_len[slot] = length
+        self.cursor[slot] = 0
+        self.start_time[slot] = time.time()
+        self.distance[slot] = distance
+        self.duration[slot] = duration
+        self.status[slot] = STATUS_ACTIVE
+        self.in_use[slot] = True
+        self._vehicle_ids[slot] = vehicle_id
+        self._slot_by_vehicle[vehicle_id] = slot
+
+    def _remove(self, vehicle_id):
+        slot = self._slot_by_vehicle.pop(vehicle_id, None)
+        if slot is None:
+            return False
+        self.in_use[slot] = False
+        self.status[slot] = STATUS_COMPLETED
+        self._vehicle_ids[slot] = None
+        self._free_slots.append(slot)
+        return True
+
+    def _snapshot(self):
+        slots = np.flatnonzero(self.in_use)
+        progress = self.cursor[slots] / self.route_len[slots] * 100
+        return [
+            {'id': self._vehicle_ids[slot], 'status': STATUS_NAMES[status], 'progress': pct}
+            for slot, status, pct in zip(slots.tolist(), self.status[slots].tolist(), progress.tolist())
+        ]
+
+    # ------------------------------------------------------------------
+    # Tick
+    # ------------------------------------------------------------------
+
+    def _evict_finished(self, now):
+        expired = np.flatnonzero(self.in_use & (self.status == STATUS_COMPLETED)
+                                 & (self.finished_at <= now - self.completed_ttl))
+        for slot in expired.tolist():
+            self._remove(self._vehicle_ids[slot])
+
+    def tick(self):
+        """Emit the current point of every active vehicle and advance it"""
+        self._evict_finished(time.time())
+        slots = np.flatnonzero(self.in_use & (self.status == STATUS_ACTIVE))
+        if not len(slots):
+            return [], []
+
+        index = self.cursor[slots]
+        length = self.route_len[slots]
+        lats = self.route_lat[slots, index]
+        lons = self.route_lon[slots, index]
+        speeds = self.route_speed[slots, index]
+        progress = index / length * 100
+        elapsed = time.time() - self.start_time[slots]
+        covered = self.distance[slots] * progress / 100
+
+        timestamp = datetime.now().isoformat()
+        ids = self._vehicle_ids
+        updates = [
+            {
+                'vehicle_id': ids[slot],
+                'latitude': lat,
+                'longitude': lon,
+                'speed': speed,
+                'timestamp': timestamp,
+                'progress': pct,
+                'elapsed_time': secs,
+                'distance_covered': km
+            }
+            for slot, lat, lon, speed, pct, secs, km in zip(
+                slots.tolist(), lats.tolist(), lons.tolist(), speeds.tolist(),
+                progress.tolist(), elapsed.tolist(), covered.tolist()
+            )
+        ]
+
+        self.cursor[slots] += 1
+        done = slots[self.cursor[slots] >= length]
+        self.status[done] = STATUS_COMPLETED
+        self.finished_at[done] = time.time()
+        completed = [ids[slot] for slot in done.tolist()]
+
+        self.emit(updates, completed)
+        return updates, completed
+
+    async def _run(self):
+        next_tick = self.loop.time()
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠ Fleet simulation tick failed: {e}")
+            next_tick = max(next_tick + self.tick_interval, self.loop.time())
+            await asyncio.sleep(next_tick - self.loop.time())
+
+    # ------------------------------------------------------------------
+    # Thread-safe API for Flask handlers
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the event loop thread and the tick coroutine (idempotent, safe from concurrent callers)"""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever)
+            self._thread.daemon = True
+            self._thread.start()
+            self._ticker = asyncio.run_coroutine_threadsafe(self._run(), self.loop)
+
+    def _call(self, func, *args):
+        if self.loop is None:
+            return func(*args)
+
+        async def call():
+            return func(*args)
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
+
+    def start_vehicle(self, vehicle_id, route, distance, duration):
+        """Begin streaming ``route`` (sequence of (lat, lon)) for a vehicle"""
+        route = np.asarray(route, dtype=np.float64)
+        self._call(self._add, vehicle_id, route[:, 0], route[:, 1], distance, duration)
+
+    def stop_vehicle(self, vehicle_id):
+        """Forget a vehicle; returns False if it was unknown"""
+        return self._call(self._remove, vehicle_id)
+
+    def vehicles(self):
+        """[{'id', 'status', 'progress'}] for every known vehicle"""
+        return self._call(self._snapshot)
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self._slot_by_vehicle
+
+
+if __name__ == '__main__':
+    num_vehicles = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    emitted = []
+    fleet = FleetSimulator(emit=lambda updates, completed: emitted.append(len(updates)))
+
+    rng = np.random.default_rng(42)
+    t0 = time.perf_counter()
+    for i in range(num_vehicles):
+        start = rng.uniform([41.10, -8.70], [41.25, -8.55])
+        end = rng.uniform([41.10, -8.70], [41.25, -8.55])
+        route = np.linspace(start, end, fleet.points_per_route)
+        fleet.start_vehicle(f'PO-{i:05d}', route, distance=5.0, duration=600.0)
+    setup_ms = (time.perf_counter() - t0) * 1000
+
+    tick_times = []
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        fleet.tick()
+        tick_times.append((time.perf_counter() - t0) * 1000)
+
+    print("\n" + "="*80)
+    print("FLEET SIMULATOR BENCHMARK")
+    print("="*80)
+    print(f"Vehicles: {num_vehicles}, ticks: {ticks}, tick interval: {fleet.tick_interval * 1000:.0f} ms")
+    print(f"Route setup (incl. segment speeds): {setup_ms:.1f} ms total")
+    print(f"Tick time: mean={np.mean(tick_times):.2f}ms, p95={np.percentile(tick_times, 95):.2f}ms")
+    print(f"Updates emitted: {sum(emitted)}")
+    print(f"Tick budget used: {np.mean(tick_times) / (fleet.tick_interval * 1000) * 100:.1f}%")
+    print("="*80 + "\n")
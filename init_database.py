@@ -5,6 +5,7 @@ Creates tables and populates with sample data
 
 from app_complete import app, db
 from models import User, Vehicle, Ride, SystemSettings
+from rollups import rebuild_rollups
 from datetime import datetime, timedelta
 import random
 
@@ -129,6 +130,7 @@ def init_database():
             db.session.add(ride)
         
         db.session.commit()
+        rebuild_rollups()
         
         # Create System Settings
         print("Creating system settings...")
@@ -0,0 +1,509 @@
+"""
+End-to-End Load Test
+Starts app_complete (through serve.py) on a temporary SQLite database and
+drives it with simulated customers, drivers and admins from one asyncio
+loop. HTTP and Socket.IO are spoken over raw asyncio streams, so nothing
+beyond the app's own requirements is needed:
+
+    customer   login -> estimate-fare -> book-ride -> wait for a driver -> track
+               (viewport subscription, nearby vehicles, recent rides)
+    driver     login -> online -> accept rides pushed to the drivers room, poll summary
+    admin      login -> poll stats / vehicles / analytics / track a vehicle
+
+Reports throughput and p50/p95/p99 latency per endpoint, and socket delivery
+lag: from the request that caused a push to its arrival at the other party
+(book-ride -> drivers' pending_ride, accept-ride -> customer's customer_ride).
+
+Usage: python load_test.py [--customers 50] [--drivers 20] [--admins 2] [--duration 60] [--json report.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import base64
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from urllib.request import urlopen
+
+from serve import ASYNC_MODES, ws_recv, ws_frame
+
+PASSWORD = 'loadtest123'
+CITY = 'bangalore'
+
+
+def _percentile(values, q):
+    """``q`` quantile of an already sorted list, in ms"""
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 1) if values else 0
+
+
+class LoadMetrics:
+    """Per-endpoint latencies and per-event socket delivery lags"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.not_modified = defaultdict(int)
+        self.events = defaultdict(int)
+        self.lags = defaultdict(list)
+        self.counters = defaultdict(int)
+        self._sent = {}
+        self._early = defaultdict(list)     # pushes that beat the response carrying their key
+
+    def record(self, name, seconds, status):
+        self.latencies[name].append(seconds)
+        if status == 304:
+            self.not_modified[name] += 1
+        elif status is None or status >= 400:
+            self.errors[name] += 1
+
+    def sent_at(self, event, key, started):
+        """The request that triggers ``event`` for ``key`` was sent at ``started``"""
+        self._sent[(event, key)] = started
+        for received in self._early.pop((event, key), ()):
+            self.lags[event].append(received - started)
+
+    def received(self, event, key, at):
+        started = self._sent.get((event, key))
+        if started is None:
+            self._early[(event, key)].append(at)
+        else:
+            self.lags[event].append(at - started)
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            endpoints[name] = {
+                'requests': len(samples),
+                'rps': round(len(samples) / elapsed, 1),
+                'errors': self.errors[name],
+                'not_modified': self.not_modified[name],
+                'p50_ms': _percentile(samples, 0.50),
+                'p95_ms': _percentile(samples, 0.95),
+                'p99_ms': _percentile(samples, 0.99),
+            }
+        lags = {}
+        for event, samples in sorted(self.lags.items()):
+            samples = sorted(samples)
+            lags[event] = {
+                'deliveries': len(samples),
+                'p50_ms': _percentile(samples, 0.50),
+                'p95_ms': _percentile(samples, 0.95),
+                'p99_ms': _percentile(samples, 0.99),
+            }
+        return {
+            'elapsed_s': round(elapsed, 1),
+            'requests': sum(len(samples) for samples in self.latencies.values()),
+            'rps': round(sum(len(samples) for samples in self.latencies.values()) / elapsed, 1),
+            'endpoints': endpoints,
+            'socket_lag': lags,
+            'socket_events': dict(self.events),
+            'counters': dict(self.counters),
+        }
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 JSON client with a cookie jar and ETag revalidation"""
+
+    def __init__(self, port, metrics):
+        self.port = port
+        self.metrics = metrics
+        self.cookies = {}
+        self._etags = {}                    # path -> (etag, body) for If-None-Match
+        self._reader = self._writer = None
+
+    async def request(self, method, path, name, body=None):
+        """Returns (status, parsed JSON); status is None when the request failed"""
+        started = time.perf_counter()
+        status, data = None, None
+        for attempt in range(2):
+            reused = self._writer is not None
+            try:
+                status, data = await self._roundtrip(method, path, body)
+                break
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                self.close()
+                if not reused:              # a stale keep-alive connection gets one retry
+                    break
+        self.metrics.record(name, time.perf_counter() - started, status)
+        return status, data
+
+    async def _roundtrip(self, method, path, body):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection('127.0.0.1', self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [f'{method} {path} HTTP/1.1', f'Host: 127.0.0.1:{self.port}',
+                   f'Content-Length: {len(payload)}']
+        if body is not None:
+            headers.append('Content-Type: application/json')
+        if self.cookies:
+            headers.append('Cookie: ' + '; '.join(f'{key}={value}' for key, value in self.cookies.items()))
+        cached = self._etags.get(path) if method == 'GET' else None
+        if cached:
+            headers.append(f'If-None-Match: {cached[0]}')
+        self._writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + payload)
+
+        head = (await self._reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        version, status = head[0].split(' ', 2)[:2]
+        status = int(status)
+        response_headers = {}
+        for line in head[1:]:
+            key, _, value = line.partition(':')
+            key, value = key.strip().lower(), value.strip()
+            if key == 'set-cookie':
+                cookie, _, _ = value.partition(';')
+                self.cookies[cookie.split('=', 1)[0]] = cookie.split('=', 1)[1]
+            elif key:
+                response_headers[key] = value
+        if 'content-length' in response_headers:
+            raw = await self._reader.readexactly(int(response_headers['content-length']))
+        elif status in (204, 304):
+            raw = b''
+        else:
+            raw = await self._reader.read()
+            self.close()
+        if version == 'HTTP/1.0' or response_headers.get('connection', '').lower() == 'close':
+            self.close()
+
+        if status == 304 and cached:
+            return status, cached[1]
+        data = json.loads(raw) if raw and 'json' in response_headers.get('content-type', '') else None
+        if status == 200 and 'etag' in response_headers:
+            self._etags[path] = (response_headers['etag'], data)
+        return status, data
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class SocketClient:
+    """Socket.IO over a raw WebSocket; sends the session cookie so the server joins the user's rooms"""
+
+    def __init__(self, port, cookies, on_event, metrics):
+        self.port = port
+        self.cookies = cookies
+        self.on_event = on_event
+        self.metrics = metrics
+        self._writer = None
+        self._task = None
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_connection('127.0.0.1', self.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        cookie = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        self._writer.write((f'GET /socket.io/?EIO=4&transport=websocket HTTP/1.1\r\nHost: 127.0.0.1:{self.port}\r\n'
+                            f'Upgrade: websocket\r\nConnection: Upgrade\r\nCookie: {cookie}\r\n'
+                            f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n').encode())
+        await reader.readuntil(b'\r\n\r\n')
+        await ws_recv(reader)               # engine.io open packet
+        self._writer.write(ws_frame('40'))
+        await ws_recv(reader)               # namespace connect ack
+        self._task = asyncio.ensure_future(self._listen(reader))
+
+    async def _listen(self, reader):
+        try:
+            while True:
+                packet = await ws_recv(reader)
+                if packet == '2':
+                    self._writer.write(ws_frame('3'))
+                elif packet.startswith('42'):
+                    name, *args = json.loads(packet[2:])
+                    self.metrics.events[name] += 1
+                    self.on_event(name, args[0] if args else None, time.perf_counter())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.metrics.counters['socket_disconnects'] += 1
+
+    def emit(self, event, data):
+        self._writer.write(ws_frame('42' + json.dumps([event, data])))
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def _login(http, username):
+    status, data = await http.request('POST', '/login', 'POST /login', {'username': username, 'password': PASSWORD})
+    return status == 200 and data and data.get('success')
+
+
+async def run_customer(index, port, metrics, deadline, locations, think=(0.5, 2.0), accept_timeout=15.0):
+    """Book rides back to back; track each one once a driver has accepted it"""
+    loop = asyncio.get_running_loop()
+    http = HttpClient(port, metrics)
+    if not await _login(http, f'load_customer_{index}'):
+        return
+    accepted = {}                           # ride_id -> future set when its acceptance is pushed
+
+    def on_event(name, data, at):
+        if name == 'customer_ride' and data['status'] == 'accepted':
+            metrics.received('customer_ride', data['id'], at)
+            future = accepted.pop(data['id'], None)
+            if future is not None and not future.done():
+                future.set_result(at)
+
+    socket = SocketClient(port, http.cookies, on_event, metrics)
+    await socket.connect()
+    try:
+        while loop.time() < deadline:
+            pickup, dropoff = random.sample(list(locations), 2)
+            trip = {'city': CITY, 'pickup_location': pickup, 'dropoff_location': dropoff}
+            await http.request('POST', '/api/estimate-fare', 'POST /api/estimate-fare', trip)
+            await asyncio.sleep(random.uniform(*think))
+
+            started = time.perf_counter()
+            status, data = await http.request('POST', '/api/book-ride', 'POST /api/book-ride', trip)
+            if status != 200 or not data.get('success'):
+                await asyncio.sleep(random.uniform(*think))
+                continue
+            ride_id = data['ride']['id']
+            metrics.sent_at('pending_ride', ride_id, started)
+            accepted[ride_id] = loop.create_future()
+            try:
+                await asyncio.wait_for(accepted[ride_id], min(accept_timeout, max(0.1, deadline - loop.time())))
+                metrics.counters['rides_accepted'] += 1
+            except asyncio.TimeoutError:
+                accepted.pop(ride_id, None)
+                if loop.time() < deadline:
+                    metrics.counters['rides_not_accepted'] += 1
+                continue
+
+            # Track: the customer map's viewport plus the polling it falls back to
+            lat, lon = locations[pickup]['lat'], locations[pickup]['lon']
+            socket.emit('subscribe_viewport', {'south': lat - 0.05, 'west': lon - 0.05,
+                                               'north': lat + 0.05, 'east': lon + 0.05, 'zoom': 14})
+            for _ in range(3):
+                await http.request('GET', f'/api/nearby-vehicles/{CITY}', 'GET /api/nearby-vehicles/<city>')
+                await asyncio.sleep(random.uniform(*think))
+            await http.request('GET', '/api/customer/recent-rides', 'GET /api/customer/recent-rides')
+    finally:
+        socket.close()
+        http.close()
+
+
+async def run_driver(index, port, metrics, deadline, accept_delay=(0.2, 1.5), poll=10.0):
+    """Go online and race the other drivers for every pushed ride"""
+    loop = asyncio.get_running_loop()
+    http = HttpClient(port, metrics)
+    if not await _login(http, f'load_driver_{index}'):
+        return
+    offers = asyncio.Queue()
+    taken = set()
+
+    def on_event(name, data, at):
+        if name == 'pending_ride':
+            if data['action'] == 'added':
+                metrics.received('pending_ride', data['ride']['id'], at)
+                offers.put_nowait(data['ride']['id'])
+            else:
+                taken.add(data['ride_id'])
+
+    socket = SocketClient(port, http.cookies, on_event, metrics)
+    await socket.connect()
+    await http.request('POST', '/api/driver/status', 'POST /api/driver/status', {'online': True})
+    next_poll = 0
+    try:
+        while loop.time() < deadline:
+            if loop.time() >= next_poll:
+                await http.request('GET', '/api/driver/summary', 'GET /api/driver/summary')
+                await http.request('GET', '/api/driver/pending-rides', 'GET /api/driver/pending-rides')
+                next_poll = loop.time() + poll
+            try:
+                ride_id = await asyncio.wait_for(offers.get(), 1.0)
+            except asyncio.TimeoutError:
+                continue
+            await asyncio.sleep(random.uniform(*accept_delay))
+            if ride_id in taken:
+                continue
+            started = time.perf_counter()
+            status, data = await http.request('POST', f'/api/driver/accept-ride/{ride_id}',
+                                              'POST /api/driver/accept-ride/<id>')
+            if status == 200 and data.get('success'):
+                metrics.sent_at('customer_ride', ride_id, started)
+            else:
+                metrics.counters['accept_races_lost'] += 1
+    finally:
+        socket.close()
+        http.close()
+
+
+async def run_admin(index, port, metrics, deadline, vehicle_numbers, poll=5.0):
+    """Dashboard polling (answered with 304s while unchanged) plus vehicle tracking"""
+    loop = asyncio.get_running_loop()
+    http = HttpClient(port, metrics)
+    if not await _login(http, f'load_admin_{index}'):
+        return
+    socket = SocketClient(port, http.cookies, lambda name, data, at: None, metrics)
+    await socket.connect()
+    try:
+        while loop.time() < deadline:
+            await http.request('GET', '/api/admin/stats', 'GET /api/admin/stats')
+            await http.request('GET', '/api/admin/vehicles', 'GET /api/admin/vehicles')
+            await http.request('GET', '/api/analytics', 'GET /api/analytics')
+            await http.request('GET', f'/api/admin/track/{random.choice(vehicle_numbers)}',
+                               'GET /api/admin/track/<vehicle>')
+            await asyncio.sleep(poll)
+    finally:
+        socket.close()
+        http.close()
+
+
+def seed_database(db_path, customers, drivers, admins):
+    """Load-test users (one shared password) and an available vehicle per driver; returns vehicle numbers"""
+    from flask import Flask
+    from werkzeug.security import generate_password_hash
+    from models import db, User, Vehicle
+    from migrate_database import upgrade_schema
+    from city_config import get_city_config
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+    locations = list(get_city_config(CITY)['locations'].values())
+    # Hashing once keeps seeding fast; every login still pays the password check
+    password_hash = generate_password_hash(PASSWORD)
+    vehicle_numbers = []
+    with app.app_context():
+        upgrade_schema()
+        for role, count in (('customer', customers), ('driver', drivers), ('admin', admins)):
+            for index in range(count):
+                username = f'load_{role}_{index}'
+                db.session.add(User(username=username, email=f'{username}@loadtest.local', full_name=username,
+                                    role=role, password_hash=password_hash))
+        db.session.flush()
+        for index, user in enumerate(User.query.filter_by(role='driver').order_by(User.id)):
+            location = locations[index % len(locations)]
+            vehicle_numbers.append(f'LT-{index:04d}')
+            db.session.add(Vehicle(driver_id=user.id, vehicle_number=vehicle_numbers[-1], vehicle_type='sedan',
+                                   city=CITY, status='offline', current_lat=location['lat'],
+                                   current_lon=location['lon']))
+        db.session.commit()
+    return vehicle_numbers
+
+
+def _wait_until_ready(port, server, timeout=90.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            return False
+        try:
+            urlopen(f'http://127.0.0.1:{port}/api/locations/{CITY}', timeout=2).read()
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+async def _drive(port, customers, drivers, admins, duration, ramp, vehicle_numbers, metrics):
+    from city_config import get_city_config
+    loop = asyncio.get_running_loop()
+    locations = get_city_config(CITY)['locations']
+    deadline = loop.time() + ramp + duration
+    users = ([run_driver(i, port, metrics, deadline) for i in range(drivers)] +
+             [run_admin(i, port, metrics, deadline, vehicle_numbers) for i in range(admins)] +
+             [run_customer(i, port, metrics, deadline, locations) for i in range(customers)])
+
+    async def staggered(delay, user):
+        await asyncio.sleep(delay)
+        try:
+            await user
+        except (OSError, asyncio.IncompleteReadError) as e:
+            metrics.counters['users_failed'] += 1
+            print(f"⚠ Simulated user failed: {e!r}", flush=True)
+
+    # Drivers and admins first, so the first bookings have someone to accept them
+    started = time.perf_counter()
+    await asyncio.gather(*(staggered(ramp * i / len(users), user) for i, user in enumerate(users)))
+    return time.perf_counter() - started
+
+
+def run_load_test(customers=50, drivers=20, admins=2, duration=60, ramp=5, mode='auto', port=5760):
+    """Seed a temp DB, start the server, run the simulated users; returns the report dict"""
+    with tempfile.TemporaryDirectory(prefix='rideshare-load-') as workdir:
+        db_path = os.path.join(workdir, 'load.db')
+        vehicle_numbers = seed_database(db_path, customers, drivers, admins)
+        basedir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', SIMULATION_MODE='local')
+        env.pop('SOCKETIO_MESSAGE_QUEUE', None)
+        with open(os.path.join(workdir, 'server.log'), 'w+') as log:
+            server = subprocess.Popen([sys.executable, os.path.join(basedir, 'serve.py'), '--app', 'app_complete',
+                                       '--mode', mode, '--host', '127.0.0.1', '--port', str(port)],
+                                      cwd=basedir, env=env, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                if not _wait_until_ready(port, server):
+                    log.seek(0)
+                    raise RuntimeError('Server did not start:\n' + log.read()[-2000:])
+                metrics = LoadMetrics()
+                elapsed = asyncio.run(_drive(port, customers, drivers, admins, duration, ramp,
+                                             vehicle_numbers, metrics))
+                report = metrics.report(elapsed)
+                report['users'] = {'customers': customers, 'drivers': drivers, 'admins': admins}
+
+                # Server-side view of the same run
+                async def server_stats():
+                    http = HttpClient(port, LoadMetrics())
+                    await _login(http, 'load_admin_0')
+                    _, event_bus = await http.request('GET', '/api/admin/event-bus', 'event-bus')
+                    http.close()
+                    return event_bus
+                if admins:
+                    report['event_bus'] = asyncio.run(server_stats())
+                return report
+            finally:
+                server.terminate()
+                server.wait()
+
+
+def print_report(report):
+    users = report['users']
+    print(f"\nUsers: {users['customers']} customers, {users['drivers']} drivers, {users['admins']} admins; "
+          f"{report['requests']} requests in {report['elapsed_s']}s ({report['rps']} req/s)")
+    print(f"\n{'endpoint':<38}{'reqs':>7}{'req/s':>8}{'err':>5}{'304':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in report['endpoints'].items():
+        print(f"{name:<38}{row['requests']:>7}{row['rps']:>8}{row['errors']:>5}{row['not_modified']:>6}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+    print(f"\n{'socket delivery lag':<38}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    labels = {'pending_ride': 'book-ride -> drivers (pending_ride)',
+              'customer_ride': 'accept-ride -> customer (customer_ride)'}
+    for event, row in report['socket_lag'].items():
+        print(f"{labels.get(event, event):<38}{row['deliveries']:>7}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row['p99_ms']:>9}")
+    print(f"\nSocket events received: {report['socket_events']}")
+    print(f"Counters: {report['counters']}")
+    if report.get('event_bus'):
+        print(f"Server event bus: {report['event_bus']['published']} events published, "
+              f"queue depths {report['event_bus']['queue_depths']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='load_test.py')
+    parser.add_argument('--customers', type=int, default=50)
+    parser.add_argument('--drivers', type=int, default=20)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=60, help='seconds after the ramp-up')
+    parser.add_argument('--ramp', type=float, default=5, help='seconds over which users start')
+    parser.add_argument('--mode', default='auto', choices=('auto',) + ASYNC_MODES)
+    parser.add_argument('--port', type=int, default=5760)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("RIDESHARE PRO - END-TO-END LOAD TEST")
+    print("="*80)
+    print(f"app_complete via serve.py --mode {args.mode} on a temporary SQLite database; "
+          f"{args.ramp:g}s ramp-up + {args.duration:g}s")
+    report = run_load_test(args.customers, args.drivers, args.admins, args.duration, args.ramp, args.mode, args.port)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.json}")
+    print("="*80 + "\n")
@@ -0,0 +1,288 @@
+"""
+Memory Introspection
+What a long-running server process is holding on to: RSS, the size of
+each registered in-process structure (simulations, fan-out state, event
+bus, profiler buffers, ...), and tracemalloc snapshot diffs that point at
+the source lines whose allocations keep growing.
+
+    memory = MemoryInspector()
+    memory.register('ride_engine', lambda: ride_engine, count=lambda: ride_engine.active_count)
+    memory.overview()                 # rss + per-structure items/KB
+    memory.take_snapshot()            # starts tracemalloc; the baseline for diff()
+    memory.diff(limit=20)             # top allocation growth since the baseline
+
+The soak mode drives both simulation engines (RideSimulationEngine for the
+ride apps, FleetSimulator for app.py) with a steady stream of new rides
+and fails if RSS or any structure keeps growing after the warm-up.
+
+Usage:
+    python memory_stats.py soak [--duration 4h] [--rides-per-tick 5] [--max-growth-mb 16] [--realtime]
+"""
+
+import gc
+import os
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+import threading
+import types
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+MAX_OBJECTS = 500_000                   # deep_size() gives up (and says so) beyond this
+
+
+def rss_bytes():
+    """Current resident set size; peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _own_object(obj):
+    """Instances of this project's classes are followed; library objects are not"""
+    module = sys.modules.get(type(obj).__module__)
+    return getattr(module, '__file__', None) is not None and module.__file__.startswith(_PACKAGE_DIR)
+
+
+def deep_size(root):
+    """Approximate retained bytes: containers, NumPy buffers and project objects under ``root``.
+
+    References into Flask, Socket.IO, SQLAlchemy etc. are counted shallowly,
+    so a structure that holds the app is not billed for the whole process.
+    """
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIP):
+            continue
+        seen.add(id(obj))
+        if len(seen) > MAX_OBJECTS:
+            return total, True
+        if isinstance(obj, np.ndarray):
+            total += sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, _CONTAINERS):
+            stack.extend(obj)
+        elif obj is root or _own_object(obj):
+            if hasattr(obj, '__dict__'):
+                stack.append(vars(obj))
+            for name in getattr(type(obj), '__slots__', ()):
+                if hasattr(obj, name):
+                    stack.append(getattr(obj, name))
+    return total, False
+
+
+class MemoryInspector:
+    """Registered structures, RSS and tracemalloc baselines for one process"""
+
+    def __init__(self, frames=10):
+        self.frames = frames
+        self._structures = {}               # name -> (getter, count)
+        self._baseline = None
+        self.baseline_at = None
+        self._lock = threading.Lock()
+
+    def register(self, name, getter, count=None):
+        """Report ``getter()``'s size as ``name``; ``count()`` overrides len() for the item count"""
+        self._structures[name] = (getter, count)
+
+    def structures(self):
+        sizes = {}
+        for name, (getter, count) in self._structures.items():
+            obj = getter()
+            size, truncated = deep_size(obj)
+            if count is not None:
+                items = count()
+            else:
+                items = len(obj) if hasattr(obj, '__len__') else None
+            sizes[name] = {'items': items, 'kb': round(size / 1024, 1)}
+            if truncated:
+                sizes[name]['truncated'] = True
+        return sizes
+
+    def overview(self):
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            'rss_mb': round(rss_bytes() / 2**20, 1),
+            'gc_objects': len(gc.get_objects()),
+            'threads': threading.active_count(),
+            'structures': self.structures(),
+            'tracemalloc': {
+                'tracing': tracemalloc.is_tracing(),
+                'traced_mb': round(traced / 2**20, 2),
+                'peak_mb': round(peak / 2**20, 2),
+                'baseline_at': self.baseline_at,
+            },
+        }
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def take_snapshot(self):
+        """Start tracing if needed and make the current heap the diff() baseline"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self._baseline = self._snapshot()
+            self.baseline_at = datetime.now().isoformat(timespec='seconds')
+        return self.overview()['tracemalloc']
+
+    def diff(self, limit=20, group='lineno'):
+        """Top allocation growth since the baseline, or None without one"""
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                return None
+            stats = self._snapshot().compare_to(self._baseline, group)
+        return [{
+            'where': stat.traceback.format(limit=3 if group == 'traceback' else 1),
+            'size_kb': round(stat.size / 1024, 1),
+            'size_diff_kb': round(stat.size_diff / 1024, 1),
+            'count_diff': stat.count_diff,
+        } for stat in stats[:limit]]
+
+    def stop_tracing(self):
+        """Stop tracemalloc (it slows every allocation) and drop the baseline"""
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+            self.baseline_at = None
+
+
+def parse_duration(text):
+    """'90s' / '30m' / '4h' (or plain seconds) -> seconds"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smh]?)', text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f'Bad duration: {text!r}')
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+
+
+def _route(rng, points):
+    start = rng.uniform([12.85, 77.50], [13.10, 77.75])
+    end = rng.uniform([12.85, 77.50], [13.10, 77.75])
+    return np.linspace(start, end, points) + rng.normal(0, 0.001, (points, 2))
+
+
+def soak(duration, rides_per_tick=5, sample_every=10.0, warmup=0.2, max_growth_mb=16.0,
+         realtime=False, report=None):
+    """Run both simulators for ``duration`` seconds; returns (passed, samples, failures)"""
+    from ride_simulator import RideSimulationEngine
+    from fleet_simulator import FleetSimulator
+
+    rng = np.random.default_rng(42)
+    ride_engine = RideSimulationEngine(emit=lambda updates: None, persist=lambda rows: None)
+    # Back-to-back ticks compress minutes into seconds; keep completed vehicles one tick only
+    fleet = FleetSimulator(emit=lambda updates, completed: None, completed_ttl=60.0 if realtime else 0.0)
+    memory = MemoryInspector()
+    memory.register('ride_engine', lambda: ride_engine, count=lambda: ride_engine.active_count)
+    memory.register('fleet', lambda: fleet, count=lambda: len(fleet.vehicles()))
+
+    samples = []
+    next_id = 0
+    ticks = 0
+    started = time.monotonic()
+    next_sample = started
+    while True:
+        now = time.monotonic()
+        if now >= next_sample:
+            gc.collect()
+            structures = memory.structures()
+            sample = {'elapsed_s': round(now - started, 1), 'ticks': ticks, 'rss_mb': rss_bytes() / 2**20,
+                      **{f'{name}_kb': info['kb'] for name, info in structures.items()},
+                      **{f'{name}_items': info['items'] for name, info in structures.items()}}
+            samples.append(sample)
+            if report:
+                report(sample)
+            next_sample += sample_every
+            if now - started >= duration:
+                break
+
+        for _ in range(rides_per_tick):
+            route = _route(rng, ride_engine.points_per_route)
+            ride_engine.add_ride(next_id, route, vehicle_pk=next_id % 50)
+            fleet.start_vehicle(f'SOAK-{next_id}', route, distance=5.0, duration=600.0)
+            next_id += 1
+        ride_engine.tick()
+        fleet.tick()
+        ticks += 1
+        if realtime:
+            time.sleep(ride_engine.tick_interval)
+
+    # Everything after the warm-up must stay flat: RSS within the allowance,
+    # structures no larger than the warm-up's high-water mark (plus slack)
+    settled = [s for s in samples if s['elapsed_s'] >= duration * warmup] or samples[-1:]
+    warm = [s for s in samples if s['elapsed_s'] < duration * warmup] or samples[:1]
+    failures = []
+    growth = max(s['rss_mb'] for s in settled) - settled[0]['rss_mb']
+    if growth > max_growth_mb:
+        failures.append(f'RSS grew {growth:.1f} MB after warm-up (allowed {max_growth_mb} MB)')
+    for key in samples[0]:
+        if key.endswith(('_kb', '_items')):
+            ceiling = max(s[key] for s in warm + settled[:1]) * 1.5 + 64
+            peak = max(s[key] for s in settled)
+            if peak > ceiling:
+                failures.append(f'{key} kept growing: {peak} after warm-up vs {ceiling:.0f} allowed')
+    return not failures, samples, failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='memory_stats.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    soak_parser = commands.add_parser('soak', help='run the simulators and assert bounded memory')
+    soak_parser.add_argument('--duration', type=parse_duration, default=parse_duration('5m'),
+                             help='wall time, e.g. 90s, 30m, 4h (default 5m)')
+    soak_parser.add_argument('--rides-per-tick', type=int, default=5)
+    soak_parser.add_argument('--sample-every', type=parse_duration, default=10.0)
+    soak_parser.add_argument('--max-growth-mb', type=float, default=16.0,
+                             help='allowed RSS growth after the warm-up (first 20%%)')
+    soak_parser.add_argument('--realtime', action='store_true',
+                             help='tick at the engine interval instead of back to back')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("MEMORY SOAK TEST")
+    print("="*80)
+    print(f"Duration {args.duration:.0f}s, {args.rides_per_tick} new rides per tick, "
+          f"{'real-time' if args.realtime else 'back-to-back'} ticks")
+    print(f"\n{'elapsed s':>10}{'ticks':>10}{'RSS MB':>10}{'engine rides':>14}{'engine KB':>12}"
+          f"{'fleet vehicles':>16}{'fleet KB':>10}")
+
+    def print_sample(sample):
+        print(f"{sample['elapsed_s']:>10.0f}{sample['ticks']:>10}{sample['rss_mb']:>10.1f}"
+              f"{sample['ride_engine_items']:>14}{sample['ride_engine_kb']:>12.0f}"
+              f"{sample['fleet_items']:>16}{sample['fleet_kb']:>10.0f}", flush=True)
+
+    passed, samples, failures = soak(args.duration, args.rides_per_tick, args.sample_every,
+                                     max_growth_mb=args.max_growth_mb, realtime=args.realtime,
+                                     report=print_sample)
+    print()
+    for failure in failures:
+        print(f"✗ {failure}")
+    if passed:
+        print(f"✓ Memory bounded over {samples[-1]['ticks']} ticks")
+    print("="*80 + "\n")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,388 @@
+"""
+Socket.IO Message Queue
+Scale-out mode for the realtime server. With SOCKETIO_MESSAGE_QUEUE set,
+every worker process shares Socket.IO emits and room membership through a
+pub/sub backend, so rooms such as ``drivers``, ``admins``, ``customer_<id>``
+and ``ride_<id>`` reach clients on any worker. A separate simulator process
+can emit through the same queue.
+
+    redis://host:6379/0       Redis (needs the ``redis`` package)
+    local://127.0.0.1:6390    LocalBroker below (tests / a single host)
+
+Vehicle movement ticks travel on their own channel (VehicleTickRelay) so
+each worker runs its viewport fan-out for its own clients only.
+
+Usage:
+    python message_queue.py broker [host:port]      run the local stand-in broker
+    python message_queue.py bench [clients] [msgs]  fan-out throughput for 1/2/4/8 workers
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from multiprocessing.connection import Listener, Client
+from urllib.parse import urlparse
+
+import socketio
+
+MESSAGE_QUEUE_ENV = 'SOCKETIO_MESSAGE_QUEUE'
+LOCAL_AUTHKEY = os.environ.get('MESSAGE_QUEUE_AUTHKEY', 'rideshare-mq').encode()
+VEHICLE_TICK_CHANNEL = 'vehicle_ticks'
+
+
+def message_queue_url():
+    """The configured queue URL, or None for single-process mode"""
+    return os.environ.get(MESSAGE_QUEUE_ENV) or None
+
+
+def _address(url):
+    parsed = urlparse(url)
+    return parsed.hostname or '127.0.0.1', parsed.port or 6390
+
+
+# ========================
+# Local stand-in broker
+# ========================
+
+class LocalBroker:
+    """Minimal pub/sub broker: forwards every published frame to the
+    connections subscribed to its channel.
+
+    Wire protocol (multiprocessing.connection, authenticated with authkey):
+    the first frame a client sends lists its channels (newline separated,
+    empty for publish-only); after that each frame is ``channel\\0payload``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6390, authkey=LOCAL_AUTHKEY):
+        self.listener = Listener((host, port), authkey=authkey)
+        self.address = self.listener.address
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> {connection: send lock}
+
+    def serve_forever(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return
+            except Exception:
+                continue  # failed authentication
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def start(self):
+        """Serve from a daemon thread; returns self"""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def close(self):
+        self.listener.close()
+
+    def _serve(self, connection):
+        channels = [c for c in connection.recv_bytes().decode().split('\n') if c]
+        send_lock = threading.Lock()
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, {})[connection] = send_lock
+        try:
+            while True:
+                frame = connection.recv_bytes()
+                channel = frame[:frame.index(b'\0')].decode()
+                with self._lock:
+                    targets = list(self._subscribers.get(channel, {}).items())
+                for target, lock in targets:
+                    try:
+                        with lock:
+                            target.send_bytes(frame)
+                    except (OSError, EOFError):
+                        self._drop(target)
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            self._drop(connection)
+            connection.close()
+
+    def _drop(self, connection):
+        with self._lock:
+            for subscribers in self._subscribers.values():
+                subscribers.pop(connection, None)
+
+
+class LocalPubSub:
+    """Client for LocalBroker"""
+
+    def __init__(self, url, authkey=LOCAL_AUTHKEY):
+        self.address = _address(url)
+        self.authkey = authkey
+        self._publisher = None
+        self._lock = threading.Lock()
+
+    def _connect(self, channels=()):
+        connection = Client(self.address, authkey=self.authkey)
+        connection.send_bytes('\n'.join(channels).encode())
+        return connection
+
+    def publish(self, channel, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        frame = channel.encode() + b'\0' + payload
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect()
+                    self._publisher.send_bytes(frame)
+                    return
+                except (OSError, EOFError):
+                    self._publisher = None
+                    if attempt:
+                        raise
+
+    def listen(self, channels):
+        """Yield (channel, payload bytes); reconnects if the broker restarts"""
+        while True:
+            try:
+                connection = self._connect(channels)
+            except OSError:
+                time.sleep(1)
+                continue
+            try:
+                while True:
+                    frame = connection.recv_bytes()
+                    split = frame.index(b'\0')
+                    yield frame[:split].decode(), frame[split + 1:]
+            except (OSError, EOFError):
+                connection.close()
+                time.sleep(1)
+
+
+class RedisPubSub:
+    """Redis PUBLISH/SUBSCRIBE with the same interface as LocalPubSub"""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('redis:// message queues need the redis package (pip install redis)')
+        self.redis = redis.Redis.from_url(url)
+
+    def publish(self, channel, payload):
+        self.redis.publish(channel, payload)
+
+    def listen(self, channels):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        for message in pubsub.listen():
+            if message['type'] == 'message':
+                yield message['channel'].decode(), message['data']
+
+
+def connect_backend(url):
+    """Pub/sub backend for a queue URL"""
+    scheme = urlparse(url).scheme
+    if scheme in ('redis', 'rediss'):
+        return RedisPubSub(url)
+    if scheme == 'local':
+        return LocalPubSub(url)
+    raise ValueError(f'Unsupported message queue URL: {url}')
+
+
+# ========================
+# Socket.IO integration
+# ========================
+
+class QueueManager(socketio.PubSubManager):
+    """python-socketio client manager on top of connect_backend()"""
+
+    name = 'mq'
+
+    def __init__(self, url, channel='socketio', write_only=False, logger=None):
+        self.backend = connect_backend(url)
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _publish(self, data):
+        self.backend.publish(self.channel, self.json.dumps(data))
+
+    def _listen(self):
+        for _, payload in self.backend.listen([self.channel]):
+            yield payload
+
+
+def socketio_options(url=None):
+    """Extra SocketIO(...) kwargs: a shared client manager in scale-out mode"""
+    url = url or message_queue_url()
+    return {'client_manager': QueueManager(url)} if url else {}
+
+
+def external_emitter(url=None):
+    """Write-only manager for processes that emit but serve no clients:
+    ``external_emitter().emit('ride_update', data, namespace='/', room='admins')``"""
+    return QueueManager(url or message_queue_url(), write_only=True)
+
+
+class VehicleTickRelay:
+    """Carries each simulator tick (list of vehicle states) to every worker"""
+
+    def __init__(self, url, channel=VEHICLE_TICK_CHANNEL):
+        self.backend = connect_backend(url)
+        self.channel = channel
+        self._thread = None
+
+    def publish(self, states):
+        self.backend.publish(self.channel, json.dumps(states))
+
+    def start(self, on_tick):
+        """Call ``on_tick(states)`` from a listener thread for every tick (idempotent)"""
+        if self._thread is not None:
+            return
+
+        def listen():
+            for _, payload in self.backend.listen([self.channel]):
+                try:
+                    on_tick(json.loads(payload))
+                except Exception as e:
+                    print(f"⚠ Vehicle tick relay failed: {e}")
+
+        self._thread = threading.Thread(target=listen)
+        self._thread.daemon = True
+        self._thread.start()
+
+
+# ========================
+# Benchmark
+# ========================
+
+def _bench_worker(url, port, ready):
+    """Minimal Flask-SocketIO worker: every client joins the room in its query string"""
+    import logging
+    import flask.cli
+    from flask import Flask, request
+    from flask_socketio import SocketIO, join_room
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    flask.cli.show_server_banner = lambda *args: None
+    app = Flask(__name__)
+    worker_socketio = SocketIO(app, async_mode='threading', **socketio_options(url))
+
+    @worker_socketio.on('connect')
+    def connect():
+        join_room(request.args.get('room', 'admins'))
+
+    ready.set()
+    worker_socketio.run(app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True, log_output=False)
+
+
+def _bench_clients(port, count, messages, ready, done, results):
+    """Raw Engine.IO websocket clients; reports the time the last one got every message"""
+    import simple_websocket
+
+    def client(index, connected, finished):
+        ws = simple_websocket.Client.connect(
+            f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket&room=admins')
+        ws.receive()            # engine.io open packet
+        ws.send('40')           # connect to namespace '/'
+        ws.receive()            # namespace connect ack
+        connected.release()
+        received = 0
+        while received < messages:
+            packet = ws.receive()
+            if packet == '2':
+                ws.send('3')
+            elif packet.startswith('42'):
+                received += 1
+        finished.append(time.perf_counter())
+        ws.close()
+
+    connected = threading.Semaphore(0)
+    finished = []
+    threads = [threading.Thread(target=client, args=(i, connected, finished), daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        connected.acquire()
+    ready.set()
+    for thread in threads:
+        thread.join()
+    results.put(max(finished))
+    done.set()
+
+
+def benchmark(workers, clients, messages, url):
+    """Deliveries/second for ``clients`` spread over ``workers`` processes"""
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    results = context.Queue()
+    base_port = 5600 + workers * 10
+    client_events = []
+
+    for index in range(workers):
+        ready = context.Event()
+        process = context.Process(target=_bench_worker, args=(url, base_port + index, ready), daemon=True)
+        process.start()
+        ready.wait()
+        processes.append(process)
+    time.sleep(1.0)  # let the worker servers bind
+
+    per_worker = [clients // workers + (1 if i < clients % workers else 0) for i in range(workers)]
+    for index, count in enumerate(per_worker):
+        ready, done = context.Event(), context.Event()
+        process = context.Process(target=_bench_clients,
+                                  args=(base_port + index, count, messages, ready, done, results), daemon=True)
+        process.start()
+        processes.append(process)
+        client_events.append((ready, done))
+    for ready, _ in client_events:
+        ready.wait()
+    time.sleep(0.5)  # room joins propagate through the queue
+
+    emitter = external_emitter(url)
+    payload = {'vehicle_id': 'KA-01-1000', 'lat': 12.9716, 'lon': 77.5946, 'status': 'busy'}
+    started = time.perf_counter()
+    for seq in range(messages):
+        emitter.emit('gps_update', dict(payload, seq=seq), namespace='/', room='admins')
+    for _, done in client_events:
+        done.wait()
+    # perf_counter is system-wide on Linux, so client timestamps are comparable
+    elapsed = max(results.get() for _ in client_events) - started
+
+    for process in processes:
+        process.terminate()
+    return clients * messages / elapsed, elapsed
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'broker'
+
+    if command == 'broker':
+        host, port = _address(f"local://{sys.argv[2] if len(sys.argv) > 2 else '127.0.0.1:6390'}")
+        broker = LocalBroker(host, port)
+        print(f"✓ Local message queue broker on local://{host}:{port}")
+        broker.serve_forever()
+
+    elif command == 'bench':
+        clients = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+        messages = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        url = message_queue_url()
+        if url is None:
+            broker = LocalBroker('127.0.0.1', 0).start()
+            url = f'local://127.0.0.1:{broker.address[1]}'
+
+        print("\n" + "="*80)
+        print("SOCKET.IO MESSAGE QUEUE FAN-OUT BENCHMARK")
+        print("="*80)
+        print(f"Queue: {url}, clients: {clients} (room 'admins'), messages: {messages}, CPUs: {os.cpu_count()}")
+        print(f"{'workers':>8}{'elapsed s':>12}{'deliveries/s':>15}")
+        for workers in (1, 2, 4, 8):
+            rate, elapsed = benchmark(workers, clients, messages, url)
+            print(f"{workers:>8}{elapsed:>12.2f}{rate:>15.0f}")
+        print("="*80 + "\n")
+
+    else:
+        print(__doc__)
+        sys.exit(1)
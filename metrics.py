@@ -0,0 +1,383 @@
+"""
+Prometheus Metrics
+Counters, gauges and histograms served in the Prometheus text format at
+/metrics, without a client library. Each labelled series has its own small
+lock, held for a couple of additions, so instrumentation stays on in
+production; label values are normalised (route templates, room kinds, SQL
+verbs) to keep the number of series bounded.
+
+    instrument_app(app)             HTTP latency per route + GET /metrics
+    instrument_socketio(socketio)   emits per event and room kind
+    instrument_db()                 query time per SQL verb (every engine)
+    PREDICT_STAGE_SECONDS           predict_trip_duration stages
+    observe_tick(loop, s, interval) simulation tick duration and overruns
+    SOCKETIO_CONNECTIONS            connected Socket.IO clients
+
+Set METRICS_TOKEN to require ``Authorization: Bearer <token>`` on /metrics.
+
+Usage: python metrics.py   (instrumentation overhead benchmark)
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response, request, g
+
+from request_lifecycle import on_request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# SQL and model stages are much shorter than HTTP requests
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    """Context manager observing the elapsed seconds into a histogram series"""
+
+    __slots__ = ('series', 'started')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.series.observe(time.perf_counter() - self.started)
+
+
+class _CounterSeries:
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self, metric):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, '', self.value
+
+
+class _GaugeSeries(_CounterSeries):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramSeries:
+    __slots__ = ('_lock', '_bounds', 'counts', 'sum')
+
+    def __init__(self, metric):
+        self._lock = threading.Lock()
+        self._bounds = metric.buckets
+        self.counts = [0] * (len(metric.buckets) + 1)   # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self._bounds + (float('inf'),), counts):
+            cumulative += count
+            yield f'{name}_bucket', labels, f'le="{_format_value(bound)}"', cumulative
+        yield f'{name}_sum', labels, '', total
+        yield f'{name}_count', labels, '', cumulative
+
+
+class Metric:
+    """A named metric; ``labels(*values)`` returns the series for one label set"""
+
+    kind = None
+    series_class = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            with self._lock:
+                series = self._series.setdefault(values, self.series_class(self))
+        return series
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series_by_labels = sorted(self._series.items())
+        for values, series in series_by_labels:
+            for name, labels, extra, value in series.samples(self.name, values):
+                lines.append(f'{name}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+    series_class = _CounterSeries
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+    series_class = _GaugeSeries
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+    series_class = _HistogramSeries
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests by route template and status', ('method', 'route', 'status'))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template', ('method', 'route'))
+PREDICT_STAGE_SECONDS = REGISTRY.histogram(
+    'predict_trip_duration_stage_seconds', 'predict_trip_duration time per stage (features, clustering, model)',
+    ('stage',), FAST_BUCKETS)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'db_query_duration_seconds', 'SQL statement execution time by verb', ('operation',), FAST_BUCKETS)
+SOCKETIO_EMITS = REGISTRY.counter(
+    'socketio_emits_total', 'Socket.IO emits by event and room kind', ('event', 'room'))
+SOCKETIO_CONNECTIONS = REGISTRY.gauge(
+    'socketio_connections', 'Connected Socket.IO clients in this process')
+SIMULATION_TICK_SECONDS = REGISTRY.histogram(
+    'simulation_tick_duration_seconds', 'Simulation loop tick duration', ('loop',))
+SIMULATION_TICK_OVERRUNS = REGISTRY.counter(
+    'simulation_tick_overruns_total', 'Simulation ticks that took longer than their interval', ('loop',))
+
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA'}
+_NUMBERED_ROOM = re.compile(r'^([a-z]+)_\d+$')
+_db_instrumented = False
+
+
+def room_label(room):
+    """Bounded label for an emit target: broadcast, a room kind (customer_<id>) or a single client"""
+    if room is None:
+        return 'broadcast'
+    if not isinstance(room, str):
+        return 'multiple'
+    match = _NUMBERED_ROOM.match(room)
+    if match:
+        return f'{match.group(1)}_<id>'
+    # Named rooms are lowercase words; anything else is a client sid
+    return room if room.isalpha() and room.islower() else 'client'
+
+
+def observe_tick(loop, seconds, interval):
+    """Record one simulation tick; longer than ``interval`` counts as an overrun"""
+    SIMULATION_TICK_SECONDS.labels(loop).observe(seconds)
+    if seconds > interval:
+        SIMULATION_TICK_OVERRUNS.labels(loop).inc()
+
+
+def metrics_response():
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', 401, content_type='text/plain')
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+def instrument_app(app):
+    """Per-route request counts/latency (by URL rule, not raw path) and the /metrics endpoint"""
+
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    def record_request(response, exception):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return
+        status = response.status_code if response is not None else 500
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        HTTP_REQUEST_SECONDS.labels(request.method, route).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(request.method, route, str(status)).inc()
+
+    on_request(app, start_request_timer, record_request)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_response)
+
+
+def instrument_socketio(socketio):
+    """Count every emit (server-wide and handler emit()s both go through socketio.emit)"""
+    emit = socketio.emit
+
+    @wraps(emit)
+    def counted_emit(event, *args, **kwargs):
+        SOCKETIO_EMITS.labels(event, room_label(kwargs.get('to') or kwargs.get('room'))).inc()
+        return emit(event, *args, **kwargs)
+
+    socketio.emit = counted_emit
+
+
+def instrument_db():
+    """Time every SQL statement on every engine (installed once per process)"""
+    global _db_instrumented
+    if _db_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_started'].pop()
+        operation = statement.lstrip()[:8].split(None, 1)[0].upper() if statement.strip() else ''
+        DB_QUERY_SECONDS.labels(operation if operation in SQL_OPERATIONS else 'OTHER') \
+            .observe(time.perf_counter() - started)
+
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is not None and context.connection.info.get('metrics_started'):
+            context.connection.info['metrics_started'].pop()
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(Engine, 'handle_error', handle_error)
+    _db_instrumented = True
+
+
+def _bench(operations, threads):
+    """ns per operation for counter inc, histogram observe and a timed block, over ``threads`` threads"""
+    registry = MetricsRegistry()
+    counter = registry.counter('bench_total', 'bench', ('event', 'room'))
+    histogram = registry.histogram('bench_seconds', 'bench', ('route',))
+    cases = {
+        'counter.labels().inc()': lambda: counter.labels('vehicle_batch', 'client').inc(),
+        'histogram.labels().observe()': lambda: histogram.labels('/api/analytics').observe(0.012),
+        'with histogram.time()': lambda: _timed_block(histogram),
+    }
+    results = {}
+    for label, operation in cases.items():
+        def work():
+            for _ in range(operations):
+                operation()
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        results[label] = (time.perf_counter() - started) / (operations * threads) * 1e9
+    return results, registry
+
+
+def _timed_block(histogram):
+    with histogram.labels('/api/analytics').time():
+        pass
+
+
+if __name__ == '__main__':
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("\n" + "="*80)
+    print("METRICS INSTRUMENTATION OVERHEAD")
+    print("="*80)
+    for threads in (1, 4):
+        results, registry = _bench(operations, threads)
+        print(f"\n{threads} thread(s), {operations} operations each:")
+        for label, ns in results.items():
+            print(f"  {label:<32}{ns:>8.0f} ns/op")
+    expected = operations * 4
+    rendered = registry.render()
+    counted = int(re.search(r'bench_total\{[^}]*\} (\d+)', rendered).group(1))
+    print(f"\nLost updates under 4 threads: {expected - counted}")
+    print(f"Render: {len(rendered.splitlines())} lines")
+    print("="*80 + "\n")
@@ -0,0 +1,70 @@
+"""
+Database Migration Script
+Brings an existing database up to the current schema without dropping data
+"""
+
+from sqlalchemy import inspect
+from models import db, CityDailyStats, DriverDailyStats
+from rollups import rebuild_rollups
+
+ROLLUP_TABLES = {CityDailyStats.__tablename__, DriverDailyStats.__tablename__}
+
+
+def _outdated_rollup_tables(inspector, existing_tables):
+    """Rollup tables whose columns no longer match the models"""
+    outdated = []
+    for table in db.metadata.sorted_tables:
+        if table.name in ROLLUP_TABLES and table.name in existing_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            if set(table.columns.keys()) != columns:
+                outdated.append(table)
+    return outdated
+
+
+def upgrade_schema():
+    """Create missing tables and indexes (idempotent)"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    # Rollups are derived data: recreate them rather than ALTER
+    outdated = _outdated_rollup_tables(inspector, existing_tables)
+    for table in outdated:
+        table.drop(bind=db.engine)
+        existing_tables.discard(table.name)
+
+    # New tables get their indexes from create_all()
+    db.create_all()
+
+    # Backfill rollups the first time their tables appear
+    if ROLLUP_TABLES - existing_tables:
+        rebuild_rollups()
+
+    inspector = inspect(db.engine)
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine, checkfirst=True)
+                created.append(index.name)
+
+    return created
+
+
+if __name__ == '__main__':
+    from app_complete import app
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("DATABASE MIGRATION")
+        print("="*80)
+
+        created = upgrade_schema()
+        if created:
+            for name in created:
+                print(f"✓ Created index: {name}")
+        else:
+            print("✓ Schema already up to date")
+
+        print("="*80 + "\n")
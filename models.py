@@ -71,6 +71,11 @@ class Vehicle(db.Model):
     total_trips = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_vehicles_city_status', 'city', 'status'),
+        db.Index('ix_vehicles_status', 'status'),
+    )
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -125,6 +130,16 @@ class Ride(db.Model):
     rating = db.Column(db.Float)
     feedback = db.Column(db.Text)
     
+    # Composite indexes matching the dashboard access patterns
+    # (per-driver / per-customer / per-city history and today's ranges)
+    __table_args__ = (
+        db.Index('ix_rides_created_at', 'created_at'),
+        db.Index('ix_rides_driver_created_at', 'driver_id', 'created_at'),
+        db.Index('ix_rides_customer_created_at', 'customer_id', 'created_at'),
+        db.Index('ix_rides_city_created_at', 'city', 'created_at'),
+        db.Index('ix_rides_status_created_at', 'status', 'created_at'),
+    )
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -154,6 +169,71 @@ class Ride(db.Model):
         return f'<Ride {self.id} - {self.status}>'
 
 
+class RideRollupMixin:
+    """Per-day ride counters shared by the dashboard rollup tables"""
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    accepted = db.Column(db.Integer, nullable=False, default=0)
+    in_progress = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    booked_fare = db.Column(db.Float, nullable=False, default=0.0)  # fare of every ride booked that day
+    completed_fare = db.Column(db.Float, nullable=False, default=0.0)  # fare of completed rides
+    active_minutes = db.Column(db.Float, nullable=False, default=0.0)  # duration of in_progress + completed rides
+    
+    @property
+    def total_rides(self):
+        return self.pending + self.accepted + self.in_progress + self.completed + self.cancelled
+
+
+class CityDailyStats(RideRollupMixin, db.Model):
+    """Daily ride rollup per city, keyed by the ride's created_at day"""
+    __tablename__ = 'city_daily_stats'
+    
+    day = db.Column(db.Date, primary_key=True)
+    city = db.Column(db.String(50), primary_key=True)
+    
+    # Analytics histograms (bucket edges live in rollups.HISTOGRAMS)
+    total_distance = db.Column(db.Float, nullable=False, default=0.0)
+    total_duration = db.Column(db.Float, nullable=False, default=0.0)
+    distance_bin_0 = db.Column(db.Integer, nullable=False, default=0)
+    distance_bin_1 = db.Column(db.Integer, nullable=False, default=0)
+    distance_bin_2 = db.Column(db.Integer, nullable=False, default=0)
+    distance_bin_3 = db.Column(db.Integer, nullable=False, default=0)
+    distance_bin_4 = db.Column(db.Integer, nullable=False, default=0)
+    duration_bin_0 = db.Column(db.Integer, nullable=False, default=0)
+    duration_bin_1 = db.Column(db.Integer, nullable=False, default=0)
+    duration_bin_2 = db.Column(db.Integer, nullable=False, default=0)
+    duration_bin_3 = db.Column(db.Integer, nullable=False, default=0)
+    duration_bin_4 = db.Column(db.Integer, nullable=False, default=0)
+    speed_bin_0 = db.Column(db.Integer, nullable=False, default=0)
+    speed_bin_1 = db.Column(db.Integer, nullable=False, default=0)
+    speed_bin_2 = db.Column(db.Integer, nullable=False, default=0)
+    speed_bin_3 = db.Column(db.Integer, nullable=False, default=0)
+    speed_bin_4 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_0 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_1 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_2 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_3 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_4 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_5 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_6 = db.Column(db.Integer, nullable=False, default=0)
+    hour_bin_7 = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CityDailyStats {self.city} {self.day}>'
+
+
+class DriverDailyStats(RideRollupMixin, db.Model):
+    """Daily ride rollup per driver, keyed by the ride's created_at day"""
+    __tablename__ = 'driver_daily_stats'
+    
+    driver_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    
+    def __repr__(self):
+        return f'<DriverDailyStats {self.driver_id} {self.day}>'
+
+
 class SystemSettings(db.Model):
     """System-wide settings"""
     __tablename__ = 'system_settings'
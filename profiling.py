@@ -0,0 +1,237 @@
+"""
+Live Profiling
+Two ways to find hot spots in a running server without restarting it:
+
+    StackSampler       samples every thread's Python stack (sys._current_frames)
+                       at a fixed interval for N seconds and returns collapsed
+                       stacks ("thread;outer;...;inner count"), the input format
+                       of flamegraph.pl, speedscope and inferno
+    RequestProfiler    cProfile for single requests: on demand with the
+                       X-Profile header (admins, or PROFILE_TOKEN), or at a
+                       per-route sampling rate (PROFILE_ROUTES="/api/analytics=0.01")
+
+The apps expose both under /api/admin/profile/*. Under eventlet/gevent the
+sampler only sees OS threads, so green threads show up as the hub's stack.
+
+Usage: python profiling.py [seconds]   (sampler overhead on a CPU-bound workload)
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import marshal
+import pstats
+import cProfile
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import request, g
+
+from request_lifecycle import on_request
+
+PROFILE_HEADER = 'X-Profile'
+MAX_SAMPLE_SECONDS = 60
+
+
+def parse_route_rates(spec):
+    """"/api/analytics=0.01,/api/book-ride=0.05" -> {route: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        route, _, rate = item.rpartition('=')
+        rate = float(rate)
+        if not route or not 0 <= rate <= 1:
+            raise ValueError(f'Bad route sampling rate: {item!r}')
+        rates[route] = rate
+    return rates
+
+
+class StackSampler:
+    """Statistical whole-process profiler; one sampling run at a time"""
+
+    def __init__(self):
+        self._busy = threading.Lock()
+        self._labels = {}                   # code object -> frame label
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self._labels[code] = label
+        return label
+
+    def sample(self, seconds, interval=0.01):
+        """Collapsed stacks for ``seconds`` of samples; None if a run is already in progress"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            own = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            sampling_seconds = 0.0
+            started = time.perf_counter()
+            deadline = started + seconds
+            while time.perf_counter() < deadline:
+                tick = time.perf_counter()
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(self._label(frame.f_code))
+                        frame = frame.f_back
+                    stack.append(names.get(thread_id, f'thread-{thread_id}').replace(';', ':'))
+                    stacks[';'.join(reversed(stack))] += 1
+                samples += 1
+                sampling_seconds += time.perf_counter() - tick
+                time.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+            elapsed = time.perf_counter() - started
+        finally:
+            self._busy.release()
+        return {
+            'collapsed': ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common()),
+            'samples': samples,
+            'stacks': len(stacks),
+            'seconds': round(elapsed, 3),
+            # Share of wall time the sampler held the GIL walking frames
+            'overhead': round(sampling_seconds / elapsed, 4) if elapsed else 0,
+        }
+
+
+class RequestProfiler:
+    """Deterministic (cProfile) profiles of single requests, kept in a ring buffer"""
+
+    def __init__(self, rates=None, keep=50, token=None):
+        self.rates = dict(rates or {})      # route template -> probability
+        self.token = token
+        self._profiles = deque(maxlen=keep)
+        self._next_id = 1
+        self._active = threading.Lock()     # one profiled request at a time
+        self._lock = threading.Lock()
+
+    def install(self, app, is_admin):
+        """Hook ``app``; ``is_admin()`` decides whether this request may ask for a profile by header"""
+
+        def start_request_profile():
+            if request.url_rule is None:
+                return
+            requested = request.headers.get(PROFILE_HEADER)
+            if requested:
+                if not ((self.token and requested == self.token) or is_admin()):
+                    return
+            elif random.random() >= self.rates.get(request.url_rule.rule, 0):
+                return
+            if not self._active.acquire(blocking=False):
+                g._profile_busy = True
+                return
+            profile = cProfile.Profile()
+            g._profile = (profile, time.perf_counter(), 'header' if requested else 'sampled')
+            profile.enable()
+
+        def finish_request_profile(response, exception):
+            busy = g.pop('_profile_busy', False)
+            record = self._finish(response.status_code if response is not None else 500)
+            if response is None:
+                return
+            if busy:
+                response.headers['X-Profile-Id'] = 'busy'
+            if record is not None:
+                response.headers['X-Profile-Id'] = str(record['id'])
+
+        on_request(app, start_request_profile, finish_request_profile)
+
+    def _finish(self, status):
+        entry = g.pop('_profile', None)
+        if entry is None:
+            return None
+        profile, started, trigger = entry
+        profile.disable()
+        duration = time.perf_counter() - started
+        self._active.release()
+        profile.create_stats()
+        with self._lock:
+            record = {
+                'id': self._next_id,
+                'method': request.method,
+                'route': request.url_rule.rule,
+                'path': request.full_path.rstrip('?'),
+                'status': status,
+                'trigger': trigger,
+                'duration_ms': round(duration * 1000, 2),
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'stats': profile.stats,
+            }
+            self._next_id += 1
+            self._profiles.append(record)
+        return record
+
+    def summaries(self):
+        with self._lock:
+            return [{key: value for key, value in record.items() if key != 'stats'}
+                    for record in reversed(self._profiles)]
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((record for record in self._profiles if record['id'] == profile_id), None)
+
+    @staticmethod
+    def report(record, sort='cumulative', limit=40):
+        """pstats text report of one profile"""
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsSource(dict(record['stats'])), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    @staticmethod
+    def pstats_file(record):
+        """Bytes of a .prof file (pstats.Stats(path), snakeviz, ...)"""
+        return marshal.dumps(record['stats'])
+
+
+class _StatsSource:
+    """What pstats.Stats accepts in place of a Profile object"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _bench(seconds):
+    """Busy loop throughput with and without the sampler running"""
+    def workload(duration):
+        count, deadline = 0, time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            sum(i * i for i in range(200))
+            count += 1
+        return count
+
+    baseline = workload(seconds)
+    sampler = StackSampler()
+    results = {}
+    worker = threading.Thread(target=lambda: results.update(sample=sampler.sample(seconds)))
+    worker.start()
+    sampled = workload(seconds)
+    worker.join()
+    return baseline, sampled, results['sample']
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    print("\n" + "="*80)
+    print("SAMPLING PROFILER OVERHEAD")
+    print("="*80)
+    baseline, sampled, result = _bench(seconds)
+    print(f"Workload iterations in {seconds:g}s: {baseline} alone, {sampled} while sampling at 100 Hz "
+          f"({(1 - sampled / baseline) * 100:.1f}% slower)")
+    print(f"Samples: {result['samples']}, distinct stacks: {result['stacks']}, "
+          f"sampler GIL share: {result['overhead'] * 100:.2f}%")
+    print("\nHottest stacks:")
+    for line in result['collapsed'].splitlines()[:3]:
+        print(f"  {line}")
+    print("="*80 + "\n")
@@ -0,0 +1,286 @@
+"""
+Per-Request Query Accounting
+Counts SQL statements and DB time for each request and each background
+tick, groups them by statement shape (whitespace and IN-lists collapsed),
+and flags the usual N+1 signature: one shape repeated many times in a
+single unit of work. Routes can declare a statement budget:
+
+    @app.route('/api/admin/vehicles')
+    @query_budget(2)
+    @login_required
+    def get_all_vehicles(): ...
+
+Over budget is a warning in production and a QueryBudgetExceeded error
+when app.testing (or QUERY_BUDGET_STRICT=1), so tests fail on regressions.
+In tests, ``assert_max_queries(n)`` checks any block of code.
+
+Usage: python query_tracker.py   (N+1 vs joinedload on a scratch database)
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from flask import request
+
+from request_lifecycle import on_request
+
+REPEAT_THRESHOLD = 5                    # same shape this often in one unit -> N+1 suspect
+TOP_SHAPES = 3
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'IN \((?:\?|%\(\w+\)s|:\w+)(?:, (?:\?|%\(\w+\)s|:\w+))*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request, tick or block issued more statements than it is allowed"""
+
+
+def statement_shape(statement):
+    """SQL with literals, bind lists and whitespace normalised, for grouping"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _LITERAL.sub('?', shape)
+
+
+def query_budget(limit):
+    """Declare the most statements a view may issue (login lookup included)"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class QueryScope:
+    """Statements of one unit of work: a request, a tick or an asserted block"""
+
+    __slots__ = ('name', 'count', 'seconds', 'shapes', '_started')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self._started = []
+
+    def top_shapes(self, limit=TOP_SHAPES):
+        return self.shapes.most_common(limit)
+
+    def describe(self, limit=TOP_SHAPES):
+        lines = [f'{self.name}: {self.count} statements, {self.seconds * 1000:.1f} ms']
+        lines += [f'  {count}× {shape[:160]}' for shape, count in self.top_shapes(limit)]
+        return '\n'.join(lines)
+
+
+_local = threading.local()              # green-thread local once eventlet/gevent patch it
+_listening = False
+
+
+def _scopes():
+    if not hasattr(_local, 'scopes'):
+        _local.scopes = []
+    return _local.scopes
+
+
+def _listen():
+    """Route statement events on every engine to the open scopes (installed once)"""
+    global _listening
+    if _listening:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        scopes = _scopes()
+        if scopes:
+            scopes[-1]._started.append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        scopes = _scopes()
+        if not scopes or not scopes[-1]._started:
+            return
+        elapsed = time.perf_counter() - scopes[-1]._started.pop()
+        shape = statement_shape(statement)
+        # Nested scopes (a tick inside a request, an assert inside a test) all see the statement
+        for scope in scopes:
+            scope.count += 1
+            scope.seconds += elapsed
+            scope.shapes[shape] += 1
+
+    def handle_error(context):
+        scopes = _scopes()
+        if scopes and scopes[-1]._started:
+            scopes[-1]._started.pop()
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(Engine, 'handle_error', handle_error)
+    _listening = True
+
+
+@contextmanager
+def _open(name):
+    _listen()
+    scope = QueryScope(name)
+    _scopes().append(scope)
+    try:
+        yield scope
+    finally:
+        _scopes().remove(scope)
+
+
+@contextmanager
+def assert_max_queries(limit, name='block'):
+    """Raise QueryBudgetExceeded if the block issues more than ``limit`` statements"""
+    with _open(name) as scope:
+        yield scope
+    if scope.count > limit:
+        raise QueryBudgetExceeded(f'budget {limit} exceeded\n{scope.describe()}')
+
+
+class RouteQueryStats:
+    """Running totals for one route or tick loop"""
+
+    __slots__ = ('units', 'statements', 'seconds', 'max_statements', 'over_budget', 'repeated')
+
+    def __init__(self):
+        self.units = 0
+        self.statements = 0
+        self.seconds = 0.0
+        self.max_statements = 0
+        self.over_budget = 0
+        self.repeated = 0                   # units with an N+1 suspect
+
+    def snapshot(self):
+        return {
+            'units': self.units,
+            'avg_statements': round(self.statements / self.units, 2) if self.units else 0,
+            'max_statements': self.max_statements,
+            'avg_db_ms': round(self.seconds / self.units * 1000, 3) if self.units else 0,
+            'over_budget': self.over_budget,
+            'n_plus_one_suspects': self.repeated,
+        }
+
+
+class QueryTracker:
+    """Per-request and per-tick statement counts, budgets and N+1 warnings"""
+
+    def __init__(self, repeat_threshold=REPEAT_THRESHOLD, strict=None):
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict                # None: app.testing or QUERY_BUDGET_STRICT=1
+        self._routes = defaultdict(RouteQueryStats)
+        self._offenders = deque(maxlen=20)  # recent N+1 / over-budget units
+        self._lock = threading.Lock()
+
+    def install(self, app):
+        """Track every request of ``app``; budgets come from @query_budget on the view"""
+        _listen()
+        if self.strict is None:
+            self.strict = app.testing or os.environ.get('QUERY_BUDGET_STRICT') == '1'
+
+        def open_query_scope():
+            scope = QueryScope(f'{request.method} {request.url_rule.rule if request.url_rule else request.path}')
+            _scopes().append(scope)
+            request.environ['query_tracker.scope'] = scope
+
+        def close_query_scope(response, exception):
+            scope = request.environ.pop('query_tracker.scope', None)
+            if scope is None:
+                return
+            if scope in _scopes():
+                _scopes().remove(scope)
+            # A failed request is not accounted (nor held to its budget)
+            if response is not None:
+                view = app.view_functions.get(request.endpoint)
+                self._finish(scope, getattr(view, 'query_budget', None))
+
+        on_request(app, open_query_scope, close_query_scope)
+
+    @contextmanager
+    def scope(self, name, budget=None):
+        """Account a background tick (or any block) under ``name``"""
+        with _open(name) as scope:
+            yield scope
+        self._finish(scope, budget)
+
+    def _finish(self, scope, budget):
+        repeated = [(shape, count) for shape, count in scope.top_shapes()
+                    if count >= self.repeat_threshold]
+        over = budget is not None and scope.count > budget
+        with self._lock:
+            stats = self._routes[scope.name]
+            stats.units += 1
+            stats.statements += scope.count
+            stats.seconds += scope.seconds
+            stats.max_statements = max(stats.max_statements, scope.count)
+            stats.over_budget += over
+            stats.repeated += bool(repeated)
+            if repeated or over:
+                self._offenders.append({
+                    'name': scope.name, 'statements': scope.count, 'budget': budget,
+                    'db_ms': round(scope.seconds * 1000, 2),
+                    'top_shapes': [{'count': count, 'shape': shape[:300]} for shape, count in scope.top_shapes()],
+                })
+        if repeated:
+            print(f"⚠ Possible N+1 ({repeated[0][1]}× one statement shape)\n{scope.describe()}")
+        if over:
+            message = f'Query budget {budget} exceeded\n{scope.describe()}'
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            print(f"⚠ {message}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'routes': {name: stats.snapshot() for name, stats in sorted(self._routes.items())},
+                'recent_offenders': list(self._offenders),
+            }
+
+
+def _bench(vehicles):
+    """Statements and ms for a vehicles listing, lazy owner access vs joinedload"""
+    import tempfile
+    from flask import Flask
+    from sqlalchemy.orm import joinedload
+    from models import db, User, Vehicle
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    db.init_app(app)
+    results = {}
+    with app.app_context():
+        db.create_all()
+        drivers = [User(username=f'driver{i}', email=f'driver{i}@example.com', full_name=f'Driver {i}',
+                        role='driver', password_hash='-') for i in range(vehicles)]
+        db.session.add_all(drivers)
+        db.session.flush()
+        db.session.add_all([Vehicle(driver_id=driver.id, vehicle_number=f'KA-01-{i:04d}', city='bangalore')
+                            for i, driver in enumerate(drivers)])
+        db.session.commit()
+
+        for label, query in (('lazy owner', lambda: Vehicle.query),
+                             ('joinedload', lambda: Vehicle.query.options(joinedload(Vehicle.owner)))):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            with _open(label) as scope:
+                names = [vehicle.owner.full_name if vehicle.owner else None for vehicle in query().all()]
+            results[label] = (scope, (time.perf_counter() - started) * 1000, len(names))
+    return results
+
+
+if __name__ == '__main__':
+    vehicles = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print("\n" + "="*80)
+    print("N+1 DETECTION")
+    print("="*80)
+    for label, (scope, elapsed_ms, rows) in _bench(vehicles).items():
+        print(f"\n{label}: {rows} vehicles, {scope.count} statements, {elapsed_ms:.1f} ms total")
+        for shape, count in scope.top_shapes(2):
+            print(f"  {count}× {shape[:110]}")
+    print("="*80 + "\n")
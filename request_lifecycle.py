@@ -0,0 +1,38 @@
+"""
+Request Lifecycle Hooks
+Per-request instrumentation (metrics timers, request profiles, query
+scopes, trace spans) starts before the view and has to finish exactly
+once. Flask skips after_request when the view raised, so the finishing
+half also has to hang off teardown_request; on_request() wires that pair
+up once for every module:
+
+    on_request(app, start, finish)
+
+``finish(response, exception)`` gets the response (and exception None)
+after a normal request, or response None and the exception when the view
+raised. Headers set on the response by ``finish`` are sent.
+"""
+
+from flask import request
+
+_FINISHED = 'request_lifecycle.finished'
+
+
+def on_request(app, start, finish):
+    """Run ``start()`` before every request of ``app`` and ``finish(response, exception)`` once after it"""
+    key = object()
+
+    def finish_response(response):
+        request.environ.setdefault(_FINISHED, set()).add(key)
+        finish(response, None)
+        return response
+
+    def finish_failed(exception):
+        if key not in request.environ.get(_FINISHED, ()):
+            finish(None, exception)
+
+    finish_response.__name__ = f'{finish.__name__}_response'
+    finish_failed.__name__ = f'{finish.__name__}_failed'
+    app.before_request(start)
+    app.after_request(finish_response)
+    app.teardown_request(finish_failed)
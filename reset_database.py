@@ -7,6 +7,7 @@ Run this if login is not working
 import os
 from app_complete import app, db
 from models import User, Vehicle, Ride, SystemSettings
+from rollups import rebuild_rollups
 from datetime import datetime, timedelta
 import random
 
@@ -205,6 +206,7 @@ def reset_database():
         
         # Final commit
         db.session.commit()
+        rebuild_rollups()
         
         # ============================================
         # FINAL VERIFICATION
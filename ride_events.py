@@ -0,0 +1,300 @@
+"""
+Ride Lifecycle Event Bus
+Committed ride and vehicle status changes are published as typed events
+and delivered to subscribers by a small worker pool, off the request
+thread. Events with the same key (one ride, one vehicle) always go to the
+same worker, so each subscriber sees a ride's events in commit order.
+
+    bus = EventBus()
+    capture_commits(bus)                       # publish on db.session.commit()
+    bus.subscribe(RideStatusChanged, handler)  # handler(event), on a worker thread
+
+Rollups stay inside the transaction (rollups.record_ride_transition); the
+events carry the same counter deltas for subscribers that mirror them.
+
+Usage: python ride_events.py [events] [rides]   (publish cost, lag, ordering check)
+"""
+
+import sys
+import time
+import queue
+import threading
+from collections import defaultdict, deque
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class RideStatusChanged:
+    """A ride's committed status change; ``old_status`` is None for a new booking"""
+
+    __slots__ = ('ride', 'old_status', 'old_driver_id', 'day', 'delta', 'driver_deltas', 'published_at', 'trace')
+
+    def __init__(self, ride, old_status=None, old_driver_id=None, day=None, delta=None, driver_deltas=None):
+        self.ride = ride                        # Ride.to_dict() snapshot
+        self.old_status = old_status
+        self.old_driver_id = old_driver_id
+        self.day = day or date.today()          # rollup day (ride.created_at)
+        self.delta = delta or {}                # rollups.ride_delta()
+        self.driver_deltas = driver_deltas or {}  # rollups.driver_deltas()
+        self.published_at = None
+        self.trace = None                       # tracing.SpanContext of the publishing request
+
+    @property
+    def key(self):
+        return ('ride', self.ride['id'])
+
+    @property
+    def status(self):
+        return self.ride['status']
+
+
+class VehicleStatusChanged:
+    """A vehicle's committed status change (driver online/offline, busy/available).
+
+    A new vehicle has ``old_status`` None; a deleted one has ``status`` None.
+    """
+
+    __slots__ = ('vehicle_id', 'vehicle_number', 'driver_id', 'city', 'old_status', 'status', 'published_at', 'trace')
+
+    def __init__(self, vehicle_id, vehicle_number, driver_id, city, old_status, status):
+        self.vehicle_id = vehicle_id
+        self.vehicle_number = vehicle_number
+        self.driver_id = driver_id
+        self.city = city
+        self.old_status = old_status
+        self.status = status
+        self.published_at = None
+        self.trace = None
+
+    @property
+    def key(self):
+        return ('vehicle', self.vehicle_id)
+
+
+class SubscriberStats:
+    """Delivery counters and a window of recent lags for one subscriber"""
+
+    def __init__(self, window):
+        self.delivered = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.lags = deque(maxlen=window)    # publish -> handler start, seconds
+
+    def snapshot(self):
+        lags = sorted(self.lags)
+        percentile = lambda q: round(lags[min(len(lags) - 1, int(len(lags) * q))] * 1000, 2) if lags else 0
+        return {
+            'delivered': self.delivered,
+            'errors': self.errors,
+            'lag_p50_ms': percentile(0.5),
+            'lag_p99_ms': percentile(0.99),
+            'lag_max_ms': round(lags[-1] * 1000, 2) if lags else 0,
+            'handler_avg_ms': round(self.busy_seconds / self.delivered * 1000, 3) if self.delivered else 0,
+        }
+
+
+class EventBus:
+    """In-process pub/sub; per-key ordering over ``workers`` threads.
+
+    With a ``tracer``, each event carries the publisher's trace context and
+    every delivery is a span in that trace.
+    """
+
+    def __init__(self, workers=4, lag_window=1024, tracer=None):
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._subscribers = defaultdict(list)   # event class -> [(name, handler)]
+        self._sync_subscribers = defaultdict(list)
+        self._stats = {}                        # subscriber name -> SubscriberStats
+        self._lag_window = lag_window
+        self._lock = threading.Lock()
+        self._started = False
+        self.tracer = tracer
+        self.published = 0
+
+    def subscribe(self, event_type, handler, name=None, sync=False):
+        """Call ``handler(event)`` for every published ``event_type``.
+
+        ``sync=True`` runs the handler in the publishing thread, for cheap
+        bookkeeping that must be done before the request returns.
+        """
+        name = name or getattr(handler, '__qualname__', repr(handler))
+        with self._lock:
+            (self._sync_subscribers if sync else self._subscribers)[event_type].append((name, handler))
+            self._stats.setdefault(name, SubscriberStats(self._lag_window))
+        return handler
+
+    def publish(self, event_):
+        """Queue an event; returns once the sync subscribers have run"""
+        if not self._started:
+            self._start()
+        event_.published_at = time.monotonic()
+        if self.tracer is not None and event_.trace is None:
+            event_.trace = self.tracer.current()
+        self.published += 1
+        for name, handler in self._sync_subscribers.get(type(event_), ()):
+            self._deliver(name, handler, event_)
+        self._queues[hash(event_.key) % len(self._queues)].put(event_)
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            for index, events in enumerate(self._queues):
+                thread = threading.Thread(target=self._work, args=(events,), name=f'event-bus-{index}')
+                thread.daemon = True
+                thread.start()
+            self._started = True
+
+    def _work(self, events):
+        while True:
+            event_ = events.get()
+            try:
+                for name, handler in self._subscribers.get(type(event_), ()):
+                    self._deliver(name, handler, event_)
+            finally:
+                events.task_done()
+
+    def _deliver(self, name, handler, event_):
+        stats = self._stats[name]
+        started = time.monotonic()
+        stats.lags.append(started - event_.published_at)
+        try:
+            if event_.trace is not None:
+                with self.tracer.span(f'event {name}', parent=event_.trace, event=type(event_).__name__):
+                    handler(event_)
+            else:
+                handler(event_)
+        except Exception as e:
+            stats.errors += 1
+            print(f"⚠ Event subscriber {name} failed: {e}")
+        stats.delivered += 1
+        stats.busy_seconds += time.monotonic() - started
+
+    def drain(self):
+        """Block until every queued event has been delivered"""
+        for events in self._queues:
+            events.join()
+
+    def stats(self):
+        with self._lock:
+            subscribers = {name: stats.snapshot() for name, stats in self._stats.items()}
+        return {
+            'published': self.published,
+            'queue_depths': [events.qsize() for events in self._queues],
+            'subscribers': subscribers,
+        }
+
+
+def capture_commits(bus):
+    """Publish ride/vehicle status changes to ``bus`` when their transaction commits.
+
+    Changes are snapshotted inside the transaction (objects are expired
+    after commit); a rollback discards them.
+    """
+    from models import Vehicle
+    from rollups import TRANSITION_LISTENERS, ride_delta, driver_deltas
+
+    def plain(values):
+        # NumPy scalars (e.g. a model-predicted duration before commit) -> Python numbers
+        return {key: value.item() if hasattr(value, 'item') else value for key, value in values.items()}
+
+    def pending(session_):
+        return session_.info.setdefault('ride_events', [])
+
+    def on_ride_transition(ride, old_status, old_driver_id):
+        pending(Session.object_session(ride)).append(RideStatusChanged(
+            plain(ride.to_dict()), old_status, old_driver_id, ride.created_at.date(),
+            plain(ride_delta(ride, old_status)),
+            {driver_id: plain(delta) for driver_id, delta in driver_deltas(ride, old_status, old_driver_id).items()},
+        ))
+
+    def on_vehicle_status(vehicle, value, oldvalue, initiator):
+        session_ = Session.object_session(vehicle)
+        if session_ is None or value == oldvalue or vehicle.id is None:
+            return
+        pending(session_).append(VehicleStatusChanged(
+            vehicle.id, vehicle.vehicle_number, vehicle.driver_id, vehicle.city, oldvalue, value))
+
+    def after_flush(session_, flush_context):
+        # Inserts and deletes change the vehicle counts too; the 'set' listener
+        # skips them (no id yet / no attribute change). session.new and
+        # session.deleted still hold the pre-flush state here.
+        for vehicle in session_.new:
+            if isinstance(vehicle, Vehicle):
+                pending(session_).append(VehicleStatusChanged(
+                    vehicle.id, vehicle.vehicle_number, vehicle.driver_id, vehicle.city, None, vehicle.status))
+        for vehicle in session_.deleted:
+            if isinstance(vehicle, Vehicle):
+                pending(session_).append(VehicleStatusChanged(
+                    vehicle.id, vehicle.vehicle_number, vehicle.driver_id, vehicle.city, vehicle.status, None))
+
+    def after_commit(session_):
+        for event_ in session_.info.pop('ride_events', ()):
+            bus.publish(event_)
+
+    def after_rollback(session_):
+        session_.info.pop('ride_events', None)
+
+    TRANSITION_LISTENERS.append(on_ride_transition)
+    event.listen(Vehicle.status, 'set', on_vehicle_status, active_history=True)
+    event.listen(Session, 'after_flush', after_flush)
+    event.listen(Session, 'after_commit', after_commit)
+    event.listen(Session, 'after_rollback', after_rollback)
+
+
+def _bench(count, rides, rate=None):
+    """Publish ``count`` events (as fast as possible, or at ``rate``/s); returns (publish s, total s, stats, out of order)"""
+    import random
+
+    statuses = ['pending', 'accepted', 'in_progress', 'completed']
+    bus = EventBus()
+    last_seen = {}
+    out_of_order = [0]
+
+    def ordering_check(event_):
+        ride_id = event_.ride['id']
+        if last_seen.get(ride_id, -1) >= event_.ride['seq']:
+            out_of_order[0] += 1
+        last_seen[ride_id] = event_.ride['seq']
+
+    def slow_notifier(event_):
+        time.sleep(0.0002)      # stands in for a Socket.IO emit
+
+    bus.subscribe(RideStatusChanged, ordering_check, name='ordering_check')
+    bus.subscribe(RideStatusChanged, slow_notifier, name='slow_notifier')
+
+    publish_s = 0.0
+    t0 = time.perf_counter()
+    for seq in range(count):
+        if rate:
+            delay = t0 + seq / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        event_ = RideStatusChanged({'id': random.randrange(rides), 'seq': seq, 'status': statuses[seq % 4]})
+        started = time.perf_counter()
+        bus.publish(event_)
+        publish_s += time.perf_counter() - started
+    bus.drain()
+    return publish_s, time.perf_counter() - t0, bus.stats()['subscribers'], out_of_order[0]
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rides = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    print("\n" + "="*80)
+    print("RIDE EVENT BUS BENCHMARK")
+    print("="*80)
+    print(f"Events: {count} over {rides} rides, 4 workers, subscribers: ordering check + 0.2 ms notifier")
+    for label, rate in (('burst', None), ('2000/s', 2000)):
+        events = count if rate is None else min(count, rate * 3)
+        publish_s, total_s, subscribers, out_of_order = _bench(events, rides, rate)
+        print(f"\n{label}: {events} events, publish {publish_s / events * 1e6:.1f} µs/event on the caller, "
+              f"all delivered in {total_s:.2f}s, out of order: {out_of_order}")
+        for name, stats in subscribers.items():
+            print(f"  {name:<16} lag p50 {stats['lag_p50_ms']:>8.2f} ms  p99 {stats['lag_p99_ms']:>8.2f} ms  "
+                  f"handler {stats['handler_avg_ms']:.3f} ms")
+    print("\nlag = publish -> handler start (last 1024 deliveries per subscriber)")
+    print("="*80 + "\n")
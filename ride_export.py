@@ -0,0 +1,91 @@
+"""
+Ride History Export
+Streams the rides table as NDJSON or CSV using keyset pagination on
+(created_at, id), so memory stays flat however many rides are exported.
+
+Each page is read in its own short transaction and serialized before it is
+yielded; a slow client never holds a read lock on the database.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from models import db, Ride
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+EXPORT_COLUMNS = [column.name for column in Ride.__table__.columns]
+
+
+def parse_cursor(value):
+    """Parse an ``<created_at ISO>,<id>`` cursor into a keyset tuple"""
+    created_at, ride_id = value.rsplit(',', 1)
+    return datetime.fromisoformat(created_at), int(ride_id)
+
+
+def format_cursor(created_at, ride_id):
+    """Inverse of parse_cursor()"""
+    return f'{created_at.isoformat()},{ride_id}'
+
+
+def _serialize(row):
+    """Row mapping -> JSON/CSV friendly dict"""
+    return {
+        name: value.isoformat() if isinstance(value, datetime) else value
+        for name, value in row._mapping.items()
+    }
+
+
+def iter_ride_pages(page_size=1000, city=None, since=None, until=None, after=None):
+    """Yield lists of serialized rides in (created_at, id) order, one page at a time"""
+    columns = [Ride.__table__.c[name] for name in EXPORT_COLUMNS]
+    cursor = after
+
+    while True:
+        query = db.session.query(*columns).filter(Ride.created_at.isnot(None))
+        if city:
+            query = query.filter(Ride.city == city)
+        if since:
+            query = query.filter(Ride.created_at >= since)
+        if until:
+            query = query.filter(Ride.created_at < until)
+        if cursor:
+            query = query.filter(tuple_(Ride.created_at, Ride.id) > tuple_(*cursor))
+        query = query.order_by(Ride.created_at, Ride.id).limit(page_size)
+
+        page = []
+        for row in query.yield_per(min(page_size, 500)):
+            cursor = (row.created_at, row.id)
+            page.append(_serialize(row))
+
+        # End the read transaction before handing the page to the client
+        db.session.commit()
+
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+
+
+def stream_ndjson(pages):
+    """One JSON object per line"""
+    for page in pages:
+        yield ''.join(json.dumps(ride) + '\n' for ride in page)
+
+
+def stream_csv(pages):
+    """Header row followed by one CSV row per ride"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(page)
+        yield buffer.getvalue()
@@ -0,0 +1,269 @@
+"""
+Ride Simulation Engine
+Advances every active ride simulation from one tick loop instead of one
+thread per ride. Route points live in NumPy arrays indexed by slot, each
+tick moves all cursors at once, and positions are handed to the emit and
+persist callbacks in batches.
+
+Usage: python ride_simulator.py [num_rides] [ticks]   (headless benchmark)
+"""
+
+import sys
+import time
+import threading
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+
+class RideSimulationEngine:
+    """Array-backed simulator for all in-progress rides in the process.
+
+    ``emit(updates)`` receives the list of gps_update dicts for a tick and
+    ``persist(rows)`` receives ``{'id', 'current_lat', 'current_lon'}`` rows
+    for a bulk vehicle UPDATE. Both are called from the engine thread, as is
+    the optional ``on_tick(seconds)`` with each tick's duration, and
+    ``on_ride_end(ride_id, trace, added_ns, finished)`` for rides added with
+    a ``trace`` context once they finish or are removed.
+    """
+
+    def __init__(self, emit, persist, tick_interval=0.5, points_per_route=100,
+                 persist_every=4, initial_capacity=64, on_tick=None, on_ride_end=None):
+        self.emit = emit
+        self.persist = persist
+        self.on_tick = on_tick
+        self.on_ride_end = on_ride_end
+        self.tick_interval = tick_interval
+        self.points_per_route = points_per_route
+        self.persist_every = persist_every
+
+        self._commands = deque()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._running = False
+        self._tick_count = 0
+
+        self._slot_by_ride = {}
+        self._free_slots = []
+        self._ride_ids = []
+        self._vehicle_numbers = []
+        self._vehicle_statuses = []
+        self._traces = []                   # (trace context, added_ns) of traced rides
+        self._allocate(initial_capacity)
+
+    # ------------------------------------------------------------------
+    # Array storage
+    # ------------------------------------------------------------------
+
+    def _allocate(self, capacity):
+        """Grow the per-slot arrays to ``capacity`` slots"""
+        old = len(self._ride_ids)
+        points = self.points_per_route
+
+        def grow(array, shape, dtype, fill):
+            grown = np.full(shape, fill, dtype=dtype)
+            if array is not None:
+                grown[:old] = array
+            return grown
+
+        self.route_lat = grow(getattr(self, 'route_lat', None), (capacity, points), np.float64, 0.0)
+        self.route_lon = grow(getattr(self, 'route_lon', None), (capacity, points), np.float64, 0.0)
+        self.route_len = grow(getattr(self, 'route_len', None), capacity, np.int32, 0)
+        self.cursor = grow(getattr(self, 'cursor', None), capacity, np.int32, -1)
+        self.vehicle_pk = grow(getattr(self, 'vehicle_pk', None), capacity, np.int64, -1)
+        self.active = grow(getattr(self, 'active', None), capacity, bool, False)
+
+        self._ride_ids.extend([None] * (capacity - old))
+        self._vehicle_numbers.extend([None] * (capacity - old))
+        self._vehicle_statuses.extend([None] * (capacity - old))
+        self._traces.extend([None] * (capacity - old))
+        self._free_slots.extend(range(capacity - 1, old - 1, -1))
+
+    def _claim_slot(self):
+        if not self._free_slots:
+            self._allocate(len(self._ride_ids) * 2)
+        return self._free_slots.pop()
+
+    def _release_slot(self, slot, finished=False):
+        ride_id = self._ride_ids[slot]
+        traced = self._traces[slot]
+        if traced is not None and self.on_ride_end is not None:
+            self.on_ride_end(ride_id, traced[0], traced[1], finished)
+        self._slot_by_ride.pop(ride_id, None)
+        self.active[slot] = False
+        self.cursor[slot] = -1
+        self._ride_ids[slot] = None
+        self._vehicle_numbers[slot] = None
+        self._vehicle_statuses[slot] = None
+        self._traces[slot] = None
+        self._free_slots.append(slot)
+
+    # ------------------------------------------------------------------
+    # Commands (safe to call from request threads)
+    # ------------------------------------------------------------------
+
+    def add_ride(self, ride_id, route, vehicle_pk=None, vehicle_number=None, vehicle_status='busy', trace=None):
+        """Queue a ride for simulation along ``route`` (sequence of (lat, lon))"""
+        route = np.asarray(route, dtype=np.float64)[:self.points_per_route]
+        traced = (trace, time.time_ns()) if trace is not None else None
+        self._commands.append(('add', ride_id, route, vehicle_pk, vehicle_number, vehicle_status, traced))
+
+    def remove_ride(self, ride_id):
+        """Queue a ride to stop (completed or cancelled)"""
+        self._commands.append(('remove', ride_id))
+
+    def _apply_commands(self):
+        while self._commands:
+            command = self._commands.popleft()
+            if command[0] == 'add':
+                _, ride_id, route, vehicle_pk, vehicle_number, vehicle_status, traced = command
+                if ride_id in self._slot_by_ride:
+                    self._release_slot(self._slot_by_ride[ride_id])
+                slot = self._claim_slot()
+                length = len(route)
+                self.route_lat[slot, :length] = route[:, 0]
+                self.route_lon[slot, :length] = route[:, 1]
+                self.route_len[slot] = length
+                self.cursor[slot] = -1
+                self.vehicle_pk[slot] = -1 if vehicle_pk is None else vehicle_pk
+                self.active[slot] = length > 0
+                self._ride_ids[slot] = ride_id
+                self._vehicle_numbers[slot] = vehicle_number or f'RIDE-{ride_id}'
+                self._vehicle_statuses[slot] = vehicle_status
+                self._traces[slot] = traced
+                self._slot_by_ride[ride_id] = slot
+            else:
+                slot = self._slot_by_ride.get(command[1])
+                if slot is not None:
+                    self._release_slot(slot)
+
+    @property
+    def active_count(self):
+        return int(self.active.sum())
+
+    # ------------------------------------------------------------------
+    # Tick loop
+    # ------------------------------------------------------------------
+
+    def tick(self):
+        """Advance every active ride by one route point; returns the updates"""
+        self._apply_commands()
+        self._tick_count += 1
+
+        slots = np.flatnonzero(self.active)
+        if not len(slots):
+            return []
+
+        self.cursor[slots] += 1
+        index = self.cursor[slots]
+        lats = self.route_lat[slots, index]
+        lons = self.route_lon[slots, index]
+        progress = index / self.route_len[slots] * 100
+        finished = index >= self.route_len[slots] - 1
+
+        timestamp = datetime.now().isoformat()
+        ride_ids = self._ride_ids
+        numbers = self._vehicle_numbers
+        statuses = self._vehicle_statuses
+        updates = [
+            {
+                'ride_id': ride_ids[slot],
+                'vehicle_id': numbers[slot],
+                'vehicle_status': statuses[slot],
+                'latitude': lat,
+                'longitude': lon,
+                'progress': pct,
+                'timestamp': timestamp
+            }
+            for slot, lat, lon, pct in zip(slots.tolist(), lats.tolist(), lons.tolist(), progress.tolist())
+        ]
+        self.emit(updates)
+
+        # Persist every few ticks, and always the final point of a route
+        if self._tick_count % self.persist_every == 0:
+            persist_mask = self.vehicle_pk[slots] >= 0
+        else:
+            persist_mask = finished & (self.vehicle_pk[slots] >= 0)
+        if persist_mask.any():
+            self.persist([
+                {'id': pk, 'current_lat': lat, 'current_lon': lon}
+                for pk, lat, lon in zip(self.vehicle_pk[slots][persist_mask].tolist(),
+                                        lats[persist_mask].tolist(),
+                                        lons[persist_mask].tolist())
+            ])
+
+        for slot in slots[finished].tolist():
+            self._release_slot(slot, finished=True)
+
+        return updates
+
+    def run(self):
+        """Fixed-rate tick loop; late ticks are not replayed"""
+        next_tick = time.monotonic() + self.tick_interval
+        thread = threading.current_thread()
+        # A stop() then start() from inside a tick leaves this loop to the new thread
+        while self._running and self._thread in (None, thread):
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            started = time.perf_counter()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠ Ride simulation tick failed: {e}")
+            if self.on_tick is not None:
+                self.on_tick(time.perf_counter() - started)
+            next_tick = max(next_tick + self.tick_interval, time.monotonic())
+
+    def start(self):
+        """Start the single engine thread (idempotent, safe from concurrent callers)"""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self.run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the engine thread and wait for its current tick; start() runs it again"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+            self._running = False
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+if __name__ == '__main__':
+    num_rides = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    emitted = []
+    persisted = []
+    engine = RideSimulationEngine(
+        emit=lambda updates: emitted.append(len(updates)),
+        persist=lambda rows: persisted.append(len(rows)),
+    )
+
+    rng = np.random.default_rng(42)
+    for ride_id in range(num_rides):
+        start = rng.uniform([12.85, 77.50], [13.05, 77.75])
+        end = rng.uniform([12.85, 77.50], [13.05, 77.75])
+        route = np.linspace(start, end, engine.points_per_route)
+        engine.add_ride(ride_id, route, vehicle_pk=ride_id, vehicle_number=f'KA-01-{ride_id}')
+
+    tick_times = []
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        engine.tick()
+        tick_times.append((time.perf_counter() - t0) * 1000)
+
+    print("\n" + "="*80)
+    print("RIDE SIMULATION ENGINE BENCHMARK")
+    print("="*80)
+    print(f"Rides: {num_rides}, ticks: {ticks}, tick interval: {engine.tick_interval * 1000:.0f} ms")
+    print(f"Tick time: mean={np.mean(tick_times):.2f}ms, p95={np.percentile(tick_times, 95):.2f}ms, "
+          f"max={np.max(tick_times):.2f}ms (first tick includes ride setup)")
+    print(f"Updates emitted: {sum(emitted)}, vehicle rows persisted: {sum(persisted)}")
+    print(f"Tick budget used: {np.mean(tick_times[1:] or tick_times) / (engine.tick_interval * 1000) * 100:.1f}%")
+    print("="*80 + "\n")
@@ -0,0 +1,263 @@
+"""
+Dashboard Rollups
+Keeps city_daily_stats / driver_daily_stats in step with ride state
+transitions so dashboard endpoints read one row instead of scanning rides.
+
+Call record_ride_transition() after changing a ride's status and before
+db.session.commit(); the counters are updated in the same transaction.
+Functions in TRANSITION_LISTENERS are called with the same arguments from
+inside that transaction (dashboard_push uses this).
+"""
+
+from bisect import bisect_right
+from datetime import date
+from sqlalchemy import case, extract, func
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Ride, CityDailyStats, DriverDailyStats
+
+RIDE_STATUSES = ['pending', 'accepted', 'in_progress', 'completed', 'cancelled']
+ACTIVE_STATUSES = ('in_progress', 'completed')
+COUNTER_COLUMNS = RIDE_STATUSES + ['booked_fare', 'completed_fare', 'active_minutes']
+
+# Analytics histograms: name -> (bucket edges, labels). Buckets are
+# [edges[i], edges[i + 1]) and stored as <name>_bin_<i> on CityDailyStats.
+HISTOGRAMS = {
+    'distance': ([0, 5, 10, 15, 20, float('inf')],
+                 ['0-5 km', '5-10 km', '10-15 km', '15-20 km', '20+ km']),
+    'duration': ([0, 10, 20, 30, 40, float('inf')],
+                 ['0-10 min', '10-20 min', '20-30 min', '30-40 min', '40+ min']),
+    'speed': ([0, 20, 40, 60, 80, float('inf')],
+              ['0-20', '20-40', '40-60', '60-80', '80+']),
+    'hour': ([0, 3, 6, 9, 12, 15, 18, 21, 24],
+             ['00:00', '03:00', '06:00', '09:00', '12:00', '15:00', '18:00', '21:00']),
+}
+HISTOGRAM_COLUMNS = [
+    f'{name}_bin_{i}'
+    for name, (edges, labels) in HISTOGRAMS.items()
+    for i in range(len(labels))
+]
+CITY_COLUMNS = COUNTER_COLUMNS + ['total_distance', 'total_duration'] + HISTOGRAM_COLUMNS
+
+# listener(ride, old_status, old_driver_id), called by record_ride_transition
+TRANSITION_LISTENERS = []
+
+
+def histogram_column(name, index):
+    """CityDailyStats attribute name for a histogram bucket"""
+    return f'{name}_bin_{index}'
+
+
+def bucket_index(value, edges):
+    """Bucket a value falls into, or None when it is outside the edges"""
+    index = bisect_right(edges, value) - 1
+    return index if 0 <= index < len(edges) - 1 else None
+
+
+def _contribution(status, fare, duration):
+    """Counter values a single ride in ``status`` adds to its rollup rows"""
+    values = dict.fromkeys(COUNTER_COLUMNS, 0)
+    if status is None:
+        return values
+    values[status] = 1
+    values['booked_fare'] = fare
+    values['completed_fare'] = fare if status == 'completed' else 0
+    values['active_minutes'] = duration if status in ACTIVE_STATUSES else 0
+    return values
+
+
+def _histogram_contribution(ride):
+    """Analytics values a booked ride adds to its city row (status independent)"""
+    distance = ride.distance or 0
+    duration = ride.duration or 0
+    speed = (distance / (duration / 60)) if distance and duration else 0
+    observed = {
+        'distance': distance,
+        'duration': duration,
+        'speed': speed,
+        'hour': ride.created_at.hour,
+    }
+
+    values = {'total_distance': distance, 'total_duration': duration}
+    for name, (edges, labels) in HISTOGRAMS.items():
+        index = bucket_index(observed[name], edges)
+        if index is not None:
+            values[histogram_column(name, index)] = 1
+    return values
+
+
+def _upsert(model, key, delta):
+    """INSERT the delta as a new row, or add it onto the existing row"""
+    if not any(delta.values()):
+        return
+
+    if db.engine.dialect.name == 'postgresql':
+        insert = postgresql.insert
+    else:
+        insert = sqlite.insert
+
+    table = model.__table__
+    stmt = insert(table).values(**key, **delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + stmt.excluded[name] for name in delta}
+    )
+    db.session.execute(stmt)
+
+
+def record_ride_transition(ride, old_status=None, old_driver_id=None):
+    """Apply a ride's status change to the daily rollups.
+
+    ``old_status`` is None for a newly booked ride. ``old_driver_id`` is the
+    driver the ride belonged to before the change (None when unassigned).
+    """
+    if ride.created_at is None:
+        db.session.flush()
+
+    day = ride.created_at.date()
+    city_delta = dict(ride_delta(ride, old_status))
+    if old_status is None:
+        city_delta.update(_histogram_contribution(ride))
+    _upsert(CityDailyStats, {'day': day, 'city': ride.city}, city_delta)
+
+    for driver_id, delta in driver_deltas(ride, old_status, old_driver_id).items():
+        _upsert(DriverDailyStats, {'driver_id': driver_id, 'day': day}, delta)
+
+    for listener in TRANSITION_LISTENERS:
+        listener(ride, old_status, old_driver_id)
+
+
+def ride_delta(ride, old_status=None):
+    """Counter deltas a ride's status change adds to its city/day row"""
+    fare = ride.fare or 0
+    duration = ride.duration or 0
+    before = _contribution(old_status, fare, duration)
+    after = _contribution(ride.status, fare, duration)
+    return {name: after[name] - before[name] for name in COUNTER_COLUMNS}
+
+
+def driver_deltas(ride, old_status=None, old_driver_id=None):
+    """Counter deltas per driver_id for a ride's status (and driver) change"""
+    if old_driver_id == ride.driver_id:
+        return {ride.driver_id: ride_delta(ride, old_status)} if ride.driver_id is not None else {}
+
+    fare = ride.fare or 0
+    duration = ride.duration or 0
+    deltas = {}
+    if old_driver_id is not None:
+        before = _contribution(old_status, fare, duration)
+        deltas[old_driver_id] = {name: -value for name, value in before.items()}
+    if ride.driver_id is not None:
+        deltas[ride.driver_id] = _contribution(ride.status, fare, duration)
+    return deltas
+
+
+def _bucket_case(expr, edges):
+    """SQL CASE expression mirroring bucket_index()"""
+    whens = [(expr < edges[0], None)]
+    whens += [(expr < edge, i) for i, edge in enumerate(edges[1:-1])]
+    return case(*whens, else_=len(edges) - 2)
+
+
+def _aggregate_columns():
+    """SUM(CASE ...) expressions mirroring _contribution() in SQL"""
+    columns = [
+        func.sum(case((Ride.status == status, 1), else_=0)).label(status)
+        for status in RIDE_STATUSES
+    ]
+    columns.append(func.sum(func.coalesce(Ride.fare, 0)).label('booked_fare'))
+    columns.append(func.sum(case(
+        (Ride.status == 'completed', func.coalesce(Ride.fare, 0)), else_=0
+    )).label('completed_fare'))
+    columns.append(func.sum(case(
+        (Ride.status.in_(ACTIVE_STATUSES), func.coalesce(Ride.duration, 0)), else_=0
+    )).label('active_minutes'))
+    return columns
+
+
+def _histogram_columns():
+    """CASE-bucketed SUMs mirroring _histogram_contribution() in SQL"""
+    distance = func.coalesce(Ride.distance, 0)
+    duration = func.coalesce(Ride.duration, 0)
+    speed = case(
+        ((distance != 0) & (duration != 0), distance * 60.0 / duration),
+        else_=0
+    )
+    observed = {
+        'distance': distance,
+        'duration': duration,
+        'speed': speed,
+        'hour': extract('hour', Ride.created_at),
+    }
+
+    columns = [
+        func.sum(distance).label('total_distance'),
+        func.sum(duration).label('total_duration'),
+    ]
+    for name, (edges, labels) in HISTOGRAMS.items():
+        bucket = _bucket_case(observed[name], edges)
+        columns += [
+            func.sum(case((bucket == i, 1), else_=0)).label(histogram_column(name, i))
+            for i in range(len(labels))
+        ]
+    return columns
+
+
+def _as_date(value):
+    """date() comes back as an ISO string on SQLite and a date elsewhere"""
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def rebuild_rollups():
+    """Recompute both rollup tables from the rides table (backfill/repair)"""
+    ride_day = func.date(Ride.created_at)
+
+    CityDailyStats.query.delete()
+    DriverDailyStats.query.delete()
+
+    city_rows = db.session.query(ride_day, Ride.city, *_aggregate_columns(), *_histogram_columns()) \
+        .filter(Ride.created_at.isnot(None), Ride.status.in_(RIDE_STATUSES)) \
+        .group_by(ride_day, Ride.city).all()
+    for row in city_rows:
+        db.session.add(CityDailyStats(
+            day=_as_date(row[0]), city=row[1],
+            **{name: row._mapping[name] or 0 for name in CITY_COLUMNS}
+        ))
+
+    driver_rows = db.session.query(ride_day, Ride.driver_id, *_aggregate_columns()) \
+        .filter(Ride.created_at.isnot(None), Ride.status.in_(RIDE_STATUSES),
+                Ride.driver_id.isnot(None)) \
+        .group_by(ride_day, Ride.driver_id).all()
+    for row in driver_rows:
+        db.session.add(DriverDailyStats(
+            day=_as_date(row[0]), driver_id=row[1],
+            **{name: row._mapping[name] or 0 for name in COUNTER_COLUMNS}
+        ))
+
+    db.session.commit()
+    return len(city_rows), len(driver_rows)
+
+
+def analytics_totals():
+    """Summary and histogram totals across every city/day rollup row"""
+    sums = [func.coalesce(func.sum(CityDailyStats.__table__.c[name]), 0).label(name)
+            for name in CITY_COLUMNS]
+    row = db.session.query(*sums).one()._mapping
+
+    totals = {name: row[name] for name in CITY_COLUMNS}
+    totals['total_trips'] = sum(row[status] for status in RIDE_STATUSES)
+    totals['histograms'] = {
+        name: {
+            'labels': labels,
+            'values': [int(row[histogram_column(name, i)]) for i in range(len(labels))]
+        }
+        for name, (edges, labels) in HISTOGRAMS.items()
+    }
+    return totals
+
+
+if __name__ == '__main__':
+    from app_complete import app
+
+    with app.app_context():
+        city_count, driver_count = rebuild_rollups()
+        print(f"✓ Rebuilt {city_count} city/day and {driver_count} driver/day rollup rows")
@@ -0,0 +1,339 @@
+"""
+Production Server Entry Point
+Runs app_complete (or app_new) on a cooperative server that can hold
+thousands of idle WebSocket connections. The async mode is picked before
+the app is imported, so eventlet/gevent monkey patching happens first:
+
+    eventlet    pip install eventlet      (preferred)
+    gevent      pip install gevent gevent-websocket
+    threading   Werkzeug + simple-websocket, one OS thread per connection
+
+Blocking C calls (SQLite, NumPy/XGBoost) would stall an eventlet/gevent hub,
+so the apps run model predictions through offload(), which uses the hub's
+OS thread pool. Under eventlet/gevent every SQLite connection is wrapped
+too (ThreadPooled), so each connect/execute/fetch/commit of any view,
+tick or export runs on that pool instead of the hub.
+
+Usage:
+    python serve.py [--app app_complete] [--mode auto] [--host 0.0.0.0] [--port 5000]
+    python serve.py bench [--mode auto] [counts...]   connection scaling (default 1000 5000 10000)
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import importlib
+import subprocess
+
+ASYNC_MODE_ENV = 'SOCKETIO_ASYNC_MODE'
+ASYNC_MODES = ('eventlet', 'gevent', 'threading')
+
+
+def async_mode():
+    """async_mode for SocketIO(...); threading unless serve.py selected another"""
+    return os.environ.get(ASYNC_MODE_ENV) or 'threading'
+
+
+def resolve_async_mode(requested='auto'):
+    """First installed of eventlet, gevent, threading for 'auto'"""
+    if requested != 'auto':
+        if requested not in ASYNC_MODES:
+            raise ValueError(f'Unknown async mode: {requested}')
+        return requested
+    for mode in ASYNC_MODES[:-1]:
+        try:
+            importlib.import_module(mode)
+            return mode
+        except ImportError:
+            continue
+    return 'threading'
+
+
+def prepare_async_mode(mode):
+    """Monkey patch for ``mode``; must run before the app (or anything using sockets) is imported"""
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    os.environ[ASYNC_MODE_ENV] = mode
+    if mode in ('eventlet', 'gevent'):
+        pool_sqlite_calls()
+
+
+def offload(func, *args, **kwargs):
+    """Run a blocking call on a real OS thread so the eventlet/gevent hub keeps serving"""
+    mode = async_mode()
+    if mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args, **kwargs)
+    if mode == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
+
+class ThreadPooled:
+    """A DB-API connection or cursor whose method calls run through offload()"""
+
+    __slots__ = ('_target',)
+
+    def __init__(self, target):
+        object.__setattr__(self, '_target', target)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            result = offload(value, *args, **kwargs)
+            # cursor(), execute() return cursors whose fetches block as well
+            return ThreadPooled(result) if isinstance(result, sqlite3.Cursor) else result
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+def pool_sqlite_calls():
+    """Open every SQLAlchemy SQLite connection as ThreadPooled (installed once per process)"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if getattr(pool_sqlite_calls, 'installed', False):
+        return
+    pool_sqlite_calls.installed = True
+
+    @event.listens_for(Engine, 'do_connect')
+    def connect_pooled(dialect, connection_record, cargs, cparams):
+        if dialect.name != 'sqlite':
+            return None
+        # The connection moves between pool threads; the pool still hands it to one user at a time
+        cparams['check_same_thread'] = False
+        return ThreadPooled(offload(dialect.loaded_dbapi.connect, *cargs, **cparams))
+
+
+def run_options(mode):
+    """socketio.run(...) kwargs for ``mode``"""
+    # Werkzeug is only used in threading mode; eventlet/gevent bring their own WSGI server
+    return {'allow_unsafe_werkzeug': True} if mode == 'threading' else {}
+
+
+def serve(app_name='app_complete', mode='auto', host='0.0.0.0', port=5000):
+    mode = resolve_async_mode(mode)
+    prepare_async_mode(mode)
+    module = importlib.import_module(app_name)
+    module.start_services()
+
+    print("\n" + "="*80)
+    print(f"RIDESHARE PRO - {app_name} on {mode}")
+    print("="*80)
+    print(f"Listening on http://{host}:{port}")
+    if mode == 'threading':
+        print("⚠ eventlet/gevent not installed: one OS thread per connection")
+    print("="*80 + "\n")
+    module.socketio.run(module.app, host=host, port=port, debug=False, use_reloader=False,
+                        **run_options(mode))
+
+
+# ========================
+# Connection scaling benchmark
+# ========================
+
+def _bench_server(mode, port):
+    """Minimal Flask-SocketIO server in ``mode``; GET /broadcast emits one timestamped message to everyone"""
+    prepare_async_mode(mode)
+    import logging
+    import flask.cli
+    from flask import Flask
+    from flask_socketio import SocketIO
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    flask.cli.show_server_banner = lambda *args: None
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode=mode)
+
+    @app.route('/broadcast')
+    def broadcast():
+        sent = time.time()
+        socketio.emit('bench', {'t': sent})
+        return repr(sent)
+
+    socketio.run(app, host='127.0.0.1', port=port, log_output=False, **run_options(mode))
+
+
+def _rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+async def ws_recv(reader):
+    """One WebSocket text frame from the server (servers never mask)"""
+    import struct
+    head = await reader.readexactly(2)
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', await reader.readexactly(8))[0]
+    payload = await reader.readexactly(length)
+    if head[0] & 0x0F == 8:
+        raise ConnectionError('closed by server')
+    return payload.decode()
+
+
+def ws_frame(text):
+    """Masked WebSocket text frame (clients must mask)"""
+    import struct
+    payload = text.encode()
+    mask = os.urandom(4)
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    header = bytes([0x81]) + (bytes([0x80 | len(payload)]) if len(payload) < 126
+                              else bytes([0x80 | 126]) + struct.pack('>H', len(payload)))
+    return header + mask + masked
+
+
+async def _bench_client(port, ready, latencies):
+    """Idle Socket.IO client over raw asyncio streams; records broadcast latency"""
+    import asyncio
+    import base64
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f'GET /socket.io/?EIO=4&transport=websocket HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+                  f'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                  f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n').encode())
+    await reader.readuntil(b'\r\n\r\n')
+    await ws_recv(reader)               # engine.io open packet
+    writer.write(ws_frame('40'))        # connect to namespace '/'
+    await ws_recv(reader)               # namespace connect ack
+    ready.set_result(True)
+    try:
+        while True:
+            packet = await ws_recv(reader)
+            if packet == '2':
+                writer.write(ws_frame('3'))
+            elif packet.startswith('42'):
+                sent = json.loads(packet[2:])[1]['t']
+                latencies.append((sent, time.time() - sent))
+    except (ConnectionError, asyncio.IncompleteReadError):
+        writer.close()
+
+
+async def _bench_run(port, server_pid, counts, broadcasts, report, stage_timeout):
+    import asyncio
+    from urllib.request import urlopen
+
+    baseline_kb = _rss_kb(server_pid)
+    loop = asyncio.get_running_loop()
+    clients, latencies = [], []
+    gate = asyncio.Semaphore(200)       # connection attempts in flight
+
+    async def connect():
+        async with gate:
+            ready = loop.create_future()
+            task = asyncio.ensure_future(_bench_client(port, ready, latencies))
+            await asyncio.wait([ready, task], return_when=asyncio.FIRST_COMPLETED)
+        if not ready.done():
+            task.result()               # re-raise the connection error
+        return task
+
+    for count in counts:
+        t0 = time.perf_counter()
+        stage = asyncio.gather(*(connect() for _ in range(count - len(clients))))
+        try:
+            clients.extend(await asyncio.wait_for(stage, stage_timeout))
+        except asyncio.TimeoutError:
+            report(count, note=f'not all connected within {stage_timeout}s; stopping')
+            break
+        except (OSError, asyncio.IncompleteReadError) as e:
+            report(count, note=f'connect failed: {e!r}; stopping')
+            break
+        connect_s = time.perf_counter() - t0
+        await asyncio.sleep(1.0)        # let the server settle before reading RSS
+        per_connection_kb = (_rss_kb(server_pid) - baseline_kb) / count
+
+        samples = []
+        for _ in range(broadcasts):
+            latencies.clear()
+            sent = float(await loop.run_in_executor(
+                None, lambda: urlopen(f'http://127.0.0.1:{port}/broadcast').read()))
+            deadline = time.perf_counter() + stage_timeout
+            while len(latencies) < count and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            # Late deliveries of an earlier broadcast don't count towards this one
+            samples.append(sorted(latency for t, latency in latencies if t == sent))
+            await asyncio.sleep(0.2)
+        delivered = sorted(l for sample in samples for l in sample)
+        if not delivered:
+            report(count, note='no broadcast delivered; stopping')
+            break
+        p50 = delivered[len(delivered) // 2] * 1000
+        p99 = delivered[max(0, int(len(delivered) * 0.99) - 1)] * 1000
+        last = sum(sample[-1] for sample in samples if sample) / len(samples) * 1000
+        lost = count * broadcasts - len(delivered)
+        report(count, connect_s, per_connection_kb, p50, p99, last, lost)
+
+    for task in clients:
+        task.cancel()
+
+
+def benchmark(mode, counts, report, broadcasts=5, port=5750, stage_timeout=120):
+    """Memory per connection and broadcast latency at each client count, via ``report(count, ...)``"""
+    import asyncio
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '_bench_server', mode, str(port)],
+                              stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(3.0)                 # imports + bind
+        asyncio.run(_bench_run(port, server.pid, counts, broadcasts, report, stage_timeout))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '_bench_server':
+        _bench_server(sys.argv[2], int(sys.argv[3]))
+
+    elif len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        parser = argparse.ArgumentParser(prog='serve.py bench')
+        parser.add_argument('--mode', default='auto', choices=('auto',) + ASYNC_MODES)
+        parser.add_argument('counts', nargs='*', type=int, default=[1000, 5000, 10000])
+        args = parser.parse_args(sys.argv[2:])
+        mode = resolve_async_mode(args.mode)
+
+        print("\n" + "="*80)
+        print("SOCKET.IO CONNECTION SCALING BENCHMARK")
+        print("="*80)
+        print(f"Async mode: {mode}, CPUs: {os.cpu_count()}, clients: one asyncio process on the same host")
+        print(f"{'clients':>8}{'connect s':>11}{'KB/conn':>9}{'p50 ms':>9}{'p99 ms':>9}{'last ms':>9}{'lost':>6}")
+
+        def report(count, connect_s=0, per_kb=0, p50=0, p99=0, last=0, lost=0, note=''):
+            if note:
+                print(f"{count:>8}  {note}", flush=True)
+            else:
+                print(f"{count:>8}{connect_s:>11.1f}{per_kb:>9.1f}{p50:>9.1f}{p99:>9.1f}{last:>9.1f}{lost:>6}",
+                      flush=True)
+
+        benchmark(mode, sorted(args.counts), report)
+        print("\nKB/conn = server RSS growth / connected clients; last = time until every client had the broadcast")
+        print("="*80 + "\n")
+
+    else:
+        parser = argparse.ArgumentParser(prog='serve.py')
+        parser.add_argument('--app', default='app_complete', choices=('app_complete', 'app_new'))
+        parser.add_argument('--mode', default='auto', choices=('auto',) + ASYNC_MODES)
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=int(os.environ.get('FLASK_PORT', 5000)))
+        args = parser.parse_args()
+        serve(args.app, args.mode, args.host, args.port)
@@ -0,0 +1,219 @@
+"""
+Startup Budget
+Keeps importing an app cheap so new workers come up fast. Trained models
+are unpickled on first use (which also keeps sklearn/xgboost out of the
+import), pandas is imported where the feature frame is built, and
+start_services() warms both in the background while Readiness tells the
+load balancer (GET /ready) which components are warm:
+
+    models = ModelStore(MODELS_DIR)
+    models.get('xgb_model')                 # unpickled on first call, then cached
+    models.warm_in_background(offload)      # at startup, off the hub
+    readiness = serving_readiness(models, db)   # models, pandas and the database
+
+The check command imports an app in fresh interpreters and fails if the
+import takes longer than the budget or pulls in a lazy library.
+
+Usage:
+    python startup.py check [--app app_complete] [--budget 1.5] [--runs 3]
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import threading
+import subprocess
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Models')
+# Loaded for serving; the random forest is only evaluated offline (bench.py)
+SERVING_MODELS = {
+    'xgb_model': 'xgboost_model.pkl',
+    'kmeans_start': 'kmeans_start.pkl',
+    'kmeans_end': 'kmeans_end.pkl',
+    'feature_columns': 'feature_columns.pkl',
+}
+SERVING_IMPORTS = ('pandas',)
+# Must not be imported by `import <app>`; they arrive with the models
+LAZY_MODULES = ('pandas', 'sklearn', 'xgboost', 'scipy')
+DEFAULT_BUDGET = 1.5                    # seconds for `import app_complete` on a 1-CPU worker
+
+_REQUIRED = object()
+
+
+class ModelStore:
+    """Trained models unpickled on first use, or all at once by warm()"""
+
+    def __init__(self, directory, files=SERVING_MODELS, imports=SERVING_IMPORTS):
+        self.directory = directory
+        self.files = dict(files)
+        self.imports = tuple(imports)
+        self._models = {}
+        self._errors = {}
+        self._load_ms = {}
+        self._lock = threading.Lock()
+        self._warming = False
+        self.warm_seconds = None
+
+    def get(self, name, default=_REQUIRED):
+        """The model ``name``; ``default`` instead of raising if it cannot be loaded"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models and name not in self._errors:
+                self._load(name)
+        if name in self._errors:
+            if default is _REQUIRED:
+                raise RuntimeError(f'Model {name} could not be loaded: {self._errors[name]}')
+            return default
+        return self._models[name]
+
+    def _load(self, name):
+        started = time.perf_counter()
+        try:
+            with open(os.path.join(self.directory, self.files[name]), 'rb') as f:
+                self._models[name] = pickle.load(f)
+        except Exception as e:
+            self._errors[name] = e
+            print(f"⚠ Warning: Could not load model {name}: {e}")
+        self._load_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def loaded(self, name):
+        return name in self._models
+
+    def warm(self):
+        """Import the serving libraries and load every model; returns the seconds it took"""
+        started = time.perf_counter()
+        for module in self.imports:
+            __import__(module)
+        for name in self.files:
+            self.get(name, None)
+        self.warm_seconds = round(time.perf_counter() - started, 3)
+        loaded = sum(name in self._models for name in self.files)
+        print(f"✓ {loaded}/{len(self.files)} ML models loaded in {self.warm_seconds:.2f}s")
+        return self.warm_seconds
+
+    def warm_in_background(self, run=None):
+        """warm() on a daemon thread (through ``run(func)``, e.g. serve.offload); idempotent"""
+        with self._lock:
+            if self._warming:
+                return
+            self._warming = True
+        thread = threading.Thread(target=(lambda: run(self.warm)) if run else self.warm, name='model-warmup')
+        thread.daemon = True
+        thread.start()
+
+    def status(self):
+        return {
+            'models': {name: {'loaded': name in self._models, 'load_ms': self._load_ms.get(name),
+                              **({'error': str(self._errors[name])} if name in self._errors else {})}
+                       for name in self.files},
+            'imports': {module: module in sys.modules for module in self.imports},
+            'warm_seconds': self.warm_seconds,
+        }
+
+
+class Readiness:
+    """Named warm-up checks behind the readiness probe"""
+
+    def __init__(self):
+        self._checks = {}
+
+    def register(self, name, check):
+        """``check()`` is truthy once ``name`` is warm; raising counts as not ready"""
+        self._checks[name] = check
+
+    def report(self):
+        """(all ready, {name: {'ready': bool[, 'error': str]}})"""
+        components = {}
+        for name, check in self._checks.items():
+            try:
+                components[name] = {'ready': bool(check())}
+            except Exception as e:
+                components[name] = {'ready': False, 'error': str(e)}
+        return all(component['ready'] for component in components.values()), components
+
+
+def serving_readiness(models, db):
+    """Readiness of a ride app: every serving model, the serving imports and the database"""
+    from sqlalchemy import text
+
+    def database_ready():
+        db.session.execute(text('SELECT 1'))
+        return True
+
+    readiness = Readiness()
+    for name in models.files:
+        readiness.register(f'model:{name}', lambda name=name: models.loaded(name))
+    for module in models.imports:
+        readiness.register(module, lambda module=module: module in sys.modules)
+    readiness.register('database', database_ready)
+    return readiness
+
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {app}
+print(json.dumps({{'seconds': time.perf_counter() - started,
+                  'lazy_imported': [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(app_name, runs=3):
+    """Fastest of ``runs`` fresh-interpreter imports: (seconds, lazy modules imported, top imports)"""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _IMPORT_SCRIPT.format(app=app_name, lazy=LAZY_MODULES)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f'import {app_name} failed:\n{result.stderr[-2000:]}')
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or measured['seconds'] < best[0]:
+            best = (measured['seconds'], measured['lazy_imported'], result.stderr)
+    seconds, lazy_imported, importtime = best
+    # -X importtime: "import time: self_us | cumulative_us | <2 spaces per level>module";
+    # the app's own imports are one level below it
+    top = []
+    for line in importtime.splitlines():
+        parts = line.split('|')
+        name = parts[-1].strip()
+        if len(parts) == 3 and parts[1].strip().isdigit() and parts[2] == f'   {name}':
+            top.append((int(parts[1]) / 1e6, name))
+    return seconds, lazy_imported, sorted(top, reverse=True)[:10]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='startup.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    check_parser = commands.add_parser('check', help='import an app and enforce the startup budget')
+    check_parser.add_argument('--app', default='app_complete')
+    check_parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='seconds (default %(default)s)')
+    check_parser.add_argument('--runs', type=int, default=3, help='fresh imports; the fastest counts')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print(f"STARTUP BUDGET: import {args.app}")
+    print("="*80)
+    seconds, lazy_imported, top = measure_import(args.app, args.runs)
+    print(f"Import time (best of {args.runs}): {seconds:.2f}s, budget {args.budget:.2f}s")
+    print(f"\nSlowest imports of {args.app} (cumulative):")
+    for cumulative, module in top:
+        print(f"  {cumulative * 1000:8.1f} ms  {module}")
+    print()
+    failures = []
+    if seconds > args.budget:
+        failures.append(f'import took {seconds:.2f}s (budget {args.budget:.2f}s)')
+    if lazy_imported:
+        failures.append(f'imported lazily loaded modules at import time: {", ".join(lazy_imported)}')
+    for failure in failures:
+        print(f"✗ {failure}")
+    if not failures:
+        print("✓ Within the startup budget")
+    print("="*80 + "\n")
+    sys.exit(1 if failures else 0)
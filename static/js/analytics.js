@@ -309,7 +309,8 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('Analytics page loaded successfully');
 });
 
-// Refresh data every 30 seconds (if connected to real-time data)
+// Refresh data every 30 seconds; the browser revalidates with If-None-Match,
+// so this is a 304 until a ride changes
 setInterval(() => {
     loadAnalytics();
 }, 30000);
@@ -0,0 +1,87 @@
+// Binary realtime frame decoder (layout documented in wire_format.py)
+const WireFormat = (function() {
+    const KIND_VEHICLE_BATCH = 1;
+    const FLAG_KEYFRAME = 1;
+    const NO_STRING = 0xFFFFFFFF;
+    const STATUSES = ['available', 'busy', 'offline', 'pending', 'accepted',
+                      'in_progress', 'completed', 'cancelled', 'active'];
+    const HEADER_SIZE = 20;
+    const VEHICLE_RECORD_SIZE = 17;
+    const GPS_RECORD_SIZE = 19;
+    const textDecoder = new TextDecoder();
+
+    // One decoder per connection: it holds that connection's string dictionary
+    function createDecoder(epochBase) {
+        const strings = [];
+
+        return function decode(data) {
+            const bytes = data instanceof ArrayBuffer ? new Uint8Array(data) : new Uint8Array(data.buffer, data.byteOffset, data.byteLength);
+            const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+
+            const kind = view.getUint8(0);
+            const flags = view.getUint8(1);
+            const seq = view.getUint32(2, true);
+            const offsetMs = view.getUint32(6, true);
+            const newStrings = view.getUint16(10, true);
+            const recordCount = view.getUint32(12, true);
+            const removedCount = view.getUint32(16, true);
+
+            let pos = HEADER_SIZE;
+            for (let i = 0; i < newStrings; i++) {
+                const index = view.getUint32(pos, true);
+                const length = view.getUint8(pos + 4);
+                strings[index] = textDecoder.decode(bytes.subarray(pos + 5, pos + 5 + length));
+                pos += 5 + length;
+            }
+
+            const frame = {
+                seq: seq,
+                keyframe: Boolean(flags & FLAG_KEYFRAME),
+                timestamp: new Date((epochBase || 0) + offsetMs)
+            };
+
+            if (kind === KIND_VEHICLE_BATCH) {
+                frame.vehicles = [];
+                for (let i = 0; i < recordCount; i++, pos += VEHICLE_RECORD_SIZE) {
+                    const city = view.getUint32(pos + 13, true);
+                    frame.vehicles.push({
+                        vehicle_id: strings[view.getUint32(pos, true)],
+                        lat: view.getInt32(pos + 4, true) / 1e6,
+                        lon: view.getInt32(pos + 8, true) / 1e6,
+                        status: STATUSES[view.getUint8(pos + 12)],
+                        city: city === NO_STRING ? undefined : strings[city]
+                    });
+                }
+                frame.removed = [];
+                for (let i = 0; i < removedCount; i++, pos += 4) {
+                    frame.removed.push(strings[view.getUint32(pos, true)]);
+                }
+            } else {
+                frame.updates = [];
+                for (let i = 0; i < recordCount; i++, pos += GPS_RECORD_SIZE) {
+                    frame.updates.push({
+                        vehicle_id: strings[view.getUint32(pos, true)],
+                        ride_id: view.getUint32(pos + 4, true),
+                        latitude: view.getInt32(pos + 8, true) / 1e6,
+                        longitude: view.getInt32(pos + 12, true) / 1e6,
+                        vehicle_status: STATUSES[view.getUint8(pos + 16)],
+                        progress: view.getUint16(pos + 17, true) / 100
+                    });
+                }
+            }
+            return frame;
+        };
+    }
+
+    // Accept JSON frames unchanged so handlers work with either encoding
+    function wrap(decoderRef, handler) {
+        return function(payload) {
+            if (payload instanceof ArrayBuffer || ArrayBuffer.isView(payload)) {
+                payload = decoderRef.decode(payload);
+            }
+            handler(payload);
+        };
+    }
+
+    return { createDecoder: createDecoder, wrap: wrap };
+})();
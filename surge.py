@@ -0,0 +1,280 @@
+"""
+Zone Surge Pricing
+Live per-zone fare multipliers from supply and demand instead of the static
+rush-hour premiums. The city is cut into a lat/lon grid; for each zone the
+engine keeps
+
+    demand     ride requests still pending there (+1 on booking, -1 once
+               accepted or cancelled; O(1) each)
+    supply     vehicles currently available there (moved between zones as
+               simulator ticks and status changes arrive; O(1) per vehicle)
+
+and re-derives that zone's multiplier on every change. Nothing is read
+from the Ride/Vehicle tables. A request nobody resolves stops counting
+after PENDING_TIMEOUT, so abandoned bookings cannot pin a zone at surge.
+
+    surge = SurgeEngine()
+    surge.observe_request(ride_id, 'bangalore', lat, lon)        # on each booking
+    surge.observe_resolved(ride_id)                              # accepted / cancelled
+    surge.observe_vehicle('KA-01-1234', 'bangalore', lat, lon, 'available')
+    calculate_fare(km, city, hour, surge=surge.multiplier(city, lat, lon))
+
+With a surge, calculate_fare() drops the static rush-hour premium (late-
+night discounts still apply); a city with no tracked vehicles has no
+surge (None) and keeps static pricing. The apps feed the engine from the
+ride event bus (attach()) and the vehicle ticks; SURGE_PRICING=off
+disables it.
+
+Usage: python surge.py [minutes]   (simulated rush: multipliers, update cost)
+"""
+
+import sys
+import math
+import time
+import threading
+from collections import deque
+
+ZONE_DEGREES = 0.05                     # grid cell, about 5 km
+PENDING_TIMEOUT = 900                   # seconds a never-resolved request keeps counting
+MIN_REQUESTS = 3                        # fewer pending requests than this never surge
+SENSITIVITY = 0.5                       # +0.5x per extra pending request per available vehicle
+MAX_SURGE = 2.5
+STEP = 0.1
+
+
+class Zone:
+    """Demand, supply and the current multiplier of one grid cell"""
+
+    __slots__ = ('pending', 'available', 'multiplier')
+
+    def __init__(self):
+        self.pending = 0
+        self.available = 0
+        self.multiplier = 1.0
+
+
+def surge_multiplier(demand, supply, min_requests=MIN_REQUESTS, sensitivity=SENSITIVITY, max_surge=MAX_SURGE):
+    """1.0 until pending requests outnumber available vehicles, then up in 0.1 steps to ``max_surge``"""
+    if demand < min_requests:
+        return 1.0
+    raw = 1.0 + sensitivity * (demand / max(supply, 1) - 1.0)
+    return round(min(max_surge, max(1.0, math.floor(raw / STEP + 1e-9) * STEP)), 1)
+
+
+class SurgeEngine:
+    """Per-zone multipliers maintained from booking and vehicle events"""
+
+    def __init__(self, zone_degrees=ZONE_DEGREES, pending_timeout=PENDING_TIMEOUT, clock=time.monotonic):
+        self.zone_degrees = zone_degrees
+        self.pending_timeout = pending_timeout
+        self.clock = clock
+        self._zones = {}                    # (city, row, col) -> Zone
+        self._pending = {}                  # ride id -> (zone key, requested at)
+        self._requested = deque()           # (requested at, ride id) in arrival order, for expiry
+        self._vehicles = {}                 # vehicle id -> (zone key, available)
+        self._city_vehicles = {}            # city -> tracked vehicles
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    def zone_key(self, city, lat, lon):
+        return (city.lower(), math.floor(lat / self.zone_degrees), math.floor(lon / self.zone_degrees))
+
+    def _zone(self, key):
+        zone = self._zones.get(key)
+        if zone is None:
+            zone = self._zones[key] = Zone()
+        return zone
+
+    def _reprice(self, zone):
+        zone.multiplier = surge_multiplier(zone.pending, zone.available)
+
+    def _resolve(self, ride_id):
+        entry = self._pending.pop(ride_id, None)
+        if entry is not None:
+            zone = self._zones[entry[0]]
+            zone.pending -= 1
+            self._reprice(zone)
+            self.updates += 1
+
+    def _expire(self, now):
+        # Each request is appended and popped once, so this is amortized O(1)
+        cutoff = now - self.pending_timeout
+        while self._requested and self._requested[0][0] <= cutoff:
+            requested_at, ride_id = self._requested.popleft()
+            entry = self._pending.get(ride_id)
+            if entry is not None and entry[1] == requested_at:
+                self._resolve(ride_id)
+
+    def observe_request(self, ride_id, city, lat, lon):
+        """Ride ``ride_id`` is pending with pickup at (lat, lon)"""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            if ride_id in self._pending:
+                return
+            key = self.zone_key(city, lat, lon)
+            zone = self._zone(key)
+            zone.pending += 1
+            self._reprice(zone)
+            self._pending[ride_id] = (key, now)
+            self._requested.append((now, ride_id))
+            self.updates += 1
+
+    def observe_resolved(self, ride_id):
+        """Ride ``ride_id`` is no longer pending (accepted, cancelled, ...); unknown ids are ignored"""
+        with self._lock:
+            self._resolve(ride_id)
+
+    def observe_vehicle(self, vehicle_id, city, lat, lon, status):
+        """A vehicle's position and status (e.g. one entry of a simulator tick)"""
+        key = self.zone_key(city, lat, lon) if lat is not None and lon is not None else None
+        self._move(vehicle_id, key, status == 'available', city.lower())
+
+    def observe_status(self, vehicle_id, status):
+        """A vehicle's status changed; its zone is the last one seen"""
+        with self._lock:
+            known = self._vehicles.get(vehicle_id)
+        if known is not None:
+            self._move(vehicle_id, known[0], status == 'available', None)
+
+    def observe_tick(self, states):
+        """One simulator tick of vehicle_state() dicts"""
+        for state in states:
+            if state.get('city'):
+                self.observe_vehicle(state['vehicle_id'], state['city'], state['lat'], state['lon'], state['status'])
+
+    def _move(self, vehicle_id, key, available, city):
+        with self._lock:
+            old_key, was_available = self._vehicles.get(vehicle_id, (None, False))
+            if (old_key, was_available) == (key, available):
+                return
+            if old_key is None and city is not None:
+                self._city_vehicles[city] = self._city_vehicles.get(city, 0) + 1
+            if was_available and old_key is not None:
+                zone = self._zones[old_key]
+                zone.available -= 1
+                self._reprice(zone)
+            if available and key is not None:
+                zone = self._zone(key)
+                zone.available += 1
+                self._reprice(zone)
+            self._vehicles[vehicle_id] = (key, available)
+            self.updates += 1
+
+    def multiplier(self, city, lat, lon):
+        """Live multiplier at (lat, lon); None while the city has no tracked vehicles"""
+        city = city.lower()
+        key = self.zone_key(city, lat, lon)
+        with self._lock:
+            if not self._city_vehicles.get(city):
+                return None
+            self._expire(self.clock())
+            zone = self._zones.get(key)
+            return zone.multiplier if zone is not None else 1.0
+
+    def zones(self, city=None):
+        """Every zone with demand or supply, surging zones first"""
+        rows = []
+        with self._lock:
+            self._expire(self.clock())
+            for (zone_city, row, col), zone in self._zones.items():
+                if city is not None and zone_city != city.lower():
+                    continue
+                if not zone.pending and not zone.available:
+                    continue
+                rows.append({
+                    'city': zone_city,
+                    'south': round(row * self.zone_degrees, 6), 'west': round(col * self.zone_degrees, 6),
+                    'north': round((row + 1) * self.zone_degrees, 6), 'east': round((col + 1) * self.zone_degrees, 6),
+                    'pending': zone.pending, 'available': zone.available, 'multiplier': zone.multiplier,
+                })
+        return sorted(rows, key=lambda row: (-row['multiplier'], -row['pending']))
+
+    def attach(self, bus):
+        """Feed demand and status-driven supply from a ride_events.EventBus.
+
+        The handlers run in the publishing thread (O(1) bookkeeping), so the
+        next quote after a commit already sees it.
+        """
+        from ride_events import RideStatusChanged, VehicleStatusChanged
+
+        def track_demand(change):
+            ride = change.ride
+            if ride['status'] == 'pending':
+                self.observe_request(ride['id'], ride['city'], ride['pickup_lat'], ride['pickup_lon'])
+            elif change.old_status == 'pending':
+                self.observe_resolved(ride['id'])
+
+        def track_supply(change):
+            self.observe_status(change.vehicle_number, change.status)
+
+        bus.subscribe(RideStatusChanged, track_demand, name='surge.demand', sync=True)
+        bus.subscribe(VehicleStatusChanged, track_supply, name='surge.supply', sync=True)
+
+    def __len__(self):
+        return len(self._zones)
+
+
+def _simulate(minutes, vehicles=200, seed=7):
+    """Rush-hour demand that supply covers, then a spike at one spot; returns (timeline, µs per update)"""
+    import heapq
+    import random
+    rng = random.Random(seed)
+    clock = [0.0]
+    engine = SurgeEngine(clock=lambda: clock[0])
+    hot = (12.9716, 77.5946)                # MG Road
+    positions = {f'KA-{i:04d}': (rng.uniform(12.85, 13.10), rng.uniform(77.50, 77.75)) for i in range(vehicles)}
+    accepts = []                            # (accepted at, ride id)
+    timeline = []
+    updates_seconds = 0.0
+    updates = 0
+    next_ride = 0
+    for second in range(int(minutes * 60)):
+        clock[0] = float(second)
+        # Requests per second at MG Road: a steady 0.01, plus a spike that
+        # ramps up to 0.1 and back down over the middle half of the run;
+        # a driver accepts each one 1-4 minutes later
+        phase = second / (minutes * 60)
+        rate = 0.01 + 0.09 * max(0.0, 1 - abs(phase - 0.5) * 4)
+        started = time.perf_counter()
+        for _ in range(int(rate) + (rng.random() < rate % 1)):
+            engine.observe_request(next_ride, 'bangalore',
+                                   hot[0] + rng.uniform(-0.01, 0.01), hot[1] + rng.uniform(-0.01, 0.01))
+            heapq.heappush(accepts, (second + rng.uniform(60, 240), next_ride))
+            next_ride += 1
+            updates += 1
+        while accepts and accepts[0][0] <= second:
+            engine.observe_resolved(heapq.heappop(accepts)[1])
+            updates += 1
+        if second % 5 == 0:
+            states = []
+            # About 6 vehicles per 5 km zone, 70% of them available
+            for vehicle_id, (lat, lon) in positions.items():
+                lat, lon = lat + rng.uniform(-0.001, 0.001), lon + rng.uniform(-0.001, 0.001)
+                positions[vehicle_id] = (lat, lon)
+                states.append({'vehicle_id': vehicle_id, 'city': 'bangalore', 'lat': lat, 'lon': lon,
+                               'status': 'available' if rng.random() < 0.7 else 'busy'})
+            engine.observe_tick(states)
+            updates += len(states)
+        updates_seconds += time.perf_counter() - started
+        if second % 60 == 0:
+            zone = engine.zones('bangalore')[0]
+            timeline.append((second, engine.multiplier('bangalore', *hot), engine.multiplier('bangalore', 13.05, 77.70),
+                             zone['pending'], zone['available']))
+    return timeline, updates_seconds / updates * 1e6
+
+
+if __name__ == '__main__':
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print("\n" + "="*80)
+    print("ZONE SURGE SIMULATION")
+    print("="*80)
+    timeline, update_us = _simulate(minutes)
+    print(f"200 vehicles spread over Bangalore; bookings at MG Road spike over the middle of {minutes:g} min\n")
+    print(f"{'t (s)':>8}{'MG Road':>10}{'elsewhere':>11}{'top zone pending':>18}{'available':>11}")
+    print(f"{'':>8}{'(x fare)':>10}{'(x fare)':>11}{'(requests)':>18}{'':>11}")
+    for second, hot, cold, pending, available in timeline:
+        print(f"{second:>8}{hot:>10.1f}{(cold or 1.0):>11.1f}{pending:>18}{available:>11}")
+    print(f"\nUpdate cost: {update_us:.2f} µs per booking/acceptance/vehicle observation")
+    print("="*80 + "\n")
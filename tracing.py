@@ -0,0 +1,507 @@
+"""
+Stage-Level Tracing
+Lightweight spans for the booking and prediction pipelines. Each traced
+request gets a root span (a W3C ``traceparent`` header continues an
+upstream trace); stages open child spans; the context follows work onto
+offload() threads (tracer.wrap) and into event-bus subscribers and the
+ride simulation (the context travels with the event / ride).
+
+    with tracer.span('fare', city=city):
+        fare = calculate_fare(distance, city, hour)
+
+Spans are kept in memory for /api/admin/traces and exported in batches
+when TRACE_EXPORT is set:
+
+    TRACE_EXPORT=file:traces.jsonl                          one span per line
+    TRACE_EXPORT=otlp:http://localhost:4318/v1/traces       OTLP/HTTP JSON
+
+TRACE_SAMPLE (0-1, default 1) is the share of requests traced; requests
+that are not sampled pay for one random() call.
+
+Usage:
+    python tracing.py collect [--port 4318] [--out traces.jsonl]   (OTLP collector stand-in)
+    python tracing.py report traces.jsonl [--root "POST /api/book-ride"]
+    python tracing.py bench                                          (per-span overhead)
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import argparse
+import threading
+import statistics
+import urllib.request
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+TRACEPARENT = 'traceparent'
+
+
+class SpanContext:
+    """Where a span sits: its trace and its own id (the parent of spans opened under it)"""
+
+    __slots__ = ('trace_id', 'span_id')
+
+    def __init__(self, trace_id, span_id):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    @classmethod
+    def from_traceparent(cls, header):
+        """'00-<32 hex trace>-<16 hex span>-<flags>' -> SpanContext, None if malformed"""
+        parts = (header or '').strip().split('-')
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            int(parts[1], 16), int(parts[2], 16)
+        except ValueError:
+            return None
+        return cls(parts[1], parts[2])
+
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+
+class Span:
+    """One timed stage; use as a context manager"""
+
+    __slots__ = ('tracer', 'name', 'context', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'status')
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.context = SpanContext(parent.trace_id if parent else os.urandom(16).hex(), os.urandom(8).hex())
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = 'ok'
+        self.start_ns = self.end_ns = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        _stack().append(self.context)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _stack().pop()
+        if exc_type is not None:
+            self.status = 'error'
+            self.attributes['error'] = f'{exc_type.__name__}: {exc}'
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self):
+        return {
+            'trace_id': self.context.trace_id,
+            'span_id': self.context.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'service': self.tracer.service,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': self.status,
+        }
+
+
+class _NoSpan:
+    """Stands in for a span when nothing is being traced"""
+
+    context = None
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+_local = threading.local()              # green-thread local once eventlet/gevent patch it
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+class Tracer:
+    """Span factory, recent-trace buffer and exporter hook for one process"""
+
+    def __init__(self, service, exporter=None, sample_rate=1.0, keep_traces=200):
+        self.service = service
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._traces = OrderedDict()        # trace_id -> [span dicts], most recent last
+        self._keep = keep_traces
+        self._lock = threading.Lock()
+
+    def current(self):
+        """SpanContext of the innermost open span on this thread, or None"""
+        stack = _stack()
+        return stack[-1] if stack else None
+
+    def span(self, name, parent=None, **attributes):
+        """A child of ``parent`` (default: the current span); a no-op outside any trace"""
+        parent = parent or self.current()
+        if parent is None:
+            return NO_SPAN
+        return Span(self, name, parent, attributes)
+
+    def start_trace(self, name, traceparent=None, **attributes):
+        """A root span (or the continuation of an upstream trace), subject to sampling"""
+        upstream = SpanContext.from_traceparent(traceparent)
+        if upstream is None and random.random() >= self.sample_rate:
+            return NO_SPAN
+        return Span(self, name, upstream, attributes)
+
+    @contextmanager
+    def activate(self, context):
+        """Make ``context`` (e.g. carried by an event) the parent of spans opened in the block"""
+        if context is None:
+            yield
+            return
+        stack = _stack()
+        stack.append(context)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def wrap(self, func):
+        """``func`` bound to the current trace context, for offload() and other threads"""
+        context = self.current()
+        if context is None:
+            return func
+
+        def traced(*args, **kwargs):
+            with self.activate(context):
+                return func(*args, **kwargs)
+        return traced
+
+    def record(self, name, parent, start_ns, end_ns, **attributes):
+        """Add an already-finished span (e.g. a ride simulation, timed by its engine)"""
+        if parent is None:
+            return
+        span = Span(self, name, parent, attributes)
+        span.start_ns, span.end_ns = start_ns, end_ns
+        self._finish(span)
+
+    def _finish(self, span):
+        record = span.to_dict()
+        with self._lock:
+            spans = self._traces.get(record['trace_id'])
+            if spans is None:
+                spans = self._traces[record['trace_id']] = []
+                if len(self._traces) > self._keep:
+                    self._traces.popitem(last=False)
+            spans.append(record)
+        if self.exporter is not None:
+            self.exporter.export(record)
+
+    def install(self, app, paths=None):
+        """Root span per request (only ``paths`` if given); trace id in the response headers"""
+        from flask import request, g
+        from request_lifecycle import on_request
+
+        def start_request_trace():
+            rule = request.url_rule.rule if request.url_rule else None
+            if rule is None or (paths is not None and rule not in paths):
+                return
+            span = self.start_trace(f'{request.method} {rule}', request.headers.get(TRACEPARENT),
+                                    path=request.path)
+            if span is not NO_SPAN:
+                g._trace_span = span.__enter__()
+
+        def finish_request_trace(response, exception):
+            span = g.pop('_trace_span', None)
+            if span is None:
+                return
+            if response is None:
+                span.__exit__(type(exception) if exception else None, exception, None)
+                return
+            span.set('status_code', response.status_code)
+            if response.status_code >= 500:
+                span.status = 'error'
+            span.__exit__(None, None, None)
+            response.headers[TRACEPARENT] = span.context.traceparent()
+            response.headers['X-Trace-Id'] = span.context.trace_id
+
+        on_request(app, start_request_trace, finish_request_trace)
+
+    def traces(self, limit=50):
+        """Most recent traces, newest first, one summary row each"""
+        with self._lock:
+            recent = list(self._traces.items())[-limit:]
+        rows = []
+        for trace_id, spans in reversed(recent):
+            # The local root; a continued trace's parent lives in the upstream service
+            ids = {s['span_id'] for s in spans}
+            root = next((s for s in spans if s['parent_id'] not in ids), spans[0])
+            rows.append({'trace_id': trace_id, 'root': root['name'], 'duration_ms': root['duration_ms'],
+                         'spans': len(spans), 'status': 'error' if any(s['status'] == 'error' for s in spans) else 'ok'})
+        return rows
+
+    def trace(self, trace_id):
+        """Every span of one trace, in start order"""
+        with self._lock:
+            spans = list(self._traces.get(trace_id, ()))
+        return sorted(spans, key=lambda s: s['start_ns'])
+
+
+class BatchExporter:
+    """Ships finished spans from a background thread; never blocks the caller"""
+
+    def __init__(self, flush_interval=1.0, max_batch=512, max_queue=20000):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name='trace-exporter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def export(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e:
+                print(f"⚠ Trace export failed ({len(batch)} spans): {e}")
+
+    def write(self, batch):
+        raise NotImplementedError
+
+
+class JsonlExporter(BatchExporter):
+    """Appends one JSON span per line to ``path``"""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, batch):
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(record) + '\n' for record in batch)
+
+
+class OtlpExporter(BatchExporter):
+    """POSTs OTLP/HTTP JSON (ExportTraceServiceRequest) to a collector"""
+
+    def __init__(self, url, timeout=5.0, **kwargs):
+        self.url = url
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def write(self, batch):
+        body = json.dumps(to_otlp(batch)).encode()
+        req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(records):
+    """Span dicts -> an OTLP JSON export request, grouped by service"""
+    by_service = defaultdict(list)
+    for record in records:
+        by_service[record['service']].append({
+            'traceId': record['trace_id'],
+            'spanId': record['span_id'],
+            'parentSpanId': record['parent_id'] or '',
+            'name': record['name'],
+            'kind': 2 if record['parent_id'] is None else 1,      # SERVER root, INTERNAL stages
+            'startTimeUnixNano': str(record['start_ns']),
+            'endTimeUnixNano': str(record['end_ns']),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in record['attributes'].items()],
+            'status': {'code': 2 if record['status'] == 'error' else 1},
+        })
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service}}]},
+        'scopeSpans': [{'scope': {'name': 'rideshare.tracing'}, 'spans': spans}],
+    } for service, spans in by_service.items()]}
+
+
+def from_otlp(payload):
+    """An OTLP JSON export request -> span dicts (what JsonlExporter writes)"""
+    records = []
+    for resource_spans in payload.get('resourceSpans', ()):
+        service = next((a['value'].get('stringValue') for a in resource_spans.get('resource', {}).get('attributes', ())
+                        if a['key'] == 'service.name'), 'unknown')
+        for scope_spans in resource_spans.get('scopeSpans', ()):
+            for span in scope_spans.get('spans', ()):
+                start, end = int(span['startTimeUnixNano']), int(span['endTimeUnixNano'])
+                records.append({
+                    'trace_id': span['traceId'], 'span_id': span['spanId'],
+                    'parent_id': span.get('parentSpanId') or None, 'name': span['name'], 'service': service,
+                    'start_ns': start, 'end_ns': end, 'duration_ms': round((end - start) / 1e6, 3),
+                    'attributes': {a['key']: next(iter(a['value'].values())) for a in span.get('attributes', ())},
+                    'status': 'error' if span.get('status', {}).get('code') == 2 else 'ok',
+                })
+    return records
+
+
+def exporter_from_env(spec=None):
+    """TRACE_EXPORT: 'file:<path>', 'otlp:<url>' or unset (in-memory only)"""
+    spec = spec if spec is not None else os.environ.get('TRACE_EXPORT', '')
+    kind, _, target = spec.partition(':')
+    if not spec:
+        return None
+    if kind == 'file' and target:
+        return JsonlExporter(target)
+    if kind == 'otlp' and target:
+        return OtlpExporter(target)
+    raise ValueError(f'TRACE_EXPORT must be file:<path> or otlp:<url>, not {spec!r}')
+
+
+def tracer_from_env(service):
+    """A Tracer configured by TRACE_EXPORT and TRACE_SAMPLE"""
+    sample_rate = float(os.environ.get('TRACE_SAMPLE', 1))
+    if not 0 <= sample_rate <= 1:
+        raise ValueError(f'TRACE_SAMPLE must be between 0 and 1, not {sample_rate}')
+    return Tracer(service, exporter=exporter_from_env(), sample_rate=sample_rate)
+
+
+def stage_report(records, root=None):
+    """Per stage path ('POST /api/book-ride > predict > model'): count, mean/p50/p95 ms, share of root"""
+    by_id = {record['span_id']: record for record in records}
+
+    def path(record):
+        names = [record['name']]
+        while record['parent_id'] in by_id:
+            record = by_id[record['parent_id']]
+            names.append(record['name'])
+        return list(reversed(names)), record
+
+    durations = defaultdict(list)
+    root_total = defaultdict(float)
+    for record in records:
+        names, top = path(record)
+        if root and names[0] != root:
+            continue
+        durations[' > '.join(names)].append(record['duration_ms'])
+        if record is top:
+            root_total[names[0]] += record['duration_ms']
+    rows = []
+    for key, values in sorted(durations.items()):
+        values.sort()
+        total = root_total.get(key.split(' > ')[0]) or 0
+        rows.append({
+            'stage': key, 'count': len(values), 'mean_ms': round(statistics.fmean(values), 3),
+            'p50_ms': round(values[len(values) // 2], 3),
+            'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            'share': round(sum(values) / total, 3) if total else None,
+        })
+    return rows
+
+
+def collect(port, out):
+    """Minimal OTLP/HTTP JSON receiver: appends the spans it gets to ``out``"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/v1/traces':
+                self.send_error(404)
+                return
+            try:
+                records = from_otlp(json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0)))))
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            with open(out, 'a') as f:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+            print(f"{len(records)} spans from {len({r['trace_id'] for r in records})} traces", flush=True)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"OTLP collector stand-in on http://0.0.0.0:{port}/v1/traces -> {out}")
+    ThreadingHTTPServer(('0.0.0.0', port), Handler).serve_forever()
+
+
+def _bench(iterations):
+    """µs per span: untraced (no-op), traced, traced with the JSONL exporter"""
+    import tempfile
+    results = {}
+    for label, exporter in (('no trace', None), ('in-memory', None),
+                            ('jsonl export', JsonlExporter(os.path.join(tempfile.mkdtemp(), 'bench.jsonl')))):
+        tracer = Tracer('bench', exporter=exporter, keep_traces=10)
+        root = tracer.start_trace('bench') if label != 'no trace' else NO_SPAN
+        with root:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                with tracer.span('stage', i=1):
+                    pass
+            results[label] = (time.perf_counter() - started) / iterations * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='tracing.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    collect_parser = commands.add_parser('collect', help='run an OTLP/HTTP JSON collector stand-in')
+    collect_parser.add_argument('--port', type=int, default=4318)
+    collect_parser.add_argument('--out', default='traces.jsonl')
+    report_parser = commands.add_parser('report', help='stage latency breakdown of a span file')
+    report_parser.add_argument('path')
+    report_parser.add_argument('--root', help='only traces whose root span has this name')
+    bench_parser = commands.add_parser('bench', help='per-span overhead')
+    bench_parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command == 'collect':
+        collect(args.port, args.out)
+
+    print("\n" + "="*80)
+    print("TRACE STAGE REPORT" if args.command == 'report' else "TRACING OVERHEAD")
+    print("="*80)
+    if args.command == 'report':
+        with open(args.path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        print(f"{len(records)} spans, {len({r['trace_id'] for r in records})} traces\n")
+        print(f"{'stage':<72}{'count':>7}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'share':>8}")
+        for row in stage_report(records, args.root):
+            share = f"{row['share'] * 100:.0f}%" if row['share'] is not None else ''
+            print(f"{row['stage'][-71:]:<72}{row['count']:>7}{row['mean_ms']:>10.3f}{row['p50_ms']:>9.3f}"
+                  f"{row['p95_ms']:>9.3f}{share:>8}")
+        print("\nshare = time in the stage / time in its root spans (children overlap their parents)")
+    else:
+        for label, us in _bench(args.iterations).items():
+            print(f"{label:<14} {us:8.2f} µs per span")
+    print("="*80 + "\n")
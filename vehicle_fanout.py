@@ -0,0 +1,586 @@
+"""
+Vehicle Position Fan-out
+Collects every vehicle position staged during a simulation tick and sends
+each map client one ``vehicle_batch`` frame with only the vehicles inside
+its viewport that moved beyond a threshold or changed status. Every
+``keyframe_every`` ticks (and whenever a client subscribes) the frame
+carries the full state of the viewport.
+
+Clients subscribe with their map bounds and zoom (``subscribe_viewport``).
+Subscriptions are bucketed in a uniform lat/lon grid, so a changed vehicle
+is only tested against the clients whose viewport can contain it. Below
+``cluster_zoom`` a client gets ``vehicle_clusters`` counts instead.
+
+Clients that negotiated the binary wire format at connect get vehicle_batch
+(and gps_batch) frames encoded by their own wire_format.PositionEncoder.
+
+Nothing is emitted from the simulation thread. Each client has a
+ClientOutbox where positions are coalesced latest-wins per vehicle (per
+ride for gps_batch, per event and key for emit_latest(), e.g. a ride
+room's gps_update); a dispatcher thread sends a client's outbox only while
+its engine.io send queue is short, and disconnects clients that stay
+backed up for ``stall_timeout`` seconds.
+
+Frame formats:
+    vehicle_batch    {'seq': 42, 'keyframe': False, 'removed': ['KA-01-1001'],
+                      'vehicles': [{'vehicle_id': 'KA-01-1000', 'lat': 12.97, 'lon': 77.59,
+                                    'status': 'available', 'city': 'bangalore'}, ...]}
+    vehicle_clusters {'seq': 42, 'zoom': 9,
+                      'clusters': [{'lat': 12.96, 'lon': 77.60, 'count': 31, 'available': 12}, ...]}
+"""
+
+import math
+import time
+import threading
+from collections import defaultdict
+import socketio as socketio_lib
+from wire_format import PositionEncoder
+
+
+def cluster_cell_size(zoom):
+    """Cluster cell edge in degrees for a map zoom level (about 60px on screen)"""
+    return 360.0 / 2 ** zoom * 60 / 256
+
+
+class SpatialGrid:
+    """Uniform lat/lon grid mapping cells to sets of keys"""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+
+    def cell(self, lat, lon):
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def cell_ranges(self, bounds):
+        south, west, north, east = bounds
+        (row0, col0), (row1, col1) = self.cell(south, west), self.cell(north, east)
+        return range(row0, row1 + 1), range(col0, col1 + 1)
+
+    def cells_in(self, bounds):
+        """Every cell overlapping ``bounds`` (south, west, north, east)"""
+        rows, cols = self.cell_ranges(bounds)
+        return [(row, col) for row in rows for col in cols]
+
+    def add(self, key, cells):
+        for cell in cells:
+            self.cells[cell].add(key)
+
+    def discard(self, key, cells):
+        for cell in cells:
+            keys = self.cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.cells[cell]
+
+    def at(self, lat, lon):
+        return self.cells.get(self.cell(lat, lon), ())
+
+    def keys_in(self, bounds):
+        """Keys in occupied cells overlapping ``bounds``"""
+        rows, cols = self.cell_ranges(bounds)
+        if len(rows) * len(cols) > len(self.cells):
+            # Wide box: walk the occupied cells instead of the whole range
+            cells = [cell for cell in self.cells if cell[0] in rows and cell[1] in cols]
+        else:
+            cells = [(row, col) for row in rows for col in cols if (row, col) in self.cells]
+        return [key for cell in cells for key in self.cells[cell]]
+
+
+class Viewport:
+    """One client's map subscription"""
+
+    def __init__(self, bounds, zoom, clustered):
+        self.bounds = bounds
+        self.zoom = zoom
+        self.clustered = clustered
+        self.cells = []
+        self.known = set()
+
+    def contains(self, lat, lon):
+        south, west, north, east = self.bounds
+        return south <= lat <= north and west <= lon <= east
+
+
+class ClientOutbox:
+    """Pending frames for one client, coalesced latest-wins"""
+
+    def __init__(self):
+        self.vehicles = {}      # vehicle_id -> latest unsent state
+        self.removed = set()
+        self.keyframe = False
+        self.clusters = None    # latest unsent cluster frame
+        self.gps = {}           # ride_id -> latest unsent gps update
+        self.events = {}        # (event, key) -> latest unsent payload
+        self.blocked_since = None
+        self.frames_sent = 0
+        self.coalesced = 0      # positions overwritten before they were sent
+        self.dropped = 0        # whole cluster frames replaced before they were sent
+
+    @property
+    def pending(self):
+        return bool(self.vehicles or self.removed or self.keyframe or
+                    self.clusters is not None or self.gps or self.events)
+
+    def reset(self):
+        """Forget unsent frames (the client switched viewport mode)"""
+        self.vehicles, self.removed, self.keyframe, self.clusters = {}, set(), False, None
+
+    def add_vehicles(self, frame):
+        self.keyframe = self.keyframe or frame['keyframe']
+        for state in frame['vehicles']:
+            if self.vehicles.get(state['vehicle_id']) is not None:
+                self.coalesced += 1
+            self.vehicles[state['vehicle_id']] = state
+            self.removed.discard(state['vehicle_id'])
+        for vehicle_id in frame['removed']:
+            if self.vehicles.pop(vehicle_id, None) is not None:
+                self.coalesced += 1
+            self.removed.add(vehicle_id)
+
+    def add_clusters(self, frame):
+        if self.clusters is not None:
+            self.dropped += 1
+        self.clusters = frame
+
+    def add_gps(self, updates):
+        for update in updates:
+            if update['ride_id'] in self.gps:
+                self.coalesced += 1
+            self.gps[update['ride_id']] = update
+
+    def add_event(self, event, key, payload):
+        if (event, key) in self.events:
+            self.coalesced += 1
+        self.events[(event, key)] = payload
+
+    def take(self, seq):
+        """Pending frames as [(kind, frame)], emptying the outbox"""
+        frames = []
+        if self.vehicles or self.removed or self.keyframe:
+            frames.append(('vehicles', {'seq': seq, 'keyframe': self.keyframe,
+                                        'vehicles': list(self.vehicles.values()),
+                                        'removed': list(self.removed)}))
+        if self.clusters is not None:
+            frames.append(('clusters', self.clusters))
+        if self.gps:
+            frames.append(('gps', list(self.gps.values())))
+        for (event, _), payload in self.events.items():
+            frames.append(('event', (event, payload)))
+        self.vehicles, self.removed, self.keyframe, self.clusters, self.gps = {}, set(), False, None, {}
+        self.events = {}
+        self.frames_sent += len(frames)
+        return frames
+
+
+def vehicle_state(vehicle_id, lat, lon, status, **extra):
+    """The per-vehicle dict carried in frames and simulator ticks"""
+    state = {'vehicle_id': vehicle_id, 'lat': lat, 'lon': lon, 'status': status}
+    state.update(extra)
+    return state
+
+
+def parse_viewport(data):
+    """Validate a subscribe_viewport payload into ((south, west, north, east), zoom)"""
+    south, west, north, east = (float(data[key]) for key in ('south', 'west', 'north', 'east'))
+    zoom = int(data['zoom'])
+    if not all(math.isfinite(value) for value in (south, west, north, east)):
+        raise ValueError('Viewport bounds must be finite')
+    if south > north or west > east:
+        raise ValueError('Viewport bounds are inverted')
+    return (max(south, -90.0), max(west, -180.0), min(north, 90.0), min(east, 180.0)), zoom
+
+
+class VehicleBatchFanout:
+    """Per-tick batching, delta suppression and viewport routing for vehicle emits"""
+
+    def __init__(self, socketio, event='vehicle_batch', cluster_event='vehicle_clusters',
+                 gps_event='gps_batch', position_threshold=1e-5, keyframe_every=12,
+                 cell_size=0.01, cluster_zoom=12, max_viewport_cells=10000,
+                 max_backlog=8, stall_timeout=30.0, dispatch_interval=0.05):
+        self.socketio = socketio
+        self.event = event
+        self.cluster_event = cluster_event
+        self.gps_event = gps_event
+        self.position_threshold = position_threshold
+        self.keyframe_every = keyframe_every
+        self.cluster_zoom = cluster_zoom
+        self.max_viewport_cells = max_viewport_cells
+        self.max_backlog = max_backlog
+        self.stall_timeout = stall_timeout
+        self.dispatch_interval = dispatch_interval
+
+        self._lock = threading.Lock()
+        self._pending = {}                  # vehicle_id -> state staged this tick
+        self._vehicles = {}                 # vehicle_id -> state last sent
+        self._vehicle_grid = SpatialGrid(cell_size)
+        self._viewports = {}                # sid -> Viewport
+        self._viewport_grid = SpatialGrid(cell_size)
+        self._watchers = defaultdict(set)   # vehicle_id -> sids that have it on screen
+        self._encoders = {}                 # sid -> PositionEncoder for binary clients
+        self._outboxes = {}                 # sid -> ClientOutbox
+        self._seq = 0
+
+        self._wake = threading.Event()
+        self._dispatcher = None
+        self.slow_disconnects = 0
+
+    # ------------------------------------------------------------------
+    # Subscriptions (request threads)
+    # ------------------------------------------------------------------
+
+    def negotiate(self, sid, auth):
+        """Pick the wire format from the client's connect ``auth`` payload"""
+        if isinstance(auth, dict) and auth.get('encoding') == 'binary':
+            encoder = PositionEncoder()
+            with self._lock:
+                self._encoders[sid] = encoder
+            return {'encoding': 'binary', 'epoch_base': encoder.epoch_base_ms}
+        return {'encoding': 'json'}
+
+    def subscribe(self, sid, bounds, zoom):
+        """Replace ``sid``'s viewport and send it a keyframe; returns the mode"""
+        with self._lock:
+            self._drop_viewport(sid)
+            cells = self._viewport_grid.cells_in(bounds)
+            clustered = zoom < self.cluster_zoom or len(cells) > self.max_viewport_cells
+            viewport = Viewport(bounds, zoom, clustered)
+            if not clustered:
+                viewport.cells = cells
+                self._viewport_grid.add(sid, cells)
+            self._viewports[sid] = viewport
+            frame = self._full_frame(sid, viewport, self._cluster_index({zoom}) if clustered else None)
+            outbox = self._outbox(sid)
+            outbox.reset()
+            self._enqueue(outbox, viewport, frame)
+
+        self._notify()
+        return 'clusters' if clustered else 'vehicles'
+
+    def unsubscribe(self, sid):
+        """Forget a disconnected client"""
+        with self._lock:
+            self._drop_viewport(sid)
+            self._encoders.pop(sid, None)
+            self._outboxes.pop(sid, None)
+
+    def _drop_viewport(self, sid):
+        viewport = self._viewports.pop(sid, None)
+        if viewport is None:
+            return
+        self._viewport_grid.discard(sid, viewport.cells)
+        for vehicle_id in viewport.known:
+            watchers = self._watchers.get(vehicle_id)
+            if watchers is not None:
+                watchers.discard(sid)
+                if not watchers:
+                    del self._watchers[vehicle_id]
+
+    # ------------------------------------------------------------------
+    # Ticks (simulation thread)
+    # ------------------------------------------------------------------
+
+    def stage(self, vehicle_id, lat, lon, status, **extra):
+        """Record a vehicle's current state for the next flush"""
+        state = vehicle_state(vehicle_id, lat, lon, status, **extra)
+        with self._lock:
+            self._pending[vehicle_id] = state
+
+    def apply_tick(self, states):
+        """Stage a whole tick of vehicle_state() dicts and flush it"""
+        with self._lock:
+            for state in states:
+                self._pending[state['vehicle_id']] = state
+        return self.flush()
+
+    def _changed(self, previous, state):
+        if previous is None or previous['status'] != state['status']:
+            return True
+        return (abs(previous['lat'] - state['lat']) > self.position_threshold or
+                abs(previous['lon'] - state['lon']) > self.position_threshold)
+
+    def flush(self):
+        """Queue for each subscribed client what changed in its viewport since the last flush"""
+        with self._lock:
+            self._seq += 1
+            keyframe = self._seq % self.keyframe_every == 0
+
+            changed = [state for vehicle_id, state in self._pending.items()
+                       if self._changed(self._vehicles.get(vehicle_id), state)]
+            self._pending.clear()
+            # Sub-threshold moves are not recorded, so drift still
+            # gets sent once it accumulates past the threshold
+            for state in changed:
+                self._move_vehicle(state)
+
+            cluster_zooms = {viewport.zoom for viewport in self._viewports.values() if viewport.clustered}
+            clusters = self._cluster_index(cluster_zooms) if (changed or keyframe) and cluster_zooms else None
+
+            frames = []
+            if keyframe:
+                for sid, viewport in self._viewports.items():
+                    frames.append((sid, viewport, self._full_frame(sid, viewport, clusters)))
+            else:
+                deltas = self._route(changed)
+                for sid, (vehicles, removed) in deltas.items():
+                    frames.append((sid, self._viewports[sid], {
+                        'seq': self._seq, 'keyframe': False, 'vehicles': vehicles, 'removed': removed
+                    }))
+                if clusters is not None:
+                    for sid, viewport in self._viewports.items():
+                        if viewport.clustered:
+                            frames.append((sid, viewport, self._cluster_frame(viewport, clusters)))
+            for sid, viewport, frame in frames:
+                self._enqueue(self._outbox(sid), viewport, frame)
+
+        self._notify()
+        return frames
+
+    def _move_vehicle(self, state):
+        vehicle_id = state['vehicle_id']
+        previous = self._vehicles.get(vehicle_id)
+        if previous is not None:
+            self._vehicle_grid.discard(vehicle_id, [self._vehicle_grid.cell(previous['lat'], previous['lon'])])
+        self._vehicle_grid.add(vehicle_id, [self._vehicle_grid.cell(state['lat'], state['lon'])])
+        self._vehicles[vehicle_id] = state
+
+    def _route(self, changed):
+        """Map changed vehicles to {sid: (vehicles, removed)} via the viewport grid"""
+        deltas = defaultdict(lambda: ([], []))
+        for state in changed:
+            vehicle_id = state['vehicle_id']
+            lat, lon = state['lat'], state['lon']
+            watchers = self._watchers[vehicle_id]
+            for sid in set(self._viewport_grid.at(lat, lon)) | watchers:
+                viewport = self._viewports[sid]
+                south, west, north, east = viewport.bounds
+                if south <= lat <= north and west <= lon <= east:
+                    deltas[sid][0].append(state)
+                    viewport.known.add(vehicle_id)
+                    watchers.add(sid)
+                elif vehicle_id in viewport.known:
+                    deltas[sid][1].append(vehicle_id)
+                    viewport.known.discard(vehicle_id)
+                    watchers.discard(sid)
+            if not watchers:
+                self._watchers.pop(vehicle_id, None)
+        return deltas
+
+    def _full_frame(self, sid, viewport, clusters):
+        if viewport.clustered:
+            return self._cluster_frame(viewport, clusters)
+
+        vehicles = [self._vehicles[vehicle_id] for vehicle_id in self._vehicle_grid.keys_in(viewport.bounds)]
+        vehicles = [state for state in vehicles if viewport.contains(state['lat'], state['lon'])]
+        visible = {state['vehicle_id'] for state in vehicles}
+
+        for vehicle_id in visible - viewport.known:
+            self._watchers[vehicle_id].add(sid)
+        removed = list(viewport.known - visible)
+        for vehicle_id in removed:
+            watchers = self._watchers.get(vehicle_id)
+            if watchers is not None:
+                watchers.discard(sid)
+                if not watchers:
+                    del self._watchers[vehicle_id]
+        viewport.known = visible
+
+        return {'seq': self._seq, 'keyframe': True, 'vehicles': vehicles, 'removed': removed}
+
+    # ------------------------------------------------------------------
+    # Clusters
+    # ------------------------------------------------------------------
+
+    def _cluster_index(self, zooms):
+        """{zoom: [cluster dicts]} over every known vehicle, one pass per zoom"""
+        index = {}
+        for zoom in zooms:
+            size = cluster_cell_size(zoom)
+            cells = {}
+            for state in self._vehicles.values():
+                key = (math.floor(state['lat'] / size), math.floor(state['lon'] / size))
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = [0, 0, 0.0, 0.0]
+                cell[0] += 1
+                cell[1] += state['status'] == 'available'
+                cell[2] += state['lat']
+                cell[3] += state['lon']
+            index[zoom] = [
+                {'lat': round(lat / count, 5), 'lon': round(lon / count, 5), 'count': count, 'available': available}
+                for count, available, lat, lon in cells.values()
+            ]
+        return index
+
+    def _cluster_frame(self, viewport, clusters):
+        visible = [cluster for cluster in clusters.get(viewport.zoom, ())
+                   if viewport.contains(cluster['lat'], cluster['lon'])]
+        return {'seq': self._seq, 'zoom': viewport.zoom, 'clusters': visible}
+
+    # ------------------------------------------------------------------
+    # Outboxes and dispatch
+    # ------------------------------------------------------------------
+
+    def _outbox(self, sid):
+        outbox = self._outboxes.get(sid)
+        if outbox is None:
+            outbox = self._outboxes[sid] = ClientOutbox()
+        return outbox
+
+    def _enqueue(self, outbox, viewport, frame):
+        if viewport.clustered:
+            outbox.add_clusters(frame)
+        else:
+            outbox.add_vehicles(frame)
+
+    def _notify(self):
+        """Wake the dispatcher thread, starting it on first use"""
+        if self._dispatcher is None:
+            with self._lock:
+                if self._dispatcher is None:
+                    self._dispatcher = threading.Thread(target=self._dispatch_loop)
+                    self._dispatcher.daemon = True
+                    self._dispatcher.start()
+        self._wake.set()
+
+    def _dispatch_loop(self):
+        while True:
+            self._wake.wait(self.dispatch_interval)
+            self._wake.clear()
+            try:
+                self.dispatch()
+            except Exception as e:
+                print(f"⚠ Vehicle fan-out dispatch failed: {e}")
+
+    def _backlog(self, sid):
+        """Packets still queued in engine.io for this client"""
+        server = self.socketio.server
+        eio_sid = server.manager.eio_sid_from_sid(sid, '/')
+        socket = server.eio.sockets.get(eio_sid) if eio_sid else None
+        queue = getattr(socket, 'queue', None)
+        return queue.qsize() if queue is not None else 0
+
+    def dispatch(self):
+        """Send every client whose connection keeps up its pending frames"""
+        with self._lock:
+            ready = [sid for sid, outbox in self._outboxes.items() if outbox.pending]
+
+        now = time.monotonic()
+        manager = self.socketio.server.manager
+        for sid in ready:
+            with self._lock:
+                outbox = self._outboxes.get(sid)
+                if outbox is None:
+                    continue
+                if not manager.is_connected(sid, '/'):
+                    # Queued for a client that disconnected in the meantime
+                    self._outboxes.pop(sid, None)
+                    continue
+                if self._backlog(sid) > self.max_backlog:
+                    # Slow consumer: keep coalescing, give up after stall_timeout
+                    outbox.blocked_since = outbox.blocked_since or now
+                    if now - outbox.blocked_since < self.stall_timeout:
+                        continue
+                    messages = None
+                else:
+                    outbox.blocked_since = None
+                    # Encode under the lock: a binary client's string
+                    # dictionary must see its frames in send order
+                    messages = [self._message(sid, kind, frame) for kind, frame in outbox.take(self._seq)]
+
+            if messages is None:
+                self._disconnect_slow(sid)
+                continue
+            for event, payload in messages:
+                # Viewports are per worker: frames go to this worker's own
+                # clients and never through a message queue
+                self.socketio.emit(event, payload, to=sid, ignore_queue=True)
+
+    def _disconnect_slow(self, sid):
+        with self._lock:
+            self.slow_disconnects += 1
+            self._drop_viewport(sid)
+            self._encoders.pop(sid, None)
+            self._outboxes.pop(sid, None)
+        self.socketio.server.disconnect(sid, namespace='/', ignore_queue=True)
+
+    def _message(self, sid, kind, frame):
+        """(event, payload) for one client; binary if the client negotiated it"""
+        if kind == 'clusters':
+            return self.cluster_event, frame
+        if kind == 'event':
+            return frame
+        encoder = self._encoders.get(sid)
+        if kind == 'gps':
+            if encoder is not None:
+                return self.gps_event, encoder.encode_gps_batch(frame)
+            return self.gps_event, {'updates': frame}
+        if encoder is not None:
+            return self.event, encoder.encode_vehicle_batch(frame)
+        return self.event, frame
+
+    def emit_gps_batch(self, updates, room):
+        """Queue one tick of ride positions for every client in ``room``.
+
+        Only this worker's clients have outboxes; with a message queue the
+        other workers' clients get the JSON frame through the queue.
+        """
+        server = self.socketio.server
+        local = [sid for sid, _ in server.manager.get_participants('/', room)]
+        with self._lock:
+            for sid in local:
+                self._outbox(sid).add_gps(updates)
+        self._notify()
+
+        if isinstance(server.manager, socketio_lib.PubSubManager):
+            self.socketio.emit(self.gps_event, {'updates': updates}, to=room, skip_sid=local or None)
+
+    def emit_latest(self, event, messages):
+        """Queue ``(room, key, payload)`` messages of ``event`` for the clients in each room.
+
+        ``room=None`` means every client. An unsent payload with the same
+        event and key is replaced, so a slow client gets the latest only.
+        """
+        server = self.socketio.server
+        queued = []
+        with self._lock:
+            for room, key, payload in messages:
+                local = [sid for sid, _ in server.manager.get_participants('/', room)]
+                for sid in local:
+                    self._outbox(sid).add_event(event, key, payload)
+                queued.append((room, payload, local))
+        if not queued:
+            return
+        self._notify()
+
+        if isinstance(server.manager, socketio_lib.PubSubManager):
+            for room, payload, local in queued:
+                self.socketio.emit(event, payload, to=room, skip_sid=local or None)
+
+    def client_stats(self):
+        """Per-client outbox counters plus totals"""
+        with self._lock:
+            clients = {
+                sid: {
+                    'frames_sent': outbox.frames_sent,
+                    'coalesced': outbox.coalesced,
+                    'dropped': outbox.dropped,
+                    'pending_vehicles': len(outbox.vehicles),
+                    'pending_rides': len(outbox.gps),
+                    'pending_events': len(outbox.events),
+                    'blocked_seconds': round(time.monotonic() - outbox.blocked_since, 1) if outbox.blocked_since else 0,
+                }
+                for sid, outbox in self._outboxes.items()
+            }
+            slow_disconnects = self.slow_disconnects
+        return {
+            'clients': clients,
+            'totals': {
+                'clients': len(clients),
+                'frames_sent': sum(c['frames_sent'] for c in clients.values()),
+                'coalesced': sum(c['coalesced'] for c in clients.values()),
+                'dropped': sum(c['dropped'] for c in clients.values()),
+                'slow_disconnects': slow_disconnects,
+            },
+        }
@@ -0,0 +1,217 @@
+"""
+Binary Position Wire Format
+Compact alternative to JSON for the realtime vehicle_batch and gps_batch
+frames. A client opts in at connect time with
+``io({auth: {encoding: 'binary'}})``; everyone else keeps getting JSON.
+
+Little-endian, fixed layout (decoder: static/js/wire_format.js):
+    header   u8 kind | u8 flags | u32 seq | u32 ms since epoch_base
+             | u16 new strings | u32 records | u32 removed
+    strings  u32 index | u8 length | utf-8 bytes       (new dictionary entries)
+    vehicle  u32 id | i32 lat µdeg | i32 lon µdeg | u8 status | u32 city
+    gps      u32 id | u32 ride_id | i32 lat µdeg | i32 lon µdeg | u8 status | u16 progress x100
+    removed  u32 id
+
+Vehicle ids and city names go through a per-connection dictionary: each
+string is sent once, then referenced by its index.
+
+Usage: python wire_format.py   (bytes/frame and encode cost versus JSON)
+"""
+
+import json
+import struct
+import time
+from datetime import datetime
+import numpy as np
+
+KIND_VEHICLE_BATCH = 1
+KIND_GPS_BATCH = 2
+FLAG_KEYFRAME = 1
+
+STATUSES = ('available', 'busy', 'offline', 'pending', 'accepted',
+            'in_progress', 'completed', 'cancelled', 'active')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+UNKNOWN_STATUS = 255
+NO_STRING = 0xFFFFFFFF
+
+HEADER = struct.Struct('<BBIIHII')
+STRING_ENTRY = struct.Struct('<IB')
+VEHICLE_RECORD = np.dtype([('id', '<u4'), ('lat', '<i4'), ('lon', '<i4'), ('status', 'u1'), ('city', '<u4')])
+GPS_RECORD = np.dtype([('id', '<u4'), ('ride_id', '<u4'), ('lat', '<i4'), ('lon', '<i4'),
+                       ('status', 'u1'), ('progress', '<u2')])
+
+
+def to_microdegrees(values, count):
+    return np.rint(np.fromiter(values, dtype=np.float64, count=count) * 1e6).astype(np.int32)
+
+
+class PositionEncoder:
+    """Binary encoder for one connection; owns that connection's string dictionary"""
+
+    def __init__(self, epoch_base_ms=None):
+        self.epoch_base_ms = int(time.time() * 1000) if epoch_base_ms is None else epoch_base_ms
+        self.strings = {}
+
+    def _intern(self, values, new):
+        """Dictionary indexes for ``values``; unseen strings are appended to ``new``"""
+        strings = self.strings
+        indexes = []
+        for value in values:
+            if value is None:
+                indexes.append(NO_STRING)
+                continue
+            index = strings.get(value)
+            if index is None:
+                index = strings[value] = len(strings)
+                new.append((index, value))
+            indexes.append(index)
+        return indexes
+
+    def _frame(self, kind, flags, seq, timestamp_ms, new, records, removed):
+        parts = [HEADER.pack(kind, flags, seq & 0xFFFFFFFF,
+                             max(0, timestamp_ms - self.epoch_base_ms) & 0xFFFFFFFF,
+                             len(new), len(records), len(removed))]
+        for index, value in new:
+            encoded = str(value).encode('utf-8')[:255]
+            parts.append(STRING_ENTRY.pack(index, len(encoded)))
+            parts.append(encoded)
+        parts.append(records.tobytes())
+        parts.append(removed.tobytes())
+        return b''.join(parts)
+
+    def encode_vehicle_batch(self, frame, timestamp_ms=None):
+        """vehicle_batch dict (see vehicle_fanout) -> bytes"""
+        vehicles = frame['vehicles']
+        count = len(vehicles)
+        new = []
+
+        records = np.empty(count, dtype=VEHICLE_RECORD)
+        records['id'] = self._intern((v['vehicle_id'] for v in vehicles), new)
+        records['lat'] = to_microdegrees((v['lat'] for v in vehicles), count)
+        records['lon'] = to_microdegrees((v['lon'] for v in vehicles), count)
+        records['status'] = [STATUS_CODES.get(v['status'], UNKNOWN_STATUS) for v in vehicles]
+        records['city'] = self._intern((v.get('city') for v in vehicles), new)
+        removed = np.asarray(self._intern(frame.get('removed', ()), new), dtype='<u4')
+
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        flags = FLAG_KEYFRAME if frame.get('keyframe') else 0
+        return self._frame(KIND_VEHICLE_BATCH, flags, frame.get('seq', 0), timestamp_ms, new, records, removed)
+
+    def encode_gps_batch(self, updates, seq=0, timestamp_ms=None):
+        """List of gps_update dicts (one tick) -> bytes; the tick shares one timestamp"""
+        count = len(updates)
+        new = []
+
+        records = np.empty(count, dtype=GPS_RECORD)
+        records['id'] = self._intern((u['vehicle_id'] for u in updates), new)
+        records['ride_id'] = [u['ride_id'] for u in updates]
+        records['lat'] = to_microdegrees((u['latitude'] for u in updates), count)
+        records['lon'] = to_microdegrees((u['longitude'] for u in updates), count)
+        records['status'] = [STATUS_CODES.get(u.get('vehicle_status'), UNKNOWN_STATUS) for u in updates]
+        records['progress'] = np.clip(np.rint(np.fromiter(
+            (u.get('progress', 0) for u in updates), dtype=np.float64, count=count) * 100), 0, 65535)
+
+        if timestamp_ms is None:
+            if updates and 'timestamp' in updates[0]:
+                timestamp_ms = int(datetime.fromisoformat(updates[0]['timestamp']).timestamp() * 1000)
+            else:
+                timestamp_ms = int(time.time() * 1000)
+        return self._frame(KIND_GPS_BATCH, 0, seq, timestamp_ms, new, records, np.empty(0, dtype='<u4'))
+
+
+def decode_frame(data, strings, epoch_base_ms=0):
+    """Reference decoder: bytes -> dict; ``strings`` is the connection's index->string map"""
+    kind, flags, seq, offset_ms, new_count, record_count, removed_count = HEADER.unpack_from(data, 0)
+    position = HEADER.size
+    for _ in range(new_count):
+        index, length = STRING_ENTRY.unpack_from(data, position)
+        position += STRING_ENTRY.size
+        strings[index] = bytes(data[position:position + length]).decode('utf-8')
+        position += length
+
+    dtype = VEHICLE_RECORD if kind == KIND_VEHICLE_BATCH else GPS_RECORD
+    records = np.frombuffer(data, dtype=dtype, count=record_count, offset=position)
+    position += records.nbytes
+    removed = np.frombuffer(data, dtype='<u4', count=removed_count, offset=position)
+
+    def status(code):
+        return STATUSES[code] if code < len(STATUSES) else None
+
+    frame = {'seq': seq, 'keyframe': bool(flags & FLAG_KEYFRAME), 'timestamp_ms': epoch_base_ms + offset_ms}
+    if kind == KIND_VEHICLE_BATCH:
+        frame['vehicles'] = [
+            {'vehicle_id': strings[index], 'lat': lat / 1e6, 'lon': lon / 1e6,
+             'status': status(code), 'city': strings.get(city)}
+            for index, lat, lon, code, city in records.tolist()
+        ]
+        frame['removed'] = [strings[index] for index in removed.tolist()]
+    else:
+        frame['updates'] = [
+            {'vehicle_id': strings[index], 'ride_id': ride_id, 'latitude': lat / 1e6,
+             'longitude': lon / 1e6, 'vehicle_status': status(code), 'progress': progress / 100}
+            for index, ride_id, lat, lon, code, progress in records.tolist()
+        ]
+    return frame
+
+
+def _sample_frames(count, rng):
+    timestamp = datetime.now().isoformat()
+    lats = rng.uniform(12.85, 13.05, count)
+    lons = rng.uniform(77.50, 77.75, count)
+    vehicles = [
+        {'vehicle_id': f'KA-01-{1000 + i}', 'lat': float(lat), 'lon': float(lon),
+         'status': 'available' if i % 3 else 'busy', 'city': 'bangalore'}
+        for i, (lat, lon) in enumerate(zip(lats, lons))
+    ]
+    updates = [
+        {'ride_id': i, 'vehicle_id': f'KA-01-{1000 + i}', 'vehicle_status': 'busy',
+         'latitude': float(lat), 'longitude': float(lon), 'progress': float(i % 100), 'timestamp': timestamp}
+        for i, (lat, lon) in enumerate(zip(lats, lons))
+    ]
+    return {'seq': 1, 'keyframe': False, 'vehicles': vehicles, 'removed': []}, updates
+
+
+def _time_ms(func, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - t0) / repeat * 1000, result
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+
+    print("\n" + "="*80)
+    print("REALTIME WIRE FORMAT BENCHMARK (JSON vs binary)")
+    print("="*80)
+    print(f"{'frame':<14}{'vehicles':>9}{'JSON bytes':>12}{'bin first':>11}{'bin steady':>12}"
+          f"{'ratio':>8}{'JSON ms':>10}{'bin ms':>9}")
+
+    for count in (1000, 10000):
+        vehicle_frame, updates = _sample_frames(count, rng)
+        for name, to_json, to_binary in (
+            ('vehicle_batch', lambda: json.dumps(vehicle_frame),
+             lambda encoder: encoder.encode_vehicle_batch(vehicle_frame)),
+            ('gps_batch', lambda: json.dumps({'updates': updates}),
+             lambda encoder: encoder.encode_gps_batch(updates)),
+        ):
+            json_ms, json_payload = _time_ms(to_json)
+            encoder = PositionEncoder()
+            first = to_binary(encoder)          # includes the string dictionary
+            binary_ms, steady = _time_ms(lambda: to_binary(encoder))
+
+            # Round trip check against the reference decoder
+            strings = {}
+            decode_frame(first, strings)
+            decoded = decode_frame(steady, strings)
+            key = 'vehicles' if name == 'vehicle_batch' else 'updates'
+            assert len(decoded[key]) == count
+
+            json_bytes = len(json_payload.encode('utf-8'))
+            print(f"{name:<14}{count:>9}{json_bytes:>12}{len(first):>11}{len(steady):>12}"
+                  f"{json_bytes / len(steady):>7.1f}x{json_ms:>10.2f}{binary_ms:>9.2f}")
+
+    print("\nbin first = first frame on a connection (carries the vehicle-id dictionary)")
+    print("bin steady = later frames; coordinates are exact to 1e-6 degrees (~0.1 m)")
+    print("="*80 + "\n")